@@ -7,6 +7,10 @@ from backend.api.endpoints.workout import router as workout_router
 from backend.api.endpoints.coach import router as coach_router
 from backend.api.endpoints.profile import router as profile_router
 from backend.api.endpoints.forecast import router as forecast_router
+from backend.api.endpoints.admin import router as admin_router
+from backend.api.endpoints.catalog import router as catalog_router
+from backend.api.endpoints.jobs import router as jobs_router
+from backend.api.endpoints.session import router as session_router
 
 __all__ = [
     "vibe_router",
@@ -14,4 +18,8 @@ __all__ = [
     "coach_router",
     "profile_router",
     "forecast_router",
+    "admin_router",
+    "catalog_router",
+    "jobs_router",
+    "session_router",
 ]
\ No newline at end of file
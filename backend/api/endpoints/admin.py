@@ -0,0 +1,140 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Query as SAQuery, Session
+from typing import Iterator, Literal, Optional
+import asyncio
+import json
+
+from backend.core.auth import get_current_admin_user
+from backend.core.config import get_settings
+from backend.core.database import SessionLocal, get_db
+from backend.core.profiling import StackSampler, request_profiles
+from backend.models.user import User
+from backend.utils.model_router import DEFAULT_LADDERS, ladder, router_stats
+
+router = APIRouter()
+
+
+@router.post("/admin/profile")
+async def profile_process(
+        seconds: float = Query(10.0, gt=0),
+        interval_ms: float = Query(5.0, ge=1.0, le=100.0),
+        format: Literal["collapsed", "speedscope"] = "speedscope",
+        current_user: User = Depends(get_current_admin_user)
+):
+    """Снимает стеки живого воркера в течение seconds (только для админа)"""
+    if seconds > get_settings().profiling_max_seconds:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Не больше {get_settings().profiling_max_seconds} секунд"
+        )
+    if StackSampler.busy():
+        raise HTTPException(status_code=409, detail="Профилирование уже запущено")
+
+    sampler = StackSampler(interval=interval_ms / 1000)
+    try:
+        await asyncio.to_thread(sampler.run, seconds)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    if format == "collapsed":
+        return Response(content=sampler.collapsed(), media_type="text/plain; charset=utf-8")
+    return sampler.speedscope(name=f"{get_settings().app_name} ({seconds:g}s)")
+
+
+@router.get("/admin/profile/requests/{profile_id}")
+async def get_request_profile(
+        profile_id: str,
+        current_user: User = Depends(get_current_admin_user)
+):
+    """Профиль запроса, снятый по заголовку x-profile (только для админа)"""
+    profile = request_profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Профиль не найден")
+    return profile
+
+
+@router.get("/admin/models")
+async def get_model_stats(current_user: User = Depends(get_current_admin_user)):
+    """Лестницы моделей и статистика по ступеням этого воркера (только для админа)"""
+    return {
+        "ladders": {task: ladder(task) for task in DEFAULT_LADDERS},
+        "stats": router_stats.snapshot(),
+    }
+
+
+# ===== Пользователи =====
+
+USERS_EXPORT_CHUNK = 500
+
+
+def _filter_users(
+        query: SAQuery,
+        rating_level: Optional[str],
+        fitness_level: Optional[str],
+        is_active: Optional[bool]
+) -> SAQuery:
+    if rating_level is not None:
+        query = query.filter(User.rating_level == rating_level)
+    if fitness_level is not None:
+        query = query.filter(User.fitness_level == fitness_level)
+    if is_active is not None:
+        query = query.filter(User.is_active == is_active)
+    return query
+
+
+@router.get("/admin/users")
+async def get_all_users(
+        after_id: Optional[int] = Query(None, ge=0, description="id последнего пользователя предыдущей страницы"),
+        limit: int = Query(100, ge=1, le=1000),
+        rating_level: Optional[str] = None,
+        fitness_level: Optional[str] = None,
+        is_active: Optional[bool] = None,
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_admin_user)
+):
+    """Страница пользователей по возрастанию id (только для админа)"""
+    # Keyset вместо OFFSET: стоимость страницы не растёт с её номером
+    query = _filter_users(db.query(User), rating_level, fitness_level, is_active)
+    if after_id is not None:
+        query = query.filter(User.id > after_id)
+    users = query.order_by(User.id).limit(limit + 1).all()
+
+    has_more = len(users) > limit
+    users = users[:limit]
+    return {
+        "users": [user.to_dict() for user in users],
+        "next_after_id": users[-1].id if has_more else None,
+        "limit": limit,
+    }
+
+
+def _export_users(
+        rating_level: Optional[str],
+        fitness_level: Optional[str],
+        is_active: Optional[bool]
+) -> Iterator[bytes]:
+    # Своя сессия: сессия запроса закрывается раньше, чем дочитается поток
+    db = SessionLocal()
+    try:
+        query = _filter_users(db.query(User), rating_level, fitness_level, is_active)
+        for user in query.order_by(User.id).yield_per(USERS_EXPORT_CHUNK):
+            yield (json.dumps(user.to_dict(), ensure_ascii=False) + "\n").encode("utf-8")
+            db.expunge(user)  # не копим объекты в identity map
+    finally:
+        db.close()
+
+
+@router.get("/admin/users/export")
+async def export_users(
+        rating_level: Optional[str] = None,
+        fitness_level: Optional[str] = None,
+        is_active: Optional[bool] = None,
+        current_user: User = Depends(get_current_admin_user)
+):
+    """Выгрузка пользователей в NDJSON потоком, без загрузки всей таблицы (только для админа)"""
+    return StreamingResponse(
+        _export_users(rating_level, fitness_level, is_active),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="users.ndjson"'}
+    )
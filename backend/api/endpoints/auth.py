@@ -3,7 +3,7 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from ...core.database import get_db
+from ...core.database import get_db, release_connection
 from ...core.auth import (
     authenticate_user,
     create_tokens,
@@ -11,7 +11,7 @@ from ...core.auth import (
     get_current_active_user,
     get_current_premium_user,
     verify_refresh_token,
-    get_password_hash
+    hash_password
 )
 from .schemas.auth import (
     UserCreate,
@@ -52,8 +52,9 @@ async def register(
                 detail="Пользователь с таким именем уже существует"
             )
 
-    # Создаем пользователя
-    hashed_password = get_password_hash(user_data.password)
+    # Создаем пользователя; на время хеширования соединение возвращаем в пул
+    release_connection(db)
+    hashed_password = await hash_password(user_data.password)
 
     user = User(
         email=user_data.email,
@@ -92,7 +93,7 @@ async def login(
         db: Session = Depends(get_db)
 ):
     """Вход пользователя"""
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
 
     if not user:
         raise HTTPException(
@@ -245,7 +246,7 @@ async def confirm_password_reset(
         )
 
     # Обновляем пароль
-    user.hashed_password = get_password_hash(reset_data.new_password)
+    user.hashed_password = await hash_password(reset_data.new_password)
     db.commit()
 
     return AuthResponse(
@@ -266,23 +267,4 @@ async def check_premium_status(
     )
 
 
-# Административные эндпоинты (только для теста/админа)
-@router.get("/users", response_model=AuthResponse)
-async def get_all_users(
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
-):
-    """Получение всех пользователей (только для админа)"""
-    # Простая проверка на админа (в реальном проекте нужна полноценная система ролей)
-    if current_user.email != "admin@example.com":
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Недостаточно прав"
-        )
-
-    users = db.query(User).all()
-    return AuthResponse(
-        success=True,
-        message="Список пользователей",
-        data={"users": [user.to_dict() for user in users]}
-    )
\ No newline at end of file
+# Список и выгрузка пользователей — в admin.py (/admin/users, /admin/users/export)
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Request
+
+from backend.core.http_cache import PrecomputedResponse
+from backend.utils.constants import EXERCISES, ExerciseCategory, MeasureType
+from backend.utils.prompts import COACH_STYLES
+
+router = APIRouter()
+
+
+def build_exercise_catalog() -> dict:
+    """Справочник упражнений для клиента: slug, название, категория, как считаются очки"""
+    return {
+        "exercises": [
+            {
+                "slug": cfg.slug,
+                "label": cfg.label,
+                "emoji": cfg.emoji,
+                "category": cfg.category.value,
+                "measure_type": cfg.measure_type.value,
+                "points_per_unit": cfg.points_per_unit,
+                "seconds_per_unit": cfg.seconds_per_unit,
+            }
+            for cfg in EXERCISES.values()
+        ],
+        "categories": [c.value for c in ExerciseCategory],
+        "measure_types": [m.value for m in MeasureType],
+        "coach_styles": sorted(COACH_STYLES),
+    }
+
+
+# Справочник статичен: сериализуется один раз при импорте, дальше — готовые байты
+exercise_catalog = PrecomputedResponse(build_exercise_catalog(), cache_control="public, max-age=86400")
+
+
+@router.get("/catalog/exercises")
+async def get_exercise_catalog(request: Request):
+    """Каталог упражнений (ETag; If-None-Match → 304)"""
+    return exercise_catalog.respond(request)
@@ -1,12 +1,22 @@
-from fastapi import APIRouter, HTTPException
-from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Request
+from typing import List, Literal, Optional
 from pydantic import BaseModel, Field
-import httpx
+import hashlib
 
-from backend.core.config import settings  # <-- вот это важно
+from backend.core.config import get_settings
+from backend.core.metrics import record_fallback
+from backend.core.ratelimit import RateLimit, as_system, current_principal, resolve_principal
+from backend.services.phraseBank import PhraseBank, PoolKey
+from backend.schemas.llm import PhraseBatchLLMOutput
+from backend.utils.llm_gateway import get_api_key
+from backend.utils.model_router import routed_completion
+from backend.utils.prompts import COACH_STYLES
 
 router = APIRouter(prefix="/coach", tags=["coach"])
 
+# Квота реплик тренера; её же списывает канал /ws/session
+COACH_COMMENT_LIMIT = RateLimit("coach_comment", per_minute=60, burst=20)
+
 
 class CoachCommentRequest(BaseModel):
     style: Literal["strict", "soft", "comedy", "anime", "balanced"]
@@ -29,52 +39,30 @@ async def generate_coach_comment_with_ai(
         context: str = ""
 ) -> str:
     """Генерирует комментарий тренера через AI"""
-    api_key = settings.openrouter_api_key  # <-- а не os.getenv
-
-    if not api_key:
+    if not get_api_key():
+        record_fallback("coach", "no_api_key")
         return generate_fallback_comment(style, success)
 
-    style_descriptions = {
-        "strict": "Ты строгий армейский инструктор. Говори кратко, жёстко, по делу.",
-        "soft": "Ты заботливый поддерживающий друг. Подбадриваешь мягко и тепло.",
-        "comedy": "Ты юмористический комментатор. Шутишь, но при этом мотивируешь.",
-        "anime": "Ты аниме-сенсей. Говоришь драматично, с японскими терминами.",
-        "balanced": "Ты профессиональный тренер. Даёшь сбалансированные комментарии."
-    }
-
-    prompt = f"""{style_descriptions.get(style, 'Ты тренер.')}
-
-Упражнение: {exercise}
-Результат: {"Успешно выполнено" if success else "Нужно улучшить"}
-Прогресс пользователя: {progress*100}%
-Контекст: {context}
-
-Сгенерируй одну короткую реплику тренера (до 10 слов) для этого момента.
-Только реплику, без пояснений."""
-
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "@preset/neuro-trainer",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.7,
-                    "max_tokens": 50
-                }
-            )
+        routed = await routed_completion(
+            "coach_comment",
+            temperature=0.7,
+            max_tokens=50,
+            style_description=COACH_STYLES.get(style, 'Ты тренер.'),
+            exercise=exercise,
+            result="Успешно выполнено" if success else "Нужно улучшить",
+            progress=progress * 100,
+            context=context,
+        )
 
-            if response.status_code == 200:
-                result = response.json()
-                return result["choices"][0]["message"]["content"].strip()
+        if routed:
+            return routed.output
 
+        record_fallback("coach", "bad_response")
         return generate_fallback_comment(style, success)
 
     except Exception:
+        record_fallback("coach", "error")
         return generate_fallback_comment(style, success)
 
 
@@ -104,17 +92,84 @@ def generate_fallback_comment(style: str, success: bool) -> str:
             return "Нужно поработать над техникой."
 
 
-@router.post("/coach/comment", response_model=CoachCommentResponse)
-async def get_coach_comment(request: CoachCommentRequest):
+CATEGORY_DESCRIPTIONS = {
+    "strength": "силовое упражнение на повторы",
+    "strength_mix": "статика или пресс на время",
+    "endurance": "кардио",
+    "wellbeing": "растяжка или дыхание",
+    "general": "любое упражнение",
+}
+
+PROGRESS_DESCRIPTIONS = {
+    "low": "только начинает (до 33%)",
+    "mid": "на середине пути (33-66%)",
+    "high": "почти у цели (больше 66%)",
+}
+
+
+async def generate_phrase_batch(key: PoolKey, count: int) -> List[str]:
+    """Генерирует пачку реплик для пула банка одним запросом к AI"""
+    style, success, bucket, category = key
+    # Пул общий для всех — токены не списываются с того, чей запрос запустил пополнение
+    with as_system():
+        routed = await routed_completion(
+            "coach_phrase_batch",
+            temperature=0.9,
+            schema=PhraseBatchLLMOutput,
+            style_description=COACH_STYLES.get(style, 'Ты тренер.'),
+            category=CATEGORY_DESCRIPTIONS.get(category, category),
+            result="Успешно выполнено" if success else "Нужно улучшить",
+            progress=PROGRESS_DESCRIPTIONS[bucket],
+            count=count,
+        )
+    if not routed:
+        return []
+    return [p.strip() for p in routed.output.phrases if 0 < len(p.split()) <= 10]
+
+
+_phrase_bank: Optional[PhraseBank] = None
+
+
+def get_phrase_bank() -> PhraseBank:
+    global _phrase_bank
+    if _phrase_bank is None:
+        settings = get_settings()
+        _phrase_bank = PhraseBank(
+            seed=generate_fallback_comment,
+            generate=generate_phrase_batch,
+            low_water=settings.coach_phrase_low_water,
+            batch_size=settings.coach_phrase_batch_size,
+        )
+    return _phrase_bank
+
+
+def phrase_key(principal: str) -> str:
+    """Ключ ротации реплик банка по user:/ip: — один для POST /coach/coach/comment и /ws/session"""
+    return hashlib.sha1(principal.encode()).hexdigest()
+
+
+@router.post("/coach/comment", response_model=CoachCommentResponse,
+             dependencies=[Depends(COACH_COMMENT_LIMIT)])
+async def get_coach_comment(request: CoachCommentRequest, http_request: Request):
     """Генерирует мотивационный комментарий через AI"""
     try:
-        comment = await generate_coach_comment_with_ai(
-            style=request.style,
-            exercise=request.exercise,
-            success=request.success,
-            progress=request.user_progress,
-            context=request.additional_context
-        )
+        if get_settings().coach_phrase_bank_enabled and not request.additional_context:
+            # Без контекста реплика не уникальна — отдаём из банка, LLM пополняет его в фоне
+            comment = get_phrase_bank().next_phrase(
+                phrase_key(current_principal() or resolve_principal(http_request)),
+                style=request.style,
+                success=request.success,
+                progress=request.user_progress,
+                exercise=request.exercise,
+            )
+        else:
+            comment = await generate_coach_comment_with_ai(
+                style=request.style,
+                exercise=request.exercise,
+                success=request.success,
+                progress=request.user_progress,
+                context=request.additional_context
+            )
 
         return CoachCommentResponse(
             comment=comment,
@@ -1,8 +1,15 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, Request
 from typing import Dict, List, Any
 from pydantic import BaseModel, Field
-import httpx
-import os
+
+from backend.api.endpoints.jobs import JobAccepted, submit_job
+from backend.core.jobs import register_job
+from backend.core.metrics import record_fallback
+from backend.core.ratelimit import RateLimit
+from backend.core.responses import model_response
+from backend.schemas.llm import ForecastLLMOutput
+from backend.utils.llm_gateway import get_api_key
+from backend.utils.model_router import routed_completion
 
 router = APIRouter()
 
@@ -15,11 +22,11 @@ class ForecastRequest(BaseModel):
 
 
 class ForecastResponse(BaseModel):
-    optimistic_scenario: Dict[str, Any]
-    pessimistic_scenario: Dict[str, Any]
-    comparison: Dict[str, Any]
-    key_milestones: List[Dict[str, Any]]
-    recommendations: List[str]
+    optimistic_scenario: Dict[str, Any] = {}
+    pessimistic_scenario: Dict[str, Any] = {}
+    comparison: Dict[str, Any] = {}
+    key_milestones: List[Dict[str, Any]] = []
+    recommendations: List[str] = []
 
 
 async def generate_forecast_with_ai(
@@ -29,81 +36,29 @@ async def generate_forecast_with_ai(
         goals: List[str]
 ) -> dict:
     """Генерирует прогноз через AI"""
-    api_key = os.getenv("OPENROUTER_API_KEY") or os.getenv("OPENAI_API_KEY")
-
-    if not api_key:
+    if not get_api_key():
+        record_fallback("forecast", "no_api_key")
         return generate_forecast_fallback(current_stats, consistency)
 
-    prompt = f"""Создай прогноз спортивной формы на 30 дней.
-
-Текущие показатели:
-{current_stats}
-
-Планируемые тренировки: {len(planned_workouts)} тренировок
-Уровень регулярности: {consistency*100}%
-Цели: {', '.join(goals) if goals else 'общее улучшение формы'}
-
-Верни JSON с двумя сценариями:
-{{
-  "optimistic_scenario": {{
-    "description": "если тренироваться по плану",
-    "improvements": {{
-      "endurance": "+X%",
-      "strength": "+X%",
-      "flexibility": "+X%",
-      "wellbeing": "+X%"
-    }},
-    "key_achievements": ["достижение 1", "достижение 2"]
-  }},
-  "pessimistic_scenario": {{
-    "description": "если пропускать тренировки",
-    "changes": {{
-      "endurance": "-X%",
-      "strength": "-X%",
-      "flexibility": "-X%",
-      "wellbeing": "-X%"
-    }},
-    "risks": ["риск 1", "риск 2"]
-  }},
-  "comparison": {{
-    "difference_description": "разница между сценариями",
-    "motivational_message": "мотивационное сообщение"
-  }},
-  "key_milestones": [
-    {{"day": 7, "title": "первая неделя", "description": "описание"}}
-  ],
-  "recommendations": ["рекомендация 1", "рекомендация 2"]
-}}"""
-
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "openai/gpt-3.5-turbo",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.4
-                }
-            )
-
-            if response.status_code == 200:
-                result = response.json()
-                content = result["choices"][0]["message"]["content"]
-
-                import json
-                import re
-
-                json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                if json_match:
-                    return json.loads(json_match.group())
+        routed = await routed_completion(
+            "forecast_30days",
+            temperature=0.4,
+            schema=ForecastLLMOutput,
+            current_stats=current_stats,
+            planned_count=len(planned_workouts),
+            consistency=consistency * 100,
+            goals=', '.join(goals) if goals else 'общее улучшение формы',
+        )
+
+        if routed:
+            return routed.output.model_dump()
 
+        record_fallback("forecast", "bad_response")
         return generate_forecast_fallback(current_stats, consistency)
 
     except Exception:
+        record_fallback("forecast", "error")
         return generate_forecast_fallback(current_stats, consistency)
 
 
@@ -172,24 +127,25 @@ def generate_forecast_fallback(current_stats: Dict, consistency: float) -> dict:
     }
 
 
-@router.post("/forecast/30days", response_model=ForecastResponse)
-async def generate_30day_forecast(request: ForecastRequest):
-    """Генерирует прогноз на 30 дней через AI"""
-    try:
-        ai_result = await generate_forecast_with_ai(
-            current_stats=request.current_stats,
-            planned_workouts=request.planned_workouts,
-            consistency=request.consistency_level,
-            goals=request.user_goals
-        )
+async def run_forecast_job(payload: dict) -> dict:
+    ai_result = await generate_forecast_with_ai(
+        current_stats=payload["current_stats"],
+        planned_workouts=payload["planned_workouts"],
+        consistency=payload["consistency_level"],
+        goals=payload["user_goals"]
+    )
+    return ForecastResponse.model_validate(ai_result).model_dump(mode="json")
+
+
+register_job("forecast_30days", run_forecast_job)
 
-        return ForecastResponse(
-            optimistic_scenario=ai_result.get("optimistic_scenario", {}),
-            pessimistic_scenario=ai_result.get("pessimistic_scenario", {}),
-            comparison=ai_result.get("comparison", {}),
-            key_milestones=ai_result.get("key_milestones", []),
-            recommendations=ai_result.get("recommendations", [])
-        )
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+@router.post("/forecast/30days", status_code=202, response_model=JobAccepted,
+             responses={200: {"model": ForecastResponse, "description": "Prefer: wait=N, задача успела"}},
+             dependencies=[Depends(RateLimit("forecast_30days", per_minute=5, burst=3))])
+async def generate_30day_forecast(request: ForecastRequest, http_request: Request):
+    """Ставит прогноз на 30 дней в очередь: 202 и ссылки на статус (/jobs/{id}) и SSE"""
+    return await submit_job(
+        http_request, "forecast_30days", request.model_dump(mode="json"),
+        lambda result: model_response(ForecastResponse.model_validate(result)),
+    )
\ No newline at end of file
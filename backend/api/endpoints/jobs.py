@@ -0,0 +1,139 @@
+import asyncio
+import json
+import re
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from backend.core.config import get_settings
+from backend.core.jobs import TERMINAL, DONE, Job, get_job_queue
+from backend.core.ratelimit import current_principal, resolve_principal
+from backend.core.responses import json_response
+
+router = APIRouter()
+
+MAX_WAIT_SEC = 30.0          # Prefer: wait=N не дольше этого
+SSE_HEARTBEAT_SEC = 15.0
+_PREFER_WAIT = re.compile(r"(?:^|[,;\s])wait=(\d+(?:\.\d+)?)", re.IGNORECASE)
+
+
+class JobAccepted(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+    events_url: str
+
+
+class JobStatus(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    attempts: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+def _timestamp(value: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(value, timezone.utc).isoformat() if value else None
+
+
+def job_document(job: Job) -> dict:
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "attempts": job.attempts,
+        "created_at": _timestamp(job.created),
+        "finished_at": _timestamp(job.finished),
+        "result": job.result,
+        "error": job.error if job.status != DONE else None,
+    }
+
+
+def prefer_wait(request: Request) -> float:
+    """Prefer: wait=N (RFC 7240) — клиент готов подождать результат N секунд"""
+    match = _PREFER_WAIT.search(request.headers.get("prefer", ""))
+    return min(float(match.group(1)), MAX_WAIT_SEC) if match else 0.0
+
+
+async def submit_job(request: Request, kind: str, payload: dict, render: Callable[[dict], Any]):
+    """
+    Ставит задачу и отвечает 202 со ссылками на статус и SSE. С Prefer: wait=N
+    ждёт до N секунд и, если задача успела, сразу отдаёт результат (200) через render.
+    """
+    queue = get_job_queue()
+    # SQLite может ждать блокировку до busy_timeout — не на event loop
+    job_id, _ = await asyncio.to_thread(queue.submit, kind, payload, owner=current_principal())
+
+    wait = prefer_wait(request)
+    if wait:
+        job = await queue.wait(job_id, wait)
+        if job is not None and job.status == DONE:
+            return render(job.result)
+
+    status_url = f"{get_settings().api_prefix}/jobs/{job_id}"
+    accepted = {
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": status_url,
+        "events_url": f"{status_url}/events",
+    }
+    return json_response(accepted, status_code=202, headers={"Location": status_url, "Retry-After": "2"})
+
+
+async def _owned_job(request: Request, job_id: str) -> Job:
+    job = await asyncio.to_thread(get_job_queue().get, job_id)
+    # Как с тренировками: задачи пользователя видны только ему, анонимные — по знанию id
+    owner = job.owner or "" if job is not None else ""
+    if job is None or (owner.startswith("user:") and owner != resolve_principal(request)):
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str, request: Request):
+    """Статус фоновой задачи и результат, когда она выполнена"""
+    job = await _owned_job(request, job_id)
+    headers = None if job.status in TERMINAL else {"Retry-After": "2"}
+    return json_response(job_document(job), headers=headers)
+
+
+def _sse(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+async def _job_events(job: Job, request: Request):
+    queue = get_job_queue()
+    last_state = None
+    last_sent = time.monotonic()
+    while True:
+        state = (job.status, job.attempts)
+        if state != last_state:
+            last_state, last_sent = state, time.monotonic()
+            event = "result" if job.status in TERMINAL else "status"
+            yield _sse(event, job_document(job))
+            if job.status in TERMINAL:
+                return
+        elif time.monotonic() - last_sent >= SSE_HEARTBEAT_SEC:
+            last_sent = time.monotonic()
+            yield b": keepalive\n\n"  # прокси не закроют простаивающее соединение
+        if await request.is_disconnected():
+            return
+        job = await queue.wait(job.id, timeout=1.0) or job
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """SSE: event: status при смене статуса, event: result по завершении"""
+    job = await _owned_job(request, job_id)
+    return StreamingResponse(
+        _job_events(job, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
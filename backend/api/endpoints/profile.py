@@ -1,8 +1,15 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, Request
 from typing import Dict, List, Any
 from pydantic import BaseModel
-import httpx
-import os
+
+from backend.api.endpoints.jobs import JobAccepted, submit_job
+from backend.core.jobs import register_job
+from backend.core.metrics import record_fallback
+from backend.core.ratelimit import RateLimit
+from backend.core.responses import model_response
+from backend.schemas.llm import ProfileLLMOutput
+from backend.utils.llm_gateway import get_api_key
+from backend.utils.model_router import routed_completion
 
 router = APIRouter()
 
@@ -13,75 +20,40 @@ class ProfileAnalysisRequest(BaseModel):
 
 
 class ProfileAnalysisResponse(BaseModel):
-    user_type: str
-    analysis: str
-    strengths: List[str]
-    weaknesses: List[str]
-    recommendations: List[str]
-    optimal_training_schedule: Dict[str, Any]
+    user_type: str = "пользователь"
+    analysis: str = "Анализ профиля"
+    strengths: List[str] = []
+    weaknesses: List[str] = []
+    recommendations: List[str] = []
+    optimal_training_schedule: Dict[str, Any] = {}
 
 
 async def analyze_profile_with_ai(workout_history: List[Dict], goals: List[str]) -> dict:
     """Анализирует профиль пользователя через AI"""
-    api_key = os.getenv("OPENROUTER_API_KEY") or os.getenv("OPENAI_API_KEY")
-
-    if not api_key:
+    if not get_api_key():
+        record_fallback("profile", "no_api_key")
         return analyze_profile_fallback(workout_history)
 
     # Формируем историю для AI
     history_summary = summarize_history(workout_history)
 
-    prompt = f"""Проанализируй спортивный профиль пользователя на основе истории тренировок.
-
-История тренировок:
-{history_summary}
-
-Цели пользователя: {', '.join(goals) if goals else 'не указаны'}
-
-Проанализируй и верни JSON:
-{{
-  "user_type": "тип пользователя (например: новичок, энтузиаст, спортсмен)",
-  "analysis": "анализ тренировочных привычек (2-3 предложения)",
-  "strengths": ["сильная сторона 1", "сильная сторона 2"],
-  "weaknesses": ["слабая сторона 1", "слабая сторона 2"],
-  "recommendations": ["рекомендация 1", "рекомендация 2", "рекомендация 3"],
-  "optimal_training_schedule": {{
-    "frequency": "рекомендуемая частота",
-    "duration": "рекомендуемая длительность",
-    "intensity": "рекомендуемая интенсивность",
-    "coach_style": "рекомендуемый стиль тренера"
-  }}
-}}"""
-
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "openai/gpt-3.5-turbo",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.3
-                }
-            )
-
-            if response.status_code == 200:
-                result = response.json()
-                content = result["choices"][0]["message"]["content"]
-
-                import json
-                import re
-
-                json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                if json_match:
-                    return json.loads(json_match.group())
+        routed = await routed_completion(
+            "profile_analyze",
+            temperature=0.3,
+            schema=ProfileLLMOutput,
+            history_summary=history_summary,
+            goals=', '.join(goals) if goals else 'не указаны',
+        )
 
+        if routed:
+            return routed.output.model_dump()
+
+        record_fallback("profile", "bad_response")
         return analyze_profile_fallback(workout_history)
 
     except Exception:
+        record_fallback("profile", "error")
         return analyze_profile_fallback(workout_history)
 
 
@@ -141,23 +113,20 @@ def analyze_profile_fallback(workout_history: List[Dict]) -> dict:
     }
 
 
-@router.post("/profile/analyze", response_model=ProfileAnalysisResponse)
-async def analyze_user_profile(request: ProfileAnalysisRequest):
-    """Анализирует профиль пользователя через AI"""
-    try:
-        ai_result = await analyze_profile_with_ai(
-            request.workout_history,
-            request.user_goals
-        )
+async def run_profile_job(payload: dict) -> dict:
+    ai_result = await analyze_profile_with_ai(payload["workout_history"], payload["user_goals"])
+    return ProfileAnalysisResponse.model_validate(ai_result).model_dump(mode="json")
+
+
+register_job("profile_analyze", run_profile_job)
 
-        return ProfileAnalysisResponse(
-            user_type=ai_result.get("user_type", "пользователь"),
-            analysis=ai_result.get("analysis", "Анализ профиля"),
-            strengths=ai_result.get("strengths", []),
-            weaknesses=ai_result.get("weaknesses", []),
-            recommendations=ai_result.get("recommendations", []),
-            optimal_training_schedule=ai_result.get("optimal_training_schedule", {})
-        )
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+@router.post("/profile/analyze", status_code=202, response_model=JobAccepted,
+             responses={200: {"model": ProfileAnalysisResponse, "description": "Prefer: wait=N, задача успела"}},
+             dependencies=[Depends(RateLimit("profile_analyze", per_minute=5, burst=3))])
+async def analyze_user_profile(request: ProfileAnalysisRequest, http_request: Request):
+    """Ставит анализ профиля в очередь: 202 и ссылки на статус (/jobs/{id}) и SSE"""
+    return await submit_job(
+        http_request, "profile_analyze", request.model_dump(mode="json"),
+        lambda result: model_response(ProfileAnalysisResponse.model_validate(result)),
+    )
\ No newline at end of file
@@ -0,0 +1,319 @@
+import asyncio
+import json
+import time
+from typing import Literal, Optional
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy import select, update
+
+from backend.api.endpoints.coach import (
+    COACH_COMMENT_LIMIT,
+    generate_coach_comment_with_ai,
+    get_phrase_bank,
+    phrase_key,
+)
+from backend.core.auth import user_from_token
+from backend.core.config import get_settings
+from backend.core.database import SessionLocal
+from backend.core.metrics import WS_CONNECTIONS, WS_MESSAGES
+from backend.core.ratelimit import acting_as
+from backend.models.user import User
+from backend.services.liveSession import LiveSession
+from backend.utils.constants import EXERCISES, calculate_exercise_points
+
+router = APIRouter()
+
+# Коды закрытия (4000-4999 — коды приложения)
+CLOSE_UNAUTHORIZED = 4401
+CLOSE_TIMEOUT = 4408
+MISSED_HEARTBEATS = 3
+
+
+class ResumeRequest(BaseModel):
+    session_id: str
+    last_seq: int = Field(0, ge=0)
+
+
+class AuthFrame(BaseModel):
+    type: Literal["auth"]
+    token: str
+    resume: Optional[ResumeRequest] = None
+
+
+class CompletionEvent(BaseModel):
+    """Выполненный подход: поля /workout/complete_exercise и /coach/coach/comment в одном кадре"""
+    type: Literal["complete"]
+    id: str = Field(..., min_length=1, max_length=64, description="id события от клиента, для дедупликации")
+    exercise_slug: str
+    reps: Optional[int] = Field(None, ge=0)
+    seconds: Optional[int] = Field(None, ge=0)
+    style: Literal["strict", "soft", "comedy", "anime", "balanced"] = "balanced"
+    success: bool = True
+    user_progress: float = Field(0.0, ge=0.0, le=1.0)
+
+
+def _authenticate(token: str) -> Optional[tuple]:
+    """(principal, user_id, rating) по токену; соединение с БД сразу возвращается в пул"""
+    db = SessionLocal()
+    try:
+        user = user_from_token(db, token)
+        return (f"user:{user.email}", user.id, user.rating) if user is not None else None
+    finally:
+        db.close()
+
+
+def _apply_points(user_id: int, delta: int) -> Optional[int]:
+    """Атомарно прибавляет очки пачки и возвращает рейтинг из БД"""
+    db = SessionLocal()
+    try:
+        if delta:
+            db.execute(update(User).where(User.id == user_id).values(rating=User.rating + delta))
+        rating = db.execute(select(User.rating).where(User.id == user_id)).scalar_one_or_none()
+        db.commit()
+        return rating
+    finally:
+        db.close()
+
+
+class SessionChannel:
+    """Одно соединение /ws/session: чтение кадров, heartbeat, пачечная запись"""
+
+    def __init__(self, websocket: WebSocket) -> None:
+        self.websocket = websocket
+        self.inbox: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+        self.last_seen = time.monotonic()
+        self.session: Optional[LiveSession] = None
+
+    async def send(self, frame: dict) -> None:
+        WS_MESSAGES.inc("out", frame["type"])
+        await self.websocket.send_text(json.dumps(frame, ensure_ascii=False))
+
+    async def _reader(self) -> None:
+        try:
+            while True:
+                self.inbox.put_nowait(await self.websocket.receive_text())
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self.inbox.put_nowait(None)
+
+    async def receive(self, timeout: float) -> Optional[dict]:
+        """Следующий кадр; {} — таймаут, None — клиент отключился"""
+        try:
+            text = await asyncio.wait_for(self.inbox.get(), timeout)
+        except asyncio.TimeoutError:
+            return {}
+        if text is None:
+            return None
+        self.last_seen = time.monotonic()
+        try:
+            frame = json.loads(text)
+        except ValueError:
+            frame = None
+        if not isinstance(frame, dict):
+            frame = {"type": "invalid"}
+        WS_MESSAGES.inc("in", str(frame.get("type", "invalid"))[:16])
+        return frame
+
+    async def error(self, code: str, detail: str, event_id: Optional[str] = None, **extra) -> None:
+        await self.send({"type": "error", "code": code, "detail": detail, "id": event_id, **extra})
+
+    # ===== Установление сессии =====
+
+    async def handshake(self) -> bool:
+        frame = await self.receive(get_settings().ws_auth_timeout_sec)
+        if frame is None:
+            return False
+        if not frame:
+            await self.websocket.close(code=CLOSE_TIMEOUT, reason="auth timeout")
+            return False
+        try:
+            auth = AuthFrame.model_validate(frame)
+        except ValidationError:
+            await self.websocket.close(code=CLOSE_UNAUTHORIZED, reason="auth frame expected")
+            return False
+
+        # JWT и SELECT пользователя — один раз на соединение, а не на каждый подход
+        identity = await asyncio.to_thread(_authenticate, auth.token)
+        if identity is None:
+            await self.websocket.close(code=CLOSE_UNAUTHORIZED, reason="invalid token")
+            return False
+        principal, user_id, rating = identity
+
+        replay, resumed, replay_complete = [], False, True
+        if auth.resume is not None:
+            self.session = LiveSession.load(auth.resume.session_id, principal, get_settings().ws_replay_buffer)
+        if self.session is not None:
+            resumed = True
+            missed = self.session.missed_since(auth.resume.last_seq)
+            replay_complete = missed is not None
+            replay = missed or []
+            self.session.rating = rating
+            if self.session.pending_events:
+                # Очки прошлого соединения не успели записаться — дописываем сейчас
+                await self.flush(notify=False)
+        else:
+            self.session = LiveSession(principal, user_id, rating, replay_size=get_settings().ws_replay_buffer)
+
+        await self.send({
+            "type": "ready",
+            "session_id": self.session.session_id,
+            "resumed": resumed,
+            "seq": self.session.seq,
+            "rating": self.session.total_rating,
+            "heartbeat_sec": get_settings().ws_heartbeat_sec,
+            # False — часть кадров вытеснена из буфера, пропущенное берите через REST
+            "replay_complete": replay_complete,
+        })
+        for frame in replay:
+            await self.send(frame)
+        return True
+
+    # ===== События =====
+
+    async def complete(self, frame: dict) -> None:
+        session = self.session
+        event_id = frame.get("id") if isinstance(frame.get("id"), str) else None
+        try:
+            event = CompletionEvent.model_validate(frame)
+        except ValidationError as e:
+            await self.error("bad_request", str(e.errors(include_url=False)[0]["msg"]), event_id)
+            return
+
+        seen = session.seen_seq(event.id)
+        if seen is not None:
+            # Повтор после обрыва: очки уже начислены, отдаём прежний результат
+            previous = session.replay_frame(seen)
+            await self.send(previous if previous is not None else {"type": "ack", "id": event.id, "seq": seen})
+            return
+
+        try:
+            points = calculate_exercise_points(event.exercise_slug, reps=event.reps, seconds=event.seconds)
+        except ValueError as e:
+            await self.error("bad_request", str(e), event.id)
+            return
+
+        if get_settings().ratelimit_enabled:
+            # Квота общая с POST /coach/coach/comment: канал заменяет эти запросы.
+            # Списывается после проверки кадра — ошибочные события квоту не тратят
+            allowed, _, retry_after = COACH_COMMENT_LIMIT.take(session.principal)
+            if not allowed:
+                await self.error("rate_limited", "Слишком много событий", event.id,
+                                 retry_after=round(retry_after, 1))
+                return
+
+        comment = await self.coach_line(event)
+        await self.send(session.record(event.id, points, {
+            "exercise_slug": event.exercise_slug,
+            "comment": comment,
+            "style": event.style,
+        }))
+
+    async def coach_line(self, event: CompletionEvent) -> str:
+        if get_settings().coach_phrase_bank_enabled:
+            return get_phrase_bank().next_phrase(
+                phrase_key(self.session.principal),
+                style=event.style,
+                success=event.success,
+                progress=event.user_progress,
+                exercise=EXERCISES[event.exercise_slug].label,
+            )
+        with acting_as(self.session.principal):
+            return await generate_coach_comment_with_ai(
+                style=event.style,
+                exercise=EXERCISES[event.exercise_slug].label,
+                success=event.success,
+                progress=event.user_progress,
+            )
+
+    async def flush(self, notify: bool = True) -> None:
+        session = self.session
+        try:
+            await asyncio.to_thread(session.flush, _apply_points, get_settings().ws_resume_ttl_sec)
+        except Exception:
+            # БД недоступна — очки остаются в pending, попробуем при следующей записи
+            return
+        if notify:
+            await self.send({"type": "saved", "through_seq": session.saved_seq, "rating": session.rating})
+
+    # ===== Цикл соединения =====
+
+    async def run(self) -> None:
+        reader = asyncio.create_task(self._reader())
+        try:
+            if not await self.handshake():
+                return
+            await self.loop()
+        finally:
+            reader.cancel()
+            if self.session is not None:
+                await asyncio.to_thread(self._close_session)
+
+    def _close_session(self) -> None:
+        """Последняя запись очков и сохранение состояния для продолжения сессии"""
+        try:
+            self.session.flush(_apply_points)
+        except Exception:
+            pass  # очки останутся в состоянии и запишутся при продолжении сессии
+        self.session.save(get_settings().ws_resume_ttl_sec)
+
+    async def loop(self) -> None:
+        heartbeat = get_settings().ws_heartbeat_sec
+        last_ping = time.monotonic()
+        while True:
+            now = time.monotonic()
+            if now - self.last_seen > heartbeat * MISSED_HEARTBEATS:
+                await self.websocket.close(code=CLOSE_TIMEOUT, reason="heartbeat timeout")
+                return
+            wait = last_ping + heartbeat - now
+            if self.session.pending_events:
+                wait = min(wait, self.session.last_flush + get_settings().ws_flush_interval_sec - now)
+
+            frame = await self.receive(max(wait, 0.0))
+            if frame is None:
+                return
+            kind = frame.get("type")
+            if kind == "complete":
+                await self.complete(frame)
+            elif kind == "ping":
+                await self.send({"type": "pong", "ts": frame.get("ts")})
+            elif kind == "bye":
+                await self.flush()
+                await self.websocket.close(code=1000)
+                return
+            elif kind in ("pong", "ack") or not frame:
+                pass
+            else:
+                await self.error("bad_request", f"Неизвестный тип кадра: {kind}")
+
+            if self.session.flush_due(get_settings().ws_flush_interval_sec, get_settings().ws_flush_max_events):
+                await self.flush()
+            if time.monotonic() - last_ping >= heartbeat:
+                last_ping = time.monotonic()
+                await self.send({"type": "ping", "ts": int(time.time() * 1000)})
+
+
+@router.websocket("/ws/session")
+async def live_session(websocket: WebSocket):
+    """
+    Живая сессия тренировки: один auth на соединение, события выполнения
+    упражнений, в ответ — очки, рейтинг и реплика тренера; рейтинг пишется пачками.
+
+    Кадры (JSON):
+      → {"type": "auth", "token": "...", "resume": {"session_id": "...", "last_seq": 7}}
+      ← {"type": "ready", "session_id", "resumed", "seq", "rating", "heartbeat_sec", "replay_complete"}
+      → {"type": "complete", "id": "c-1", "exercise_slug": "pushup_standard", "reps": 12, "style": "soft"}
+      ← {"type": "result", "seq": 8, "id": "c-1", "points_earned", "total_rating", "comment", "style"}
+      ← {"type": "saved", "through_seq": 8, "rating"}     очки до seq включительно записаны в БД
+      ← {"type": "ping"} / → {"type": "pong"}              и наоборот; 3 пропуска — закрытие 4408
+      → {"type": "bye"}                                    записать очки и закрыть соединение
+    """
+    await websocket.accept()
+    WS_CONNECTIONS.inc()
+    try:
+        await SessionChannel(websocket).run()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        WS_CONNECTIONS.dec()
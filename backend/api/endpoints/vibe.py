@@ -1,8 +1,22 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException
 from typing import Optional
 from pydantic import BaseModel
-import httpx
-import os
+
+from backend.api.endpoints.workout import get_workout_prefetch
+from backend.core.config import get_settings
+from backend.core.metrics import record_fallback
+from backend.core.ratelimit import RateLimit, current_principal
+from backend.schemas.llm import VibeLLMOutput
+from backend.utils.llm_gateway import get_api_key
+from backend.utils.model_router import routed_completion
+from backend.services.vibeScoring import (
+    score_sliders,
+    combine_with_text,
+    recommend_intensity,
+    recommend_duration,
+)
 
 router = APIRouter()
 
@@ -12,6 +26,7 @@ class VibeAssessmentRequest(BaseModel):
     fatigue_level: Optional[int] = None
     stress_level: Optional[int] = None
     motivation_level: Optional[int] = None
+    fitness_level: str = "intermediate"  # для заготовки тренировки, как в WorkoutRequest
 
 
 class VibeAssessmentResponse(BaseModel):
@@ -21,72 +36,43 @@ class VibeAssessmentResponse(BaseModel):
     recommended_intensity: float
     coach_style_suggestion: str
     workout_duration_suggestion: int
+    decided_by: str = "llm"  # sliders, sliders+classifier, classifier, llm, fallback
+    workout_prefetch_token: Optional[str] = None  # передать в /workout/generate как prefetch_token
 
 
 async def analyze_with_ai(text: str) -> dict:
     """Анализирует состояние пользователя через AI API"""
-    api_key = os.getenv("OPENROUTER_API_KEY") or os.getenv("OPENAI_API_KEY")
-
-    if not api_key:
+    if not get_api_key():
         # Fallback на простую логику, если API ключ не установлен
+        record_fallback("vibe", "no_api_key")
         return fallback_analysis(text)
 
-    prompt = f"""Проанализируй состояние пользователя и определи режим тренировки:
-1. anti_stress - если усталость, стресс, нужна мягкая восстановительная тренировка
-2. rage - если агрессия, злость, нужна интенсивная силовая/кардио нагрузка  
-3. boost - если хорошее настроение, энергия, можно дать сложную тренировку
-4. neutral - если нормальное состояние, стандартная тренировка
-
-Описание пользователя: {text}
-
-Верни JSON: {{
-  "mode": "anti_stress|rage|boost|neutral",
-  "confidence": 0.85,
-  "description": "краткое описание состояния",
-  "recommended_intensity": 0.7,
-  "coach_style": "strict|soft|comedy|anime|balanced",
-  "workout_duration": 30
-}}"""
-
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "openai/gpt-3.5-turbo",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.3
-                }
-            )
-
-            if response.status_code == 200:
-                result = response.json()
-                content = result["choices"][0]["message"]["content"]
-
-                # Парсим JSON из ответа AI
-                import json
-                import re
-
-                # Ищем JSON в тексте ответа
-                json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                if json_match:
-                    ai_result = json.loads(json_match.group())
-                    return {
-                        "mode": ai_result.get("mode", "neutral"),
-                        "confidence": ai_result.get("confidence", 0.7),
-                        "description": ai_result.get("description", "Состояние определено"),
-                        "intensity": ai_result.get("recommended_intensity", 0.6),
-                        "coach_style": ai_result.get("coach_style", "balanced"),
-                        "duration": ai_result.get("workout_duration", 30)
-                    }
-
+        routed = await routed_completion("vibe_assess", temperature=0.3, schema=VibeLLMOutput, text=text)
+
+        if routed:
+            ai_result = routed.output
+            if get_settings().vibe_label_log_path:
+                from backend.services.vibeClassifier import log_labeled_example
+                # Запись в файл — в потоке, чтобы не держать event loop
+                await asyncio.to_thread(
+                    log_labeled_example, get_settings().vibe_label_log_path, text, ai_result.mode.value,
+                )
+            return {
+                "decided_by": "llm",
+                "mode": ai_result.mode.value,
+                "confidence": ai_result.confidence,
+                "description": ai_result.description,
+                "intensity": ai_result.recommended_intensity,
+                "coach_style": ai_result.coach_style,
+                "duration": ai_result.workout_duration
+            }
+
+        record_fallback("vibe", "bad_response")
         return fallback_analysis(text)
 
     except Exception:
+        record_fallback("vibe", "error")
         return fallback_analysis(text)
 
 
@@ -132,11 +118,89 @@ def fallback_analysis(text: str) -> dict:
         }
 
 
-@router.post("/vibe/assess", response_model=VibeAssessmentResponse)
+# Параметры тренировки по умолчанию для каждого режима
+MODE_PROFILES = {
+    "anti_stress": {"description": "Обнаружена усталость", "intensity": 0.3, "coach_style": "soft", "duration": 20},
+    "rage": {"description": "Обнаружен стресс", "intensity": 0.8, "coach_style": "strict", "duration": 30},
+    "boost": {"description": "Высокий уровень энергии", "intensity": 0.9, "coach_style": "comedy", "duration": 45},
+    "neutral": {"description": "Нормальное состояние", "intensity": 0.6, "coach_style": "balanced", "duration": 30},
+}
+
+
+def get_vibe_classifier():
+    """Модель (и numpy) грузятся, только если классификатор настроен"""
+    if not get_settings().vibe_classifier_path:
+        return None
+    from backend.services.vibeClassifier import get_vibe_classifier as load_classifier
+    return load_classifier()
+
+
+def classify_locally(text: str) -> Optional[dict]:
+    """Локальный классификатор без LLM; None, если модель не уверена"""
+    classifier = get_vibe_classifier()
+    if classifier is None or not text.strip():
+        return None
+
+    prediction = classifier.predict(text)
+    if not classifier.is_confident(prediction):
+        return None
+
+    return {
+        "decided_by": "classifier",
+        "mode": prediction.mode,
+        "confidence": prediction.confidence,
+        **MODE_PROFILES[prediction.mode],
+    }
+
+
+def score_numerically(request: VibeAssessmentRequest) -> Optional[dict]:
+    """Быстрый путь по слайдерам (с текстом, если есть локальный классификатор)"""
+    score = score_sliders(request.fatigue_level, request.stress_level, request.motivation_level)
+    if score is None:
+        return None
+
+    decided_by = "sliders"
+    if request.user_input.strip():
+        classifier = get_vibe_classifier()
+        if classifier is None:
+            # Текст без локальной модели оценить нельзя — пусть решает LLM
+            return None
+        text_prediction = classifier.predict(request.user_input)
+        score = combine_with_text(score, text_prediction.probabilities, get_settings().vibe_slider_text_weight)
+        decided_by = "sliders+classifier"
+
+    if score.confidence < get_settings().vibe_slider_threshold:
+        return None
+
+    profile = MODE_PROFILES[score.mode]
+    return {
+        "decided_by": decided_by,
+        "mode": score.mode,
+        "confidence": round(score.confidence, 2),
+        "description": profile["description"],
+        "intensity": recommend_intensity(profile["intensity"], score),
+        "coach_style": profile["coach_style"],
+        "duration": recommend_duration(profile["duration"], score),
+    }
+
+
+def start_workout_prefetch(result: dict, fitness_level: str) -> Optional[str]:
+    """Следующим шагом почти всегда /workout/generate — начинаем его генерацию заранее"""
+    if not get_settings().workout_prefetch_enabled or not get_api_key():
+        return None  # без LLM тренировка собирается мгновенно, заготавливать нечего
+    if not 10 <= result["duration"] <= 90:
+        return None
+    return get_workout_prefetch().start((result["mode"], result["duration"], fitness_level), current_principal())
+
+
+@router.post("/vibe/assess", response_model=VibeAssessmentResponse,
+             dependencies=[Depends(RateLimit("vibe_assess", per_minute=30, burst=10))])
 async def assess_current_vibe(request: VibeAssessmentRequest):
     """Оценивает состояние пользователя через AI"""
     try:
-        result = await analyze_with_ai(request.user_input)
+        result = score_numerically(request) or classify_locally(request.user_input)
+        if result is None:
+            result = await analyze_with_ai(request.user_input)
 
         return VibeAssessmentResponse(
             vibe_mode=result["mode"],
@@ -144,7 +208,9 @@ async def assess_current_vibe(request: VibeAssessmentRequest):
             mood_description=result["description"],
             recommended_intensity=result["intensity"],
             coach_style_suggestion=result["coach_style"],
-            workout_duration_suggestion=result["duration"]
+            workout_duration_suggestion=result["duration"],
+            decided_by=result.get("decided_by", "fallback"),
+            workout_prefetch_token=start_workout_prefetch(result, request.fitness_level)
         )
 
     except Exception as e:
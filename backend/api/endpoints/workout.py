@@ -1,16 +1,27 @@
 # api/endpoints/workout.py
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from typing import List, Literal, Optional
 from pydantic import BaseModel, Field
 from datetime import datetime
-import httpx
-import os
 
 from ...schemas.workout import CompleteExerciseRequest  # относительный импорт
 from ...utils.constants import calculate_exercise_points, EXERCISES  # относительный импорт
 from ...models.user import User  # относительный импорт
+from ...models.workout import Workout
 from ...core.auth import get_current_user  # относительный импорт
-from ...core.database import get_db  # относительный импорт
+from ...core.database import get_db, release_connection  # относительный импорт
+from ...api.endpoints.catalog import exercise_catalog
+from ...core.http_cache import not_modified_or
+from ...core.responses import json_response, model_response
+from ...core.config import get_settings
+from ...core.metrics import record_fallback
+from ...core.ratelimit import RateLimit, current_principal, resolve_principal
+from ...core.tracing import span
+from ...schemas.llm import WorkoutLLMOutput
+from ...services.workoutPrefetch import WorkoutPrefetcher
+from ...utils.ulid import new_ulid
+from ...utils.llm_gateway import get_api_key
+from ...utils.model_router import routed_completion
 from sqlalchemy.orm import Session
 
 router = APIRouter()
@@ -22,9 +33,11 @@ class WorkoutRequest(BaseModel):
     fitness_level: str = "intermediate"
     equipment: List[str] = ["bodyweight"]
     focus_areas: Optional[List[str]] = None
+    prefetch_token: Optional[str] = None  # из ответа /vibe/assess
 
 
 class Exercise(BaseModel):
+    slug: Optional[str] = None  # упражнение каталога; None — «своё»
     name: str
     duration_sec: int
     instructions: str
@@ -43,65 +56,71 @@ class WorkoutResponse(BaseModel):
     generated_at: datetime
 
 
-async def generate_workout_with_ai(vibe_mode: str, duration: int) -> dict:
-    """Генерирует тренировку через AI API"""
-    api_key = os.getenv("OPENROUTER_API_KEY") or os.getenv("OPENAI_API_KEY")
+WorkoutFormat = Literal["full", "compact"]
 
-    if not api_key:
-        return generate_fallback_workout(vibe_mode, duration)
+DIFFICULTY_CODES = {"easy": 1, "medium": 2, "hard": 3}
 
-    prompt = f"""Сгенерируй план тренировки на {duration} минут для режима: {vibe_mode}
-
-Режимы:
-- anti_stress: мягкая восстановительная тренировка, растяжка, дыхательные упражнения
-- rage: интенсивная силовая/кардио нагрузка, высокая интенсивность
-- boost: энергичная тренировка со сложными упражнениями
-- neutral: сбалансированная тренировка, средняя интенсивность
-
-Верни JSON структуру тренировки:
-{{
-  "intensity": 0.7,
-  "estimated_calories": 250,
-  "warm_up": [
-    {{"name": "название", "duration_sec": 180, "instructions": "описание", "difficulty": "easy"}}
-  ],
-  "main_block": [
-    {{"name": "название", "duration_sec": 300, "instructions": "описание", "difficulty": "medium"}}
-  ],
-  "cool_down": [
-    {{"name": "название", "duration_sec": 180, "instructions": "описание", "difficulty": "easy"}}
-  ]
-}}"""
+# Для планов без slug (сохранённые до workout_generate v2): название → slug каталога
+# по полному названию и его основе до скобок («Растяжка (ноги/спина/руки)» и
+# «Растяжка» → stretching)
+_SLUG_BY_NAME = {}
+for _cfg in EXERCISES.values():
+    _SLUG_BY_NAME.setdefault(_cfg.slug, _cfg.slug)
+    _SLUG_BY_NAME.setdefault(_cfg.label.lower(), _cfg.slug)
+    _SLUG_BY_NAME.setdefault(_cfg.label.split(" (")[0].lower(), _cfg.slug)
 
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://openrouter.ai/api/v1/chat/completions  ",
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "openai/gpt-3.5-turbo",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.4
-                }
-            )
 
-            if response.status_code == 200:
-                result = response.json()
-                content = result["choices"][0]["message"]["content"]
+def compact_exercise(exercise: dict) -> dict:
+    """Упражнение из каталога — slug и числа; остальные — с названием и инструкцией"""
+    compact = {
+        "duration_sec": exercise["duration_sec"],
+        "difficulty": DIFFICULTY_CODES.get(exercise.get("difficulty"), 2),
+    }
+    slug = exercise.get("slug") or _SLUG_BY_NAME.get(exercise["name"].strip().lower())
+    if slug is not None:
+        compact["slug"] = slug
+    else:
+        compact["name"] = exercise["name"]
+        compact["instructions"] = exercise["instructions"]
+    return compact
+
 
-                import json
-                import re
+def compact_workout(plan: dict) -> dict:
+    """
+    Компактный план: названия и тексты упражнений из каталога заменены slug'ами,
+    сложность — числом 1..3. Клиент берёт подписи из /catalog/exercises той же
+    версии (catalog_etag).
+    """
+    compact = {key: value for key, value in plan.items() if key not in ("warm_up", "main_block", "cool_down")}
+    for block in ("warm_up", "main_block", "cool_down"):
+        compact[block] = [compact_exercise(ex) for ex in plan[block]]
+    compact["catalog_etag"] = exercise_catalog.etag
+    return compact
+
+
+async def generate_workout_with_ai(vibe_mode: str, duration: int) -> dict:
+    """Генерирует тренировку через AI API"""
+    if not get_api_key():
+        record_fallback("workout", "no_api_key")
+        return generate_fallback_workout(vibe_mode, duration)
+
+    try:
+        routed = await routed_completion(
+            "workout_generate",
+            temperature=0.4,
+            schema=WorkoutLLMOutput,
+            duration=duration,
+            vibe_mode=vibe_mode,
+        )
 
-                json_match = re.search(r'\{.*\}', content, re.DOTALL)
-                if json_match:
-                    return json.loads(json_match.group())
+        if routed:
+            return routed.output.model_dump()
 
+        record_fallback("workout", "bad_response")
         return generate_fallback_workout(vibe_mode, duration)
 
     except Exception:
+        record_fallback("workout", "error")
         return generate_fallback_workout(vibe_mode, duration)
 
 
@@ -135,6 +154,7 @@ def generate_fallback_workout(vibe_mode: str, duration: int) -> dict:
         ],
         "cool_down": [
             {
+                "slug": "stretching",
                 "name": "Растяжка",
                 "duration_sec": 180,
                 "instructions": "Медленно растяните все мышцы",
@@ -144,30 +164,117 @@ def generate_fallback_workout(vibe_mode: str, duration: int) -> dict:
     }
 
 
-@router.post("/workout/generate", response_model=WorkoutResponse)
-async def generate_workout(request: WorkoutRequest):
-    """Генерирует персонализированную тренировку через AI"""
+_workout_prefetch: Optional[WorkoutPrefetcher] = None
+
+
+def get_workout_prefetch() -> WorkoutPrefetcher:
+    global _workout_prefetch
+    if _workout_prefetch is None:
+        settings = get_settings()
+        _workout_prefetch = WorkoutPrefetcher(
+            generate=generate_workout_with_ai,
+            ttl_sec=settings.workout_prefetch_ttl_sec,
+            max_inflight=settings.workout_prefetch_max_inflight,
+        )
+    return _workout_prefetch
+
+
+@router.post("/workout/generate", response_model=WorkoutResponse,
+             dependencies=[Depends(RateLimit("workout_generate", per_minute=10, burst=5))])
+async def generate_workout(
+        request: WorkoutRequest,
+        format: WorkoutFormat = Query("full", description="compact — slug'и упражнений вместо текстов"),
+        db: Session = Depends(get_db)
+):
+    """Генерирует персонализированную тренировку через AI и сохраняет план"""
     try:
-        ai_result = await generate_workout_with_ai(request.vibe_mode, request.duration_min)
-
-        workout_id = f"workout_{datetime.now().timestamp():.0f}"
-
-        return WorkoutResponse(
-            workout_id=workout_id,
-            vibe_mode=request.vibe_mode,
-            intensity=ai_result.get("intensity", 0.6),
-            total_duration_min=request.duration_min,
-            estimated_calories=ai_result.get("estimated_calories", 200),
-            warm_up=[Exercise(**ex) for ex in ai_result.get("warm_up", [])],
-            main_block=[Exercise(**ex) for ex in ai_result.get("main_block", [])],
-            cool_down=[Exercise(**ex) for ex in ai_result.get("cool_down", [])],
-            generated_at=datetime.now()
+        ai_result = None
+        if request.prefetch_token:
+            ai_result = await get_workout_prefetch().claim(
+                request.prefetch_token,
+                (request.vibe_mode, request.duration_min, request.fitness_level),
+                current_principal(),
+            )
+        if ai_result is None:
+            ai_result = await generate_workout_with_ai(request.vibe_mode, request.duration_min)
+
+        # Один проход валидации по всему плану вместо Exercise(**ex) на каждое упражнение
+        workout = WorkoutResponse.model_validate({
+            "workout_id": new_ulid(),
+            "vibe_mode": request.vibe_mode,
+            "intensity": ai_result.get("intensity", 0.6),
+            "total_duration_min": request.duration_min,
+            "estimated_calories": ai_result.get("estimated_calories", 200),
+            "warm_up": ai_result.get("warm_up", []),
+            "main_block": ai_result.get("main_block", []),
+            "cool_down": ai_result.get("cool_down", []),
+            "generated_at": datetime.now(),
+        })
+
+        record = Workout(
+            id=workout.workout_id,
+            owner=current_principal(),
+            vibe_mode=workout.vibe_mode,
+            duration_min=workout.total_duration_min,
         )
+        plan = workout.model_dump(mode="json")
+        record.set_plan(plan)
+        db.add(record)
+        db.commit()
+
+        if format == "compact":
+            return json_response(compact_workout(plan))
+        return model_response(workout)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+WORKOUT_FIELDS = tuple(WorkoutResponse.model_fields)
+
+
+@router.get("/workout/{workout_id}", response_model=None)
+async def get_workout(
+        workout_id: str,
+        request: Request,
+        fields: Optional[str] = Query(None, description="Поля через запятую, например main_block"),
+        format: WorkoutFormat = Query("full", description="compact — slug'и упражнений вместо текстов"),
+        db: Session = Depends(get_db)
+):
+    """Сохранённый план тренировки целиком или только выбранные поля"""
+    selected = None
+    if fields:
+        selected = sorted({f.strip() for f in fields.split(",") if f.strip()})
+        unknown = [f for f in selected if f not in WORKOUT_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Неизвестные поля: {', '.join(unknown)}")
+
+    record = db.get(Workout, workout_id)
+    release_connection(db)  # план неизменяем — дальше БД не нужна
+    # Планы пользователей видны только им; анонимные — любому, кто знает id:
+    # случайная часть ULID (80 бит из os.urandom) своя у каждого id, соседние не угадать
+    owner = record.owner or "" if record is not None else ""
+    if record is None or (owner.startswith("user:") and owner != resolve_principal(request)):
+        raise HTTPException(status_code=404, detail="Тренировка не найдена")
+
+    # План неизменяем: ETag — хеш плана плюс набор полей и формат
+    variant = "+".join(selected) if selected else ""
+    if format == "compact":
+        # Компактный ответ ссылается на каталог — его версия тоже часть ETag
+        compact = "compact." + exercise_catalog.etag.strip('"')[:8]
+        variant = f"{variant}~{compact}" if variant else compact
+    etag = f'"{record.etag}-{variant}"' if variant else f'"{record.etag}"'
+
+    def build():
+        plan = record.plan()
+        if format == "compact":
+            plan = compact_workout(plan)
+        body = {field: plan[field] for field in selected} if selected else plan
+        return json_response(body)
+
+    return not_modified_or(request, etag, {"Cache-Control": "private, max-age=86400"}, build)
+
+
 # === Новый endpoint для завершения упражнения ===
 @router.post("/workout/complete_exercise")
 async def complete_exercise(
@@ -194,18 +301,20 @@ async def complete_exercise(
         raise HTTPException(status_code=400, detail="Field 'seconds' is required for this exercise")
 
     try:
-        points = calculate_exercise_points(
-            slug=request.exercise_slug,
-            reps=reps,
-            seconds=seconds
-        )
+        with span("workout.scoring"):
+            points = calculate_exercise_points(
+                slug=request.exercise_slug,
+                reps=reps,
+                seconds=seconds
+            )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
     # Обновляем рейтинг пользователя
     current_user.rating += points
-    db.commit()
-    db.refresh(current_user)
+    # Фиксация без refresh: новая транзакция держала бы соединение до закрытия сессии
+    with span("db.commit"):
+        release_connection(db)
 
     return {
         "status": "success",
@@ -2,20 +2,24 @@
 Ядро приложения
 """
 
-from backend.core.config import settings
-from backend.core.database import (
-    Base,
-    engine,
-    SessionLocal,
-    get_db,
-    create_tables
-)
+import importlib
 
-__all__ = [
-    "settings",
-    "Base",
-    "engine",
-    "SessionLocal",
-    "get_db",
-    "create_tables"
-]
\ No newline at end of file
+# Экспорты загружаются при первом обращении: `import backend.core.metrics`
+# не должен тянуть за собой настройки и SQLAlchemy
+_EXPORTS = {
+    "settings": "backend.core.config",
+    "Base": "backend.core.database",
+    "engine": "backend.core.database",
+    "SessionLocal": "backend.core.database",
+    "get_db": "backend.core.database",
+    "create_tables": "backend.core.database",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module), name)
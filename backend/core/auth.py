@@ -3,13 +3,14 @@
 from datetime import datetime, timedelta
 from typing import Optional
 
-import hashlib
 from jose import JWTError, jwt
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
-from .database import get_db
+from .database import get_db, release_connection
+from .passwords import PasswordHasherBusy, get_password_hasher
+from .tracing import span
 from backend.models.user import User  # путь совпадает с твоей структурой
 
 # Настройки JWT
@@ -20,12 +21,30 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 security = HTTPBearer()
 
 
+# Синхронные варианты блокируют поток на время KDF — для скриптов и фоновых задач.
+# В обработчиках запросов используйте hash_password / authenticate_user.
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return hashlib.sha256(plain_password.encode()).hexdigest() == hashed_password
+    return get_password_hasher().verify_sync(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
+    return get_password_hasher().hash_sync(password)
+
+
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Сервис перегружен, повторите попытку",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def hash_password(password: str) -> str:
+    """bcrypt в пуле потоков, не блокируя event loop"""
+    try:
+        return await get_password_hasher().hash(password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -36,15 +55,39 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def authenticate_user(db: Session, email: str, password: str):
+async def authenticate_user(db: Session, email: str, password: str):
     user = db.query(User).filter(User.email == email).first()
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    release_connection(db)  # bcrypt — сотни миллисекунд, соединение пулу нужнее
+    try:
+        ok, new_hash = await get_password_hasher().verify(password, user.hashed_password)
+    except PasswordHasherBusy:
+        raise _hasher_busy()
+    if not ok:
         return False
+    if new_hash:
+        # Старый sha256 или устаревшая стоимость bcrypt — заменяем при входе
+        user.hashed_password = new_hash
+        db.commit()
     return user
 
 
+def user_from_token(db: Session, token: str) -> Optional[User]:
+    """Пользователь по access-токену; None — подпись, срок или пользователь не подходят"""
+    try:
+        with span("auth.jwt_decode"):
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    email: str = payload.get("sub")
+    if email is None:
+        return None
+
+    with span("auth.user_select"):
+        return db.query(User).filter(User.email == email).first()
+
+
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db),
@@ -58,20 +101,12 @@ def get_current_user(
     if credentials is None:
         raise credentials_exception
 
-    token = credentials.credentials
-
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-
-    user = db.query(User).filter(User.email == email).first()
+    user = user_from_token(db, credentials.credentials)
     if user is None:
         raise credentials_exception
 
+    # Пользователь загружен — соединение не держим до конца обработчика
+    release_connection(db)
     return user
 
 
@@ -81,3 +116,18 @@ def get_current_active_user(
     if not getattr(current_user, "is_active", True):
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
+
+
+# Простая проверка на админа (в реальном проекте нужна полноценная система ролей)
+ADMIN_EMAIL = "admin@example.com"
+
+
+def get_current_admin_user(
+    current_user = Depends(get_current_active_user),
+):
+    if current_user.email != ADMIN_EMAIL:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Недостаточно прав"
+        )
+    return current_user
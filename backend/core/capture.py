@@ -0,0 +1,235 @@
+"""
+Запись продакшен-трафика для последующего воспроизведения (benchmarks/replay.py).
+
+CaptureMiddleware сэмплирует запросы и пишет по строке JSON на запрос: маршрут,
+тело запроса, статус, размер ответа, латентность и время внешних вызовов
+(LLM, БД) по спанам трассировки. Записи обезличиваются: заголовки не пишутся,
+пользователь заменяется HMAC-псевдонимом, пароли и токены вырезаются,
+свободный текст маскируется с сохранением длины (чтобы не менялся бюджет токенов).
+
+Запись буферизуется и сбрасывается фоновой задачей в ротируемые файлы
+captures/capture-*.jsonl — ответ не ждёт диска.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import glob
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import time
+from typing import Any, List, Optional
+
+from backend.core import tracing
+from backend.core.metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+# Поля, которые не пишутся вовсе
+SECRET_FIELDS = {
+    "password", "new_password", "hashed_password", "token", "access_token", "refresh_token",
+    "prefetch_token",  # одноразовый токен заготовки тренировки из /vibe/assess
+}
+# Персональные данные — заменяются псевдонимом
+PERSONAL_FIELDS = {"email", "username"}
+# Свободный текст пользователя — маскируется с сохранением длины
+FREE_TEXT_FIELDS = {"user_input", "additional_context", "user_goals"}
+
+SKIP_PREFIXES = ("/metrics", "/health", "/api/admin", "/api/docs", "/api/redoc", "/openapi.json")
+
+MAX_BODY_BYTES = 64 * 1024
+
+
+def mask_text(text: str) -> str:
+    return "".join(ch if ch.isspace() else "x" for ch in text)
+
+
+class Anonymizer:
+    def __init__(self, salt: Optional[str] = None) -> None:
+        self._key = (salt or os.urandom(16).hex()).encode()
+
+    def pseudonym(self, value: str) -> str:
+        return hmac.new(self._key, value.encode(), hashlib.sha256).hexdigest()[:16]
+
+    def scrub(self, value: Any, field: Optional[str] = None) -> Any:
+        if isinstance(value, dict):
+            return {k: self.scrub(v, k) for k, v in value.items() if k not in SECRET_FIELDS}
+        if isinstance(value, list):
+            return [self.scrub(item, field) for item in value]
+        if isinstance(value, str):
+            if field in PERSONAL_FIELDS:
+                return f"anon-{self.pseudonym(value)}"
+            if field in FREE_TEXT_FIELDS:
+                return mask_text(value)
+        return value
+
+
+def _file_pid(path: str) -> Optional[int]:
+    """pid воркера из имени capture-<время>-<pid>.jsonl"""
+    stem = os.path.basename(path)[:-len(".jsonl")]
+    pid = stem.rsplit("-", 1)[-1]
+    return int(pid) if pid.isdigit() else None
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        return True  # на Windows os.kill(pid, 0) посылает CTRL_C_EVENT — чужие файлы не трогаем
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class CaptureWriter:
+    """Буфер записей + одна фоновая задача, пишущая в ротируемые JSONL-файлы"""
+
+    def __init__(self, directory: str, max_bytes: int = 50 * 1024 * 1024, backup_count: int = 10,
+                 flush_interval: float = 1.0, max_buffer: int = 10000) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._buffer: List[str] = []
+        self._worker: Optional[asyncio.Task] = None
+        self._path: Optional[str] = None
+        self.dropped = 0
+
+    def submit(self, record: dict) -> None:
+        if len(self._buffer) >= self.max_buffer:
+            self.dropped += 1  # диск не успевает — теряем запись, а не память
+            return
+        self._buffer.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while self._buffer:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self._buffer:
+            return
+        lines, self._buffer = self._buffer, []
+        try:
+            await asyncio.to_thread(self._write, lines)
+        except Exception:
+            logger.exception("Не удалось записать %d записей трафика", len(lines))
+
+    def _write(self, lines: List[str]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        if self._path is None or (os.path.exists(self._path) and os.path.getsize(self._path) >= self.max_bytes):
+            self._rotate()
+        with open(self._path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def _rotate(self) -> None:
+        # Имя с временем и pid: воркеры пишут в свои файлы, не мешая друг другу
+        pid = os.getpid()
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        self._path = os.path.join(self.directory, f"capture-{stamp}-{pid}.jsonl")
+        # Удаляем только свои файлы и файлы завершённых воркеров (gunicorn перезапускает
+        # их по max_requests) — в файлы живых воркеров ещё идёт запись
+        files = []
+        for path in glob.glob(os.path.join(self.directory, "capture-*.jsonl")):
+            owner = _file_pid(path)
+            if owner == pid or (owner is not None and not _pid_alive(owner)):
+                try:
+                    files.append((os.path.getmtime(path), path))
+                except FileNotFoundError:
+                    pass  # соседний воркер уже удалил
+        files.sort()
+        for _, old in files[:max(len(files) - self.backup_count, 0)]:
+            try:
+                os.remove(old)
+            except FileNotFoundError:
+                pass
+
+
+class CaptureMiddleware:
+    """ASGI-middleware записи трафика; ставится внутрь TracingMiddleware"""
+
+    def __init__(self, app, sample_rate: float, writer: CaptureWriter,
+                 anonymizer: Optional[Anonymizer] = None) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+        self.writer = writer
+        self.anonymizer = anonymizer or Anonymizer()
+
+    def _should_capture(self, scope) -> bool:
+        if scope["type"] != "http" or scope["path"].startswith(SKIP_PREFIXES):
+            return False
+        return random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if not self._should_capture(scope):
+            await self.app(scope, receive, send)
+            return
+
+        body = bytearray()
+        status_code = 500
+        response_bytes = 0
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request" and len(body) <= MAX_BODY_BYTES:
+                body.extend(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        started = time.perf_counter()
+        with tracing.ensure_trace() as trace:
+            try:
+                await self.app(scope, receive_wrapper, send_wrapper)
+            finally:
+                latency_ms = (time.perf_counter() - started) * 1000
+                self.writer.submit(self._record(scope, bytes(body), status_code, response_bytes, latency_ms, trace))
+
+    def _principal(self, scope) -> Optional[str]:
+        auth = dict(scope["headers"]).get(b"authorization")
+        return self.anonymizer.pseudonym(auth.decode("latin-1")) if auth else None
+
+    def _request_body(self, body: bytes) -> Any:
+        if not body:
+            return None
+        if len(body) > MAX_BODY_BYTES:
+            return {"_truncated": len(body)}
+        try:
+            return self.anonymizer.scrub(json.loads(body))
+        except ValueError:
+            return {"_non_json": len(body)}
+
+    def _record(self, scope, body: bytes, status: int, response_bytes: int, latency_ms: float,
+                trace: tracing.Trace) -> dict:
+        upstream = {
+            name: {"count": len(durations), "ms": round(sum(durations), 3)}
+            for name, durations in tracing.span_totals(trace).items()
+        }
+        return {
+            "ts": time.time(),
+            "method": scope["method"],
+            "route": route_template(scope),
+            "path": scope["path"],
+            "query": scope.get("query_string", b"").decode("latin-1"),
+            "principal": self._principal(scope),
+            "body": self._request_body(body),
+            "status": status,
+            "response_bytes": response_bytes,
+            "latency_ms": round(latency_ms, 3),
+            "upstream": upstream,
+        }
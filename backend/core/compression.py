@@ -0,0 +1,190 @@
+"""
+Сжатие ответов по Accept-Encoding: brotli (если установлен пакет brotli) или gzip.
+
+Сжимаются только текстовые типы (JSON, text/*) от порога размера: на мелких
+ответах заголовки gzip съедают выигрыш. Потоковые ответы сжимаются по частям;
+text/event-stream не сжимается — буфер компрессора задерживал бы события.
+Сильный ETag при сжатии становится слабым: байты на проводе уже другие (RFC 9110).
+Раз кодировка выбрана, слабым он становится и в 304, и в несжатом ответе ниже
+порога — 304 обязан нести тот же валидатор, что и полный ответ на тот же запрос.
+"""
+
+from __future__ import annotations
+
+import zlib
+from typing import List, Optional, Tuple
+
+from backend.core.metrics import RESPONSE_BYTES
+
+try:
+    import brotli
+except ImportError:  # необязательная зависимость
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+SKIP_TYPES = ("text/event-stream",)
+
+
+def parse_accept_encoding(header: str) -> dict:
+    """{"br": 1.0, "gzip": 0.8, ...}; кодировки с q=0 отбрасываются"""
+    result = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            result[name] = q
+    return result
+
+
+def choose_encoding(header: Optional[str]) -> Optional[str]:
+    if not header:
+        return None
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    candidates = []
+    # При равном q предпочитаем brotli: он плотнее на текстах
+    if brotli is not None:
+        candidates.append((accepted.get("br", wildcard), 1, "br"))
+    candidates.append((accepted.get("gzip", wildcard), 0, "gzip"))
+    q, _, encoding = max(candidates)
+    return encoding if q > 0 else None
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int) -> None:
+        if encoding == "br":
+            self._impl = brotli.Compressor(quality=brotli_quality)
+            self._process, self._finish = self._impl.process, self._impl.finish
+        else:
+            self._impl = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)  # 31 — формат gzip
+            self._process, self._finish = self._impl.compress, self._impl.flush
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._process(data) if data else b""
+        return out + self._finish() if final else out
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _with_vary(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    """Vary: Accept-Encoding, дописанный к уже имеющемуся Vary"""
+    result, vary = [], None
+    for key, value in headers:
+        if key.lower() == b"vary":
+            vary = value
+            continue
+        result.append((key, value))
+    if vary is None:
+        vary = b"Accept-Encoding"
+    elif b"accept-encoding" not in vary.lower() and vary.strip() != b"*":
+        vary += b", Accept-Encoding"
+    result.append((b"vary", vary))
+    return result
+
+
+def _weak_etag(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    return [
+        (key, b"W/" + value if key.lower() == b"etag" and not value.startswith(b"W/") else value)
+        for key, value in headers
+    ]
+
+
+class CompressionMiddleware:
+    """ASGI-middleware сжатия; ставится снаружи кэша ответов, чтобы кэш хранил несжатые тела"""
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept = _header(scope["headers"], b"accept-encoding")
+        encoding = choose_encoding(accept.decode("latin-1") if accept else None)
+
+        start_message = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = message.get("headers", [])
+                content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+                if message["status"] == 304:
+                    # 304 повторяет Vary и ETag полного ответа, иначе кэш склеит варианты
+                    passthrough = True
+                    if encoding is not None:
+                        headers = _weak_etag(headers)
+                    await send({**message, "headers": _with_vary(headers)})
+                    return
+                if (_header(headers, b"content-encoding") is not None
+                        or not content_type.startswith(COMPRESSIBLE_TYPES)
+                        or content_type.startswith(SKIP_TYPES)):
+                    passthrough = True
+                    await send(message)
+                    return
+                if encoding is None:
+                    # Несжатый ответ тоже зависит от Accept-Encoding: кэшу нужен Vary
+                    passthrough = True
+                    await send({**message, "headers": _with_vary(headers)})
+                    return
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            first = compressor is None
+            if first:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    headers = _weak_etag(start_message.get("headers", []))
+                    await send({**start_message, "headers": _with_vary(headers)})
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+
+            compressed = compressor.compress(body, final=not more_body)
+            RESPONSE_BYTES.inc(encoding, "identity", amount=len(body))
+            RESPONSE_BYTES.inc(encoding, encoding, amount=len(compressed))
+            if first:
+                # Ответ целиком в одном сообщении — длина известна; иначе chunked
+                length = None if more_body else len(compressed)
+                await send({**start_message, "headers": self._headers(start_message, encoding, length)})
+            await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _headers(start_message, encoding: str, length: Optional[int]) -> List[Tuple[bytes, bytes]]:
+        headers = [
+            (key, value) for key, value in _weak_etag(start_message.get("headers", []))
+            if key.lower() != b"content-length"
+        ]
+        headers.append((b"content-encoding", encoding.encode("latin-1")))
+        if length is not None:
+            headers.append((b"content-length", str(length).encode("latin-1")))
+        return _with_vary(headers)
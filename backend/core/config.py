@@ -1,3 +1,6 @@
+from functools import lru_cache
+from typing import Dict, List, Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -13,9 +16,104 @@ class Settings(BaseSettings):
 
     debug: bool = True
 
+    # LLM-шлюз (utils/llm_gateway.py)
+    openrouter_base_url: str = "https://openrouter.ai/api/v1"
+    llm_timeout_sec: float = 5.0
+
 
     # URL базы данных
     database_url: str = "sqlite:///./neurocoach.db"
+    db_pool_size: int = 5
+    db_max_overflow: int = 10            # сверх pool_size под пиковую нагрузку
+    db_pool_timeout_sec: float = 30.0    # ожидание свободного соединения
+    db_pool_recycle_sec: int = 1800      # пересоздавать соединения старше; -1 — никогда
+    db_pool_pre_ping: bool = False       # проверка соединения при выдаче; для сетевых СУБД
+
+    # Локальный классификатор вайба (services/vibeClassifier.py)
+    vibe_classifier_path: Optional[str] = None  # .npz с весами; None — только LLM
+    vibe_classifier_threshold: float = 0.75     # ниже — эскалация в LLM
+    vibe_label_log_path: Optional[str] = None   # куда писать пары (текст, метка LLM)
+
+    # Числовой быстрый путь по слайдерам (services/vibeScoring.py)
+    vibe_slider_threshold: float = 0.6   # уверенность, при которой слайдеры решают без LLM
+    vibe_slider_text_weight: float = 0.5  # вес текстового классификатора при смешивании
+
+    # Банк реплик тренера (services/phraseBank.py)
+    coach_phrase_bank_enabled: bool = True
+    coach_phrase_low_water: int = 8     # ниже — фоновое пополнение пула
+    coach_phrase_batch_size: int = 20   # реплик за один запрос к LLM
+
+    # Трассировка (core/tracing.py)
+    tracing_sample_rate: float = 0.0           # доля запросов; x-trace: <profiling_token> — для одного запроса
+    tracing_export_path: Optional[str] = None  # JSONL с трассами в формате OTLP/JSON
+    tracing_export_url: Optional[str] = None   # OTLP/HTTP коллектор, например http://localhost:4318/v1/traces
+
+    # Профилирование (core/profiling.py)
+    profiling_token: Optional[str] = None  # секрет для заголовка x-profile; None — профиль запроса выключен
+    profiling_max_seconds: int = 60
+
+    # Продакшен-сервер (python run.py --prod, gunicorn.conf.py)
+    server_host: str = "0.0.0.0"
+    server_port: int = 8000
+    server_workers: Optional[int] = None     # None — по числу ядер
+    server_backlog: int = 2048               # очередь соединений ядра (listen backlog)
+    server_keepalive_sec: int = 5            # keep-alive; за балансировщиком — больше его idle timeout
+    server_graceful_timeout_sec: int = 30    # сколько ждать завершения запросов после SIGTERM
+
+    # Общий для воркеров кэш (core/shared_cache.py)
+    shared_cache_path: Optional[str] = None  # файл SQLite; None — кэш в памяти каждого воркера
+
+    # Запись трафика для воспроизведения (core/capture.py, benchmarks/replay.py)
+    capture_sample_rate: float = 0.0     # доля записываемых запросов; 0 — выключено
+    capture_dir: str = "captures"        # ротируемые JSONL-файлы
+    capture_max_file_mb: int = 50
+    capture_backup_count: int = 10
+    capture_salt: Optional[str] = None   # соль псевдонимов пользователей; None — своя на каждый запуск
+
+    # Хеширование паролей (core/passwords.py)
+    password_bcrypt_rounds: int = 12
+    password_hash_workers: Optional[int] = None  # потоков KDF; None — min(4, число ядер)
+    password_hash_max_concurrency: int = 4       # одновременных KDF на воркер
+    password_hash_max_waiting: int = 64          # больше ожидающих — 503 вместо очереди
+
+    # Ограничение частоты и квота LLM (core/ratelimit.py)
+    ratelimit_enabled: bool = True
+    ratelimit_store_path: Optional[str] = None  # SQLite общий для воркеров; None — shared_cache_path или память
+    llm_daily_token_quota: int = 200000         # токенов на пользователя в сутки (UTC); 0 — без ограничения
+
+    # Лестницы моделей по задачам (utils/model_router.py)
+    model_ladders: Dict[str, List[str]] = {}  # переопределения, JSON: {"vibe_assess": ["openai/gpt-4.1-mini"]}
+
+    # Заготовка тренировки во время оценки вайба (services/workoutPrefetch.py)
+    workout_prefetch_enabled: bool = True
+    workout_prefetch_ttl_sec: int = 300      # сколько ждать /workout/generate с токеном
+    workout_prefetch_max_inflight: int = 100  # фоновых генераций на воркер
+
+    # Условные GET и кэш ответов (core/http_cache.py)
+    http_cache_enabled: bool = True
+
+    # Сжатие ответов (core/compression.py)
+    compression_enabled: bool = True
+    compression_min_size: int = 1024      # байт; меньше — без сжатия
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 5   # 0-11; выше 6 заметно дороже по CPU
+
+    # Очередь фоновых задач (core/jobs.py)
+    jobs_db_path: str = "jobs.db"         # SQLite, общий для воркеров хоста
+    jobs_workers: int = 2                 # воркеров очереди на процесс; 0 — только постановка
+    jobs_max_attempts: int = 3
+    jobs_backoff_base_sec: float = 2.0    # задержка повтора: base * 2^(попытка-1)
+    jobs_lease_sec: float = 120.0         # после — задачу упавшего воркера берёт другой
+    jobs_dedup_ttl_sec: float = 600.0     # тот же вход — та же задача, пока она свежая
+    jobs_retention_sec: float = 86400.0
+
+    # Живая сессия тренировки по WebSocket (api/endpoints/session.py)
+    ws_auth_timeout_sec: float = 10.0     # первый кадр auth должен прийти за это время
+    ws_heartbeat_sec: float = 20.0        # ping сервера; тишина 3 интервала — соединение закрывается
+    ws_flush_interval_sec: float = 2.0    # очки пишутся в БД не чаще...
+    ws_flush_max_events: int = 20         # ...или когда накопилось столько событий
+    ws_resume_ttl_sec: int = 300          # сколько после обрыва можно продолжить сессию
+    ws_replay_buffer: int = 100           # последних кадров result для повтора
 
     # Настройки pydantic-settings
     model_config = SettingsConfigDict(
@@ -24,7 +122,17 @@ class Settings(BaseSettings):
     )
 
 
-# Глобальный объект настроек
-settings = Settings()
+@lru_cache
+def get_settings() -> Settings:
+    """Настройки читаются из окружения и .env один раз — при первом обращении"""
+    return Settings()
+
+
+def __getattr__(name: str):
+    # Совместимость для скриптов: `from backend.core.config import settings` создаёт
+    # объект уже в момент импорта. Модули приложения импортируют get_settings и
+    # вызывают его там, где настройка нужна, — тогда импорт их не строит Settings
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-print("DEBUG KEY:", bool(settings.openrouter_api_key))
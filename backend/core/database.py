@@ -1,23 +1,100 @@
+import time
+from functools import lru_cache
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from backend.core.config import settings
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+from backend.core.config import get_settings
+from backend.core import metrics, tracing
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool с метриками: ожидание свободного соединения, таймауты, занятость пула"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            metrics.DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            metrics.DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+        self._report()
+        return connection
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._report()
+
+    def _report(self) -> None:
+        checked_out = self.checkedout()
+        metrics.DB_POOL_CONNECTIONS.set(checked_out, "checked_out")
+        metrics.DB_POOL_CONNECTIONS.set(self.checkedin(), "idle")
+        metrics.DB_POOL_CONNECTIONS.set(max(self.overflow(), 0), "overflow")
+        capacity = self.size() + max(self._max_overflow, 0)
+        metrics.DB_POOL_UTILIZATION.set(checked_out / capacity if capacity else 0.0)
+
+
+def engine_options(database_url: str) -> dict:
+    """Параметры пула из настроек; SQLite в памяти живёт в одном соединении — пул не трогаем"""
+    url = make_url(database_url)
+    options = {}
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if url.database in (None, "", ":memory:"):
+            return options
+    settings = get_settings()
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_sec,
+        pool_recycle=settings.db_pool_recycle_sec,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+    return options
+
+
+@lru_cache
+def get_engine() -> Engine:
+    """Движок БД создаётся при первом обращении, а не при импорте модуля"""
+    database_url = get_settings().database_url
+    engine = create_engine(database_url, **engine_options(database_url))
+    metrics.instrument_engine(engine)
+    tracing.instrument_engine(engine)
+    return engine
 
-# Создание движка базы данных
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False}  # Только для SQLite
-)
 
-# Создание фабрики сессий
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def __getattr__(name: str):
+    # `from backend.core.database import engine` работает как раньше, см. config.settings
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
+
+
+def SessionLocal() -> Session:
+    """Новая сессия БД (фабрика сессий, привязанная к ленивому движку)"""
+    return _session_factory(bind=get_engine())
 
 # Базовый класс для моделей
 Base = declarative_base()
 
 
 def get_db():
-    """Dependency для получения сессии БД"""
+    """
+    Dependency для получения сессии БД.
+
+    Сессия ленивая: соединение берётся из пула при первом запросе к БД, так что
+    обработчик, которому сессия не понадобилась, пул не занимает.
+    """
     db = SessionLocal()
     try:
         yield db
@@ -25,6 +102,25 @@ def get_db():
         db.close()
 
 
+def release_connection(db: Session) -> None:
+    """
+    Вернуть соединение в пул перед долгим await (LLM, хеширование пароля).
+
+    Текущая транзакция фиксируется, загруженные объекты остаются в сессии и не
+    истекают — их можно читать и менять дальше; следующий запрос к БД возьмёт
+    соединение заново.
+    """
+    if not db.in_transaction():
+        return
+    expire_on_commit = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        db.commit()
+    finally:
+        db.expire_on_commit = expire_on_commit
+
+
 def create_tables():
-    """Создание таблиц в БД"""
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    """Создание таблиц в БД (python -m backend.migrate; при импорте приложения не вызывается)"""
+    import backend.models  # noqa: F401 — регистрирует модели в Base.metadata
+    Base.metadata.create_all(bind=get_engine())
\ No newline at end of file
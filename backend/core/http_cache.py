@@ -0,0 +1,205 @@
+"""
+HTTP-кэширование: ETag, Cache-Control и условные GET.
+
+- PrecomputedResponse — статичный документ (каталог упражнений): сериализуется
+  один раз при старте, сильный ETag по содержимому, If-None-Match → 304.
+- HTTPCacheMiddleware — для идемпотентных GET по префиксам из политик: слабый
+  ETag по телу ответа, 304 вместо тела, Cache-Control из политики и, если у
+  политики ttl > 0, небольшой кэш готовых ответов в памяти воркера.
+  Ответы, у которых обработчик уже выставил ETag, middleware не трогает.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import Request, Response
+
+from backend.core.metrics import HTTP_CACHE_EVENTS
+from backend.core.responses import dumps
+
+MAX_CACHED_BODY_BYTES = 256 * 1024
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match: список тегов через запятую, W/-префикс, либо *; сравнение слабое (RFC 9110)"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+def strong_etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def weak_etag(body: bytes) -> str:
+    return f'W/"{hashlib.sha1(body).hexdigest()[:16]}"'
+
+
+def not_modified_or(request: Request, etag: str, headers: dict, build) -> Response:
+    """304, если у клиента та же версия; иначе build() — тело строится только при необходимости"""
+    headers = {"ETag": etag, **headers}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        HTTP_CACHE_EVENTS.inc("not_modified")
+        return Response(status_code=304, headers=headers)
+    response = build()
+    response.headers.update(headers)
+    return response
+
+
+class PrecomputedResponse:
+    """JSON-документ, сериализованный один раз; ответ — готовые байты и сильный ETag"""
+
+    def __init__(self, document: Any, cache_control: str = "public, max-age=3600") -> None:
+        self.body = dumps(document)
+        self.etag = strong_etag(self.body)
+        self.cache_control = cache_control
+
+    def respond(self, request: Request) -> Response:
+        return not_modified_or(
+            request, self.etag, {"Cache-Control": self.cache_control},
+            lambda: Response(content=self.body, media_type="application/json"),
+        )
+
+
+# ===== Middleware для GET =====
+
+@dataclass(frozen=True)
+class CachePolicy:
+    prefix: str
+    cache_control: str = "private, no-cache"  # no-cache — хранить можно, но сверять по ETag
+    ttl: float = 0.0                          # > 0 — держать готовый ответ в памяти воркера
+    max_entries: int = 256
+
+
+class _ResponseCache:
+    def __init__(self) -> None:
+        self._items: "OrderedDict[Tuple, Tuple[float, int, List[Tuple[bytes, bytes]], bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if item[0] < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return item
+
+    def put(self, key: Tuple, ttl: float, status: int, headers, body: bytes, max_entries: int) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic() + ttl, status, headers, body)
+            self._items.move_to_end(key)
+            while len(self._items) > max_entries:
+                self._items.popitem(last=False)
+
+
+def _header(headers: Iterable[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class HTTPCacheMiddleware:
+    """ASGI-middleware: слабые ETag, 304 и кэш ответов для GET по префиксам политик"""
+
+    def __init__(self, app, policies: Sequence[CachePolicy]) -> None:
+        self.app = app
+        # Длинные префиксы — первыми: /api/catalog/exercises точнее /api/catalog
+        self.policies = sorted(policies, key=lambda p: len(p.prefix), reverse=True)
+        self._cache = _ResponseCache()
+
+    def _policy(self, scope) -> Optional[CachePolicy]:
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return None
+        for policy in self.policies:
+            if scope["path"].startswith(policy.prefix):
+                return policy
+        return None
+
+    async def __call__(self, scope, receive, send):
+        policy = self._policy(scope)
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = scope["headers"]
+        if_none_match = _header(request_headers, b"if-none-match")
+        if_none_match = if_none_match.decode("latin-1") if if_none_match else None
+        # Ответ может зависеть от пользователя — ключ включает заголовок авторизации
+        auth = _header(request_headers, b"authorization") or b""
+        key = (scope["path"], scope.get("query_string", b""), hashlib.sha1(auth).digest())
+
+        if policy.ttl:
+            cached = self._cache.get(key)
+            if cached is not None:
+                _, status, headers, body = cached
+                HTTP_CACHE_EVENTS.inc("hit")
+                await self._send(send, status, headers, body, if_none_match)
+                return
+
+        start_message = None
+        body = bytearray()
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                # Свой ETag у обработчика или не 200 — отдаём как есть
+                if message["status"] != 200 or _header(message.get("headers", []), b"etag") is not None:
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = message
+                return
+            if message["type"] == "http.response.body":
+                body.extend(message.get("body", b""))
+                if len(body) > MAX_CACHED_BODY_BYTES:
+                    passthrough = True  # слишком большой ответ — без ETag, потоком
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": bytes(body),
+                                "more_body": message.get("more_body", False)})
+                    return
+                if not message.get("more_body", False):
+                    headers = [(k, v) for k, v in start_message.get("headers", [])
+                               if k.lower() not in (b"content-length", b"cache-control")]
+                    payload = bytes(body)
+                    headers += [
+                        (b"etag", weak_etag(payload).encode("latin-1")),
+                        (b"cache-control", policy.cache_control.encode("latin-1")),
+                    ]
+                    if policy.ttl:
+                        self._cache.put(key, policy.ttl, 200, headers, payload, policy.max_entries)
+                        HTTP_CACHE_EVENTS.inc("store")
+                    else:
+                        HTTP_CACHE_EVENTS.inc("miss")
+                    await self._send(send, 200, headers, payload, if_none_match)
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    async def _send(send, status: int, headers, body: bytes, if_none_match: Optional[str]) -> None:
+        etag = _header(headers, b"etag").decode("latin-1")
+        if etag_matches(if_none_match, etag):
+            HTTP_CACHE_EVENTS.inc("not_modified")
+            headers = [(k, v) for k, v in headers if k.lower() not in (b"content-type", b"content-length")]
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        headers = headers + [(b"content-length", str(len(body)).encode("latin-1"))]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
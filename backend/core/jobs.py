@@ -0,0 +1,510 @@
+"""
+Очередь фоновых задач в SQLite: долгие LLM-задачи (анализ профиля, прогноз)
+выполняются вне запроса.
+
+- submit() кладёт задачу в таблицу jobs и возвращает её ULID; повторная отправка
+  тех же входных данных тем же пользователем, пока задача в работе или недавно
+  выполнена, возвращает существующую задачу (dedup по хешу входа).
+- JobWorkers — пул воркеров процесса: захват задачи атомарен (BEGIN IMMEDIATE),
+  на время выполнения ставится аренда и продлевается, пока обработчик работает;
+  если процесс упал, по истечении аренды задачу подхватит другой воркер. Итог
+  пишется, только если аренда всё ещё своя. Ошибка — повтор с экспоненциальной
+  задержкой, после max_attempts задача становится failed.
+- wait() ждёт завершения: в своём процессе — по событию, между процессами —
+  опросом таблицы.
+
+Файл общий для всех воркеров хоста (как SHARED_CACHE_PATH), задачи переживают
+перезапуск. Методы JobQueue синхронные (busy_timeout до 2 с) — из async-кода их
+вызывают через asyncio.to_thread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from backend.core.metrics import JOB_LATENCY, JOB_QUEUE_DEPTH, JOBS_TOTAL
+from backend.core.ratelimit import acting_as
+from backend.utils.ulid import new_ulid
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+TERMINAL = (DONE, FAILED)
+
+Handler = Callable[[dict], Awaitable[dict]]
+
+
+@dataclass
+class JobKind:
+    handler: Handler
+    max_attempts: Optional[int]  # None — JobQueue.max_attempts (JOBS_MAX_ATTEMPTS)
+
+
+JOB_KINDS: Dict[str, JobKind] = {}
+
+
+def register_job(kind: str, handler: Handler, max_attempts: Optional[int] = None) -> None:
+    """Обработчик задач вида kind: async (payload) -> dict с результатом"""
+    # Регистрация идёт при импорте роутеров — настройки здесь не читаем
+    JOB_KINDS[kind] = JobKind(handler, max_attempts)
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    status: str
+    owner: Optional[str]
+    payload: dict
+    attempts: int
+    max_attempts: int
+    created: float
+    started: Optional[float]
+    finished: Optional[float]
+    result: Optional[dict]
+    error: Optional[str]
+    lease_until: Optional[float] = None  # аренда, выставленная этим воркером
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "Job":
+        return cls(
+            id=row["id"], kind=row["kind"], status=row["status"], owner=row["owner"],
+            payload=json.loads(row["payload"]), attempts=row["attempts"], max_attempts=row["max_attempts"],
+            created=row["created"], started=row["started"], finished=row["finished"],
+            result=json.loads(row["result"]) if row["result"] else None, error=row["error"],
+            lease_until=row["lease_until"],
+        )
+
+
+def input_hash(kind: str, payload: dict, owner: Optional[str]) -> str:
+    canonical = json.dumps([kind, owner, payload], ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        status TEXT NOT NULL,
+        owner TEXT,
+        input_hash TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL,
+        run_at REAL NOT NULL,
+        lease_until REAL,
+        created REAL NOT NULL,
+        started REAL,
+        finished REAL,
+        result TEXT,
+        error TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, run_at)",
+    "CREATE INDEX IF NOT EXISTS jobs_input ON jobs (input_hash, created)",
+)
+
+
+class JobQueue:
+    def __init__(self, path: str, lease_sec: float = 120.0, backoff_base_sec: float = 2.0,
+                 dedup_ttl_sec: float = 600.0, retention_sec: float = 86400.0, max_attempts: int = 3) -> None:
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease_sec = lease_sec
+        self.backoff_base_sec = backoff_base_sec
+        self.dedup_ttl_sec = dedup_ttl_sec
+        self.retention_sec = retention_sec
+        self._local = threading.local()
+        # У каждого ожидающего своё событие: SSE и Prefer: wait могут ждать одну задачу
+        self._finished: Dict[str, Set[asyncio.Event]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        # Loop, на котором ждут wait() и воркеры: submit/complete могут идти из потоков
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        conn = self._connect()
+        for statement in _SCHEMA:
+            conn.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=2000")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, fn):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    # ----- постановка и чтение -----
+
+    def submit(self, kind: str, payload: dict, owner: Optional[str] = None) -> tuple:
+        """(job_id, created); created=False — вернули уже существующую задачу с тем же входом"""
+        spec = JOB_KINDS[kind]
+        digest = input_hash(kind, payload, owner)
+        now = time.time()
+
+        def run(conn):
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE input_hash = ? AND (status IN (?, ?) OR (status = ? AND finished > ?))"
+                " ORDER BY created DESC LIMIT 1",
+                (digest, QUEUED, RUNNING, DONE, now - self.dedup_ttl_sec),
+            ).fetchone()
+            if row is not None:
+                return row["id"], False
+            job_id = new_ulid()
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, owner, input_hash, payload, max_attempts, run_at, created)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, owner, digest, json.dumps(payload, ensure_ascii=False),
+                 spec.max_attempts or self.max_attempts, now, now),
+            )
+            return job_id, True
+
+        job_id, created = self._transaction(run)
+        JOBS_TOTAL.inc(kind, "submitted" if created else "deduplicated")
+        if created and self._wakeup is not None:
+            self._call_soon(self._wakeup.set)
+        return job_id, created
+
+    def get(self, job_id: str) -> Optional[Job]:
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_row(row) if row else None
+
+    async def wait(self, job_id: str, timeout: float, poll_interval: float = 0.5) -> Optional[Job]:
+        """Ждёт завершения не дольше timeout; возвращает задачу в текущем состоянии"""
+        deadline = time.monotonic() + timeout
+        self._loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        self._finished.setdefault(job_id, set()).add(event)
+        try:
+            while True:
+                job = await asyncio.to_thread(self.get, job_id)
+                remaining = deadline - time.monotonic()
+                if job is None or job.status in TERMINAL or remaining <= 0:
+                    return job
+                try:
+                    await asyncio.wait_for(event.wait(), min(poll_interval, remaining))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            waiters = self._finished.get(job_id)
+            if waiters is not None:
+                waiters.discard(event)
+                if not waiters:
+                    del self._finished[job_id]
+
+    # ----- выполнение -----
+
+    def claim(self) -> Optional[Job]:
+        """Берёт готовую задачу (или задачу с истёкшей арендой) и продлевает аренду"""
+        now = time.time()
+
+        def run(conn):
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE (status = ? AND run_at <= ?)"
+                " OR (status = ? AND lease_until < ? AND attempts < max_attempts)"
+                " ORDER BY run_at LIMIT 1",
+                (QUEUED, now, RUNNING, now),
+            ).fetchone()
+            if row is None:
+                return None
+            lease_until = now + self.lease_sec
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_until = ?, started = ? WHERE id = ?",
+                (RUNNING, lease_until, now, row["id"]),
+            )
+            job = Job.from_row(row)
+            job.status, job.attempts, job.started, job.lease_until = RUNNING, job.attempts + 1, now, lease_until
+            return job
+
+        job = self._transaction(run)
+        if job is not None:
+            JOB_LATENCY.observe(job.started - job.created, job.kind, "queued")
+        return job
+
+    # Итог и продление пишутся, только пока аренда своя: если задачу уже перехватил
+    # другой воркер (аренда истекла), её lease_until другой и UPDATE ничего не меняет
+
+    _OWN_LEASE = " WHERE id = ? AND status = ? AND lease_until = ?"
+
+    def _own(self, job: Job) -> tuple:
+        return job.id, RUNNING, job.lease_until
+
+    def renew(self, job: Job) -> bool:
+        """Продлевает аренду; False — аренду уже перехватил другой воркер"""
+        lease_until = time.time() + self.lease_sec
+        cursor = self._connect().execute(
+            "UPDATE jobs SET lease_until = ?" + self._OWN_LEASE, (lease_until, *self._own(job)),
+        )
+        if cursor.rowcount:
+            job.lease_until = lease_until
+        return cursor.rowcount > 0
+
+    def complete(self, job: Job, result: dict) -> bool:
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = ?, result = ?, finished = ?, lease_until = NULL, error = NULL" + self._OWN_LEASE,
+            (DONE, json.dumps(result, ensure_ascii=False), now, *self._own(job)),
+        )
+        if not cursor.rowcount:
+            return False
+        JOBS_TOTAL.inc(job.kind, DONE)
+        JOB_LATENCY.observe(now - job.started, job.kind, "run")
+        JOB_LATENCY.observe(now - job.created, job.kind, "total")
+        self._notify(job.id)
+        return True
+
+    def fail(self, job: Job, error: str) -> bool:
+        """Повтор с задержкой base * 2^(попытка-1) ± 25%, после последней попытки — failed"""
+        now = time.time()
+        if job.attempts < job.max_attempts:
+            delay = self.backoff_base_sec * 2 ** (job.attempts - 1) * random.uniform(0.75, 1.25)
+            cursor = self._connect().execute(
+                "UPDATE jobs SET status = ?, run_at = ?, lease_until = NULL, error = ?" + self._OWN_LEASE,
+                (QUEUED, now + delay, error, *self._own(job)),
+            )
+            if cursor.rowcount:
+                JOBS_TOTAL.inc(job.kind, "retried")
+            return cursor.rowcount > 0
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = ?, finished = ?, lease_until = NULL, error = ?" + self._OWN_LEASE,
+            (FAILED, now, error, *self._own(job)),
+        )
+        if not cursor.rowcount:
+            return False
+        JOBS_TOTAL.inc(job.kind, FAILED)
+        JOB_LATENCY.observe(now - job.created, job.kind, "total")
+        self._notify(job.id)
+        return True
+
+    def release(self, job: Job) -> bool:
+        """Вернуть задачу в очередь без траты попытки (остановка воркера)"""
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = ?, attempts = attempts - 1, run_at = ?, lease_until = NULL" + self._OWN_LEASE,
+            (QUEUED, time.time(), *self._own(job)),
+        )
+        return cursor.rowcount > 0
+
+    def _call_soon(self, callback, *args) -> None:
+        """callback на loop очереди — из любого потока"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            callback(*args)
+        else:
+            loop.call_soon_threadsafe(callback, *args)
+
+    def _notify(self, job_id: str) -> None:
+        self._call_soon(self._wake_waiters, job_id)
+
+    def _wake_waiters(self, job_id: str) -> None:
+        for event in self._finished.pop(job_id, ()):
+            event.set()
+
+    # ----- обслуживание -----
+
+    def refresh_depth(self) -> None:
+        rows = self._connect().execute(
+            "SELECT kind, status, COUNT(*) AS n FROM jobs WHERE status IN (?, ?) GROUP BY kind, status",
+            (QUEUED, RUNNING),
+        ).fetchall()
+        counts = {(row["kind"], row["status"]): row["n"] for row in rows}
+        for kind in JOB_KINDS:
+            for status in (QUEUED, RUNNING):
+                JOB_QUEUE_DEPTH.set(counts.get((kind, status), 0), kind, status)
+
+    def expire_leases(self) -> int:
+        """Задачи, чей воркер падал на каждой попытке, — failed, а не вечно running"""
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = ?, finished = ?, lease_until = NULL, error = ?"
+            " WHERE status = ? AND lease_until < ? AND attempts >= max_attempts",
+            (FAILED, now, "Истекла аренда на последней попытке", RUNNING, now),
+        )
+        return cursor.rowcount
+
+    def purge(self) -> int:
+        cursor = self._connect().execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND finished < ?",
+            (DONE, FAILED, time.time() - self.retention_sec),
+        )
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        rows = self._connect().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+class JobWorkers:
+    """Пул воркеров процесса; запускается в lifespan приложения"""
+
+    # Итог задачи пишется с повторами: «database is locked» не должен его терять
+    FINISH_ATTEMPTS = 5
+
+    def __init__(self, queue: JobQueue, concurrency: int = 2, poll_interval: float = 1.0,
+                 maintenance_interval: float = 15.0) -> None:
+        self.queue = queue
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.maintenance_interval = maintenance_interval
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        self.queue._loop = loop
+        self.queue._wakeup = asyncio.Event()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.concurrency)]
+        self._tasks.append(loop.create_task(self._maintenance()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self.queue._wakeup = None
+
+    async def _worker(self) -> None:
+        wakeup = self.queue._wakeup
+        while True:
+            try:
+                try:
+                    job = await asyncio.to_thread(self.queue.claim)
+                except sqlite3.OperationalError:
+                    logger.warning("Очередь задач занята, повтор позже", exc_info=True)
+                    job = None
+                if job is None:
+                    wakeup.clear()
+                    try:
+                        await asyncio.wait_for(wakeup.wait(), self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self.run(job)
+            except Exception:
+                # Воркер живёт до остановки процесса: сбой одной итерации его не завершает
+                logger.exception("Сбой воркера очереди задач")
+                await asyncio.sleep(self.poll_interval)
+
+    async def run(self, job: Job) -> None:
+        spec = JOB_KINDS.get(job.kind)
+        if spec is None:
+            await self._finish(self.queue.fail, job, f"Неизвестный вид задачи: {job.kind}")
+            return
+        # Квота LLM расходуется от имени того, кто поставил задачу
+        with acting_as(job.owner):
+            task = asyncio.ensure_future(spec.handler(job.payload))
+        stop = asyncio.Event()
+        heartbeat = asyncio.ensure_future(self._heartbeat(job, task, stop))
+        error = None
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            stop.set()
+            if await heartbeat:
+                # Остановка процесса: задачу выполнит другой воркер
+                await self._finish(self.queue.release, job)
+                raise
+            return  # аренду перехватили — итог запишет новый владелец
+        except Exception as e:
+            logger.exception("Задача %s (%s) завершилась ошибкой", job.id, job.kind)
+            error = f"{type(e).__name__}: {e}"
+        stop.set()
+        if not await heartbeat:
+            return
+        if error is not None:
+            await self._finish(self.queue.fail, job, error)
+        else:
+            await self._finish(self.queue.complete, job, result)
+
+    async def _heartbeat(self, job: Job, task: asyncio.Future, stop: asyncio.Event) -> bool:
+        """
+        Продлевает аренду каждую треть lease_sec, пока не выставлен stop.
+        False — аренду перехватил другой воркер: обработчик отменён.
+        """
+        interval = self.queue.lease_sec / 3
+        while True:
+            try:
+                await asyncio.wait_for(stop.wait(), interval)
+                return True
+            except asyncio.TimeoutError:
+                pass
+            try:
+                renewed = await asyncio.to_thread(self.queue.renew, job)
+            except sqlite3.OperationalError:
+                logger.warning("Не удалось продлить аренду задачи %s", job.id, exc_info=True)
+                continue
+            if not renewed:
+                logger.warning("Аренда задачи %s (%s) перешла к другому воркеру", job.id, job.kind)
+                task.cancel()
+                return False
+
+    async def _finish(self, operation: Callable[..., bool], job: Job, *args) -> None:
+        """complete / fail / release в потоке, с повтором при занятой БД"""
+        for attempt in range(self.FINISH_ATTEMPTS):
+            try:
+                if not await asyncio.to_thread(operation, job, *args):
+                    logger.warning("Задача %s: аренда уже не наша, итог не записан", job.id)
+                return
+            except sqlite3.OperationalError:
+                if attempt == self.FINISH_ATTEMPTS - 1:
+                    # Задача останется running и после аренды вернётся в работу
+                    logger.exception("Задача %s: итог не записан", job.id)
+                    return
+                logger.warning("Очередь задач занята, повтор записи итога %s", job.id, exc_info=True)
+                await asyncio.sleep(min(0.2 * 2 ** attempt, 2.0))
+
+    def _maintain(self) -> None:
+        self.queue.expire_leases()
+        self.queue.refresh_depth()
+        self.queue.purge()
+
+    async def _maintenance(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self._maintain)
+            except sqlite3.OperationalError:
+                logger.warning("Не удалось обслужить очередь задач", exc_info=True)
+            await asyncio.sleep(self.maintenance_interval)
+
+
+_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    global _queue
+    if _queue is None:
+        from backend.core.config import settings
+
+        _queue = JobQueue(
+            settings.jobs_db_path,
+            lease_sec=settings.jobs_lease_sec,
+            backoff_base_sec=settings.jobs_backoff_base_sec,
+            dedup_ttl_sec=settings.jobs_dedup_ttl_sec,
+            retention_sec=settings.jobs_retention_sec,
+            max_attempts=settings.jobs_max_attempts,
+        )
+    return _queue
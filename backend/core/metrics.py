@@ -0,0 +1,335 @@
+"""
+Метрики в формате Prometheus (text exposition 0.0.4) без внешних зависимостей.
+
+Счётчики, гистограммы и gauge с метками; ASGI-middleware для латентности
+маршрутов, хуки SQLAlchemy для времени запросов к БД и монитор задержки event loop.
+Накладные расходы — словарь и bisect на наблюдение, можно держать включённым в проде.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Секунды: от быстрых SQL-запросов до многосекундных ответов LLM
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in list(self._values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [счётчики по корзинам (+Inf последняя), сумма]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames, labels, 'le="%s"' % bound)
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            cumulative += counts[-1]
+            bucket_labels = _format_labels(self.labelnames, labels, 'le="+Inf"')
+            yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# ===== Метрики приложения =====
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Латентность HTTP-запросов", ("route", "method", "status"),
+)
+LLM_REQUEST_DURATION = Histogram(
+    "llm_request_duration_seconds", "Латентность запросов к LLM", ("endpoint", "model", "outcome"),
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "Токены LLM по полю usage", ("endpoint", "model", "kind"),
+)
+FALLBACK_HITS = Counter(
+    "fallback_total", "Ответы из резервной логики вместо LLM", ("endpoint", "reason"),
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "Время выполнения SQL-запросов", ("operation",),
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds", "Время KDF в пуле потоков", ("operation",),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0),
+)
+PASSWORD_HASH_WAIT = Histogram(
+    "password_hash_wait_seconds", "Ожидание свободного слота KDF",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+PASSWORD_HASH_EVENTS = Counter(
+    "password_hash_events_total", "Перехеширования и отказы KDF", ("event",),
+)
+RATE_LIMIT_REJECTIONS = Counter(
+    "rate_limit_rejections_total", "Запросы, отклонённые ограничителем частоты", ("route", "principal_kind"),
+)
+LLM_QUOTA_DEGRADED = Counter(
+    "llm_quota_degraded_total", "Вызовы LLM, пропущенные из-за дневной квоты токенов", ("prompt",),
+)
+MODEL_ROUTE_OUTCOMES = Counter(
+    "model_route_outcomes_total", "Исходы попыток по ступеням лестницы моделей", ("task", "model", "outcome"),
+)
+LLM_COST = Counter(
+    "llm_cost_usd_total", "Оценка стоимости вызовов LLM по прайсу моделей", ("task", "model"),
+)
+WORKOUT_PREFETCH = Counter(
+    "workout_prefetch_total", "Спекулятивные генерации тренировок и их использование", ("outcome",),
+)
+HTTP_CACHE_EVENTS = Counter(
+    "http_cache_events_total", "Условные GET и кэш ответов", ("event",),
+)
+RESPONSE_BYTES = Counter(
+    "http_response_bytes_total", "Байты ответов до и после сжатия", ("encoding", "kind"),
+)
+JOBS_TOTAL = Counter(
+    "jobs_total", "Фоновые задачи по исходам", ("kind", "outcome"),
+)
+JOB_QUEUE_DEPTH = Gauge(
+    "job_queue_depth", "Задачи в очереди и в работе", ("kind", "status"),
+)
+JOB_LATENCY = Histogram(
+    "job_latency_seconds", "Время задачи: ожидание в очереди, выполнение, всего", ("kind", "stage"),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0),
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Ожидание свободного соединения в пуле",
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total", "Соединение не дождались за pool_timeout",
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections", "Соединения пула по состоянию", ("state",),
+)
+DB_POOL_UTILIZATION = Gauge(
+    "db_pool_utilization", "Доля занятых соединений от pool_size + max_overflow",
+)
+WS_CONNECTIONS = Gauge(
+    "ws_session_connections", "Открытые соединения /ws/session",
+)
+WS_MESSAGES = Counter(
+    "ws_session_messages_total", "Кадры /ws/session по направлению и типу", ("direction", "type"),
+)
+WS_FLUSH_BATCH = Histogram(
+    "ws_session_flush_events", "Событий выполнения в одной записи рейтинга",
+    buckets=(1, 2, 5, 10, 20, 50, 100),
+)
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "Задержка пробуждения event loop",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+
+def record_fallback(endpoint: str, reason: str) -> None:
+    FALLBACK_HITS.inc(endpoint, reason)
+
+
+def record_llm_call(endpoint: str, model: str, outcome: str, duration: float, usage: Optional[dict] = None) -> None:
+    LLM_REQUEST_DURATION.observe(duration, endpoint, model, outcome)
+    if usage:
+        for kind in ("prompt_tokens", "completion_tokens"):
+            if usage.get(kind):
+                LLM_TOKENS.inc(endpoint, model, kind, amount=usage[kind])
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+        if cached:
+            LLM_TOKENS.inc(endpoint, model, "cached_tokens", amount=cached)
+
+
+# ===== HTTP =====
+
+def route_template(scope) -> str:
+    """
+    Шаблон пути маршрута (/api/workout/{id}), а не сам путь — иначе id раздуют число серий.
+    Новые FastAPI кладут полный путь подключённого роутера в scope["fastapi"].
+    """
+    context = (scope.get("fastapi") or {}).get("effective_route_context")
+    path = getattr(context, "path", None) or getattr(scope.get("route"), "path", None)
+    return path or "<unmatched>"
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: латентность по шаблону маршрута и статусу"""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start, route_template(scope), scope["method"], str(status_code)
+            )
+
+
+# ===== БД =====
+
+def instrument_engine(engine) -> None:
+    """Вешает на движок SQLAlchemy хуки замера времени запросов"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement else "UNKNOWN"
+        DB_QUERY_DURATION.observe(time.perf_counter() - started, operation)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+
+# ===== Event loop =====
+
+async def monitor_event_loop_lag(interval: float = 0.5) -> None:
+    """Засыпает на interval и меряет, насколько позже loop нас разбудил"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(loop.time() - expected, 0.0))
@@ -0,0 +1,140 @@
+"""
+Хеширование паролей без блокировки event loop.
+
+bcrypt стоит ~100-300 мс CPU на вызов: выполненный прямо в async-обработчике,
+он останавливает все запросы воркера. Здесь KDF уходит в отдельный пул потоков
+(bcrypt отпускает GIL), число одновременных вычислений ограничено семафором,
+а при переполнении очереди вход отклоняется сразу (503), а не копит задержку.
+
+Старые хеши (sha256 без соли) распознаются и после успешного входа
+прозрачно заменяются на bcrypt.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+import bcrypt
+
+from backend.core.metrics import PASSWORD_HASH_DURATION, PASSWORD_HASH_EVENTS, PASSWORD_HASH_WAIT
+
+_LEGACY_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+_BCRYPT_RE = re.compile(r"^\$2[aby]\$(\d{2})\$")
+
+# bcrypt учитывает только первые 72 байта; длинные пароли предварительно сжимаются
+BCRYPT_MAX_BYTES = 72
+
+
+class PasswordHasherBusy(Exception):
+    """Слишком много ожидающих проверок пароля на этом воркере"""
+
+
+def _secret(password: str) -> bytes:
+    raw = password.encode("utf-8")
+    if len(raw) > BCRYPT_MAX_BYTES:
+        return base64.b64encode(hashlib.sha256(raw).digest())
+    return raw
+
+
+def is_legacy_hash(hashed: str) -> bool:
+    return bool(_LEGACY_SHA256_RE.match(hashed or ""))
+
+
+class PasswordHasher:
+    def __init__(self, rounds: int = 12, max_workers: Optional[int] = None,
+                 max_concurrency: int = 4, max_waiting: int = 64) -> None:
+        self.rounds = rounds
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_concurrency = max_concurrency
+        self.max_waiting = max_waiting
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+
+    # ===== Синхронное ядро (выполняется в пуле) =====
+
+    def hash_sync(self, password: str) -> str:
+        return bcrypt.hashpw(_secret(password), bcrypt.gensalt(self.rounds)).decode("ascii")
+
+    def verify_sync(self, password: str, hashed: str) -> bool:
+        if is_legacy_hash(hashed):
+            candidate = hashlib.sha256(password.encode()).hexdigest()
+            return hmac.compare_digest(candidate, hashed)
+        try:
+            return bcrypt.checkpw(_secret(password), hashed.encode("ascii"))
+        except ValueError:
+            return False
+
+    def needs_rehash(self, hashed: str) -> bool:
+        if is_legacy_hash(hashed):
+            return True
+        match = _BCRYPT_RE.match(hashed or "")
+        return match is None or int(match.group(1)) < self.rounds
+
+    # ===== Асинхронный интерфейс =====
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="password-kdf")
+        return self._executor
+
+    async def _run(self, operation: str, fn, *args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self._waiting >= self.max_waiting:
+            PASSWORD_HASH_EVENTS.inc("rejected")
+            raise PasswordHasherBusy()
+
+        self._waiting += 1
+        queued = time.perf_counter()
+        try:
+            async with self._semaphore:
+                PASSWORD_HASH_WAIT.observe(time.perf_counter() - queued)
+                started = time.perf_counter()
+                result = await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+                PASSWORD_HASH_DURATION.observe(time.perf_counter() - started, operation)
+                return result
+        finally:
+            self._waiting -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", self.hash_sync, password)
+
+    async def verify(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """(пароль верен, новый хеш — если старый пора заменить)"""
+        operation = "verify_legacy" if is_legacy_hash(hashed) else "verify"
+        ok = await self._run(operation, self.verify_sync, password, hashed)
+        if not ok or not self.needs_rehash(hashed):
+            return ok, None
+        PASSWORD_HASH_EVENTS.inc("rehash")
+        return ok, await self.hash(password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+_hasher: Optional[PasswordHasher] = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    global _hasher
+    if _hasher is None:
+        from backend.core.config import settings
+
+        _hasher = PasswordHasher(
+            rounds=settings.password_bcrypt_rounds,
+            max_workers=settings.password_hash_workers,
+            max_concurrency=settings.password_hash_max_concurrency,
+            max_waiting=settings.password_hash_max_waiting,
+        )
+    return _hasher
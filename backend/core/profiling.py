@@ -0,0 +1,180 @@
+"""
+Профилирование живого процесса по запросу администратора.
+
+- StackSampler: статистический сэмплер стеков всех потоков (sys._current_frames)
+  на ограниченное время; результат — collapsed stacks или JSON для speedscope.
+- ProfilingMiddleware: cProfile для одного запроса с заголовком x-profile,
+  результат доступен администратору по id. Подключается, только если задан
+  profiling_token — в простое накладных расходов нет вовсе.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+Stack = Tuple[str, ...]
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Сэмплер стеков: раз в interval снимает стеки всех потоков, кроме своего"""
+
+    _lock = threading.Lock()  # одновременно — не больше одного сэмплера на процесс
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.total = 0
+
+    @classmethod
+    def busy(cls) -> bool:
+        return cls._lock.locked()
+
+    def run(self, duration: float) -> "StackSampler":
+        """Блокирующий запуск: вызывать из отдельного потока (asyncio.to_thread)"""
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("Профилирование уже запущено")
+        try:
+            own = threading.get_ident()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            deadline = time.monotonic() + duration
+            while time.monotonic() < deadline:
+                for ident, frame in sys._current_frames().items():
+                    if ident == own:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    stack.append(f"thread:{names.get(ident, ident)}")
+                    self.samples[tuple(reversed(stack))] += 1
+                self.total += 1
+                time.sleep(self.interval)
+        finally:
+            self._lock.release()
+        return self
+
+    def collapsed(self) -> str:
+        """Формат collapsed stacks (flamegraph.pl, speedscope, inferno)"""
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in self.samples.most_common())
+
+    def speedscope(self, name: str = "NeuroCoach") -> dict:
+        """JSON в формате https://www.speedscope.app/file-format-schema.json"""
+        frames: List[dict] = []
+        index: Dict[str, int] = {}
+        samples: List[List[int]] = []
+        weights: List[float] = []
+        interval_ms = self.interval * 1000
+
+        for stack, count in self.samples.items():
+            indices = []
+            for label in stack:
+                if label not in index:
+                    index[label] = len(frames)
+                    frames.append({"name": label})
+                indices.append(index[label])
+            samples.append(indices)
+            weights.append(count * interval_ms)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+            "exporter": "backend.core.profiling",
+        }
+
+
+# ===== Профиль одного запроса =====
+
+class RequestProfiles:
+    """Последние профили запросов (ограниченное кольцо по id)"""
+
+    def __init__(self, capacity: int = 50) -> None:
+        self.capacity = capacity
+        self._items: "OrderedDict[str, dict]" = OrderedDict()
+
+    def add(self, profile_id: str, profile: dict) -> None:
+        self._items[profile_id] = profile
+        while len(self._items) > self.capacity:
+            self._items.popitem(last=False)
+
+    def get(self, profile_id: str) -> Optional[dict]:
+        return self._items.get(profile_id)
+
+
+request_profiles = RequestProfiles()
+
+
+def _pstats_text(profiler: cProfile.Profile, limit: int = 50) -> str:
+    buffer = io.StringIO()
+    stats = pstats.Stats(profiler, stream=buffer)
+    stats.sort_stats("cumulative").print_stats(limit)
+    return buffer.getvalue()
+
+
+class ProfilingMiddleware:
+    """
+    cProfile для запросов с заголовком x-profile: <profiling_token>.
+    Профиль пишется по потоку event loop, поэтому в него попадают и соседние
+    корутины — для точной картины профилируйте на ненагруженном воркере.
+    """
+
+    def __init__(self, app, token: str) -> None:
+        self.app = app
+        self.token = token.encode()
+        self._active = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._active:
+            await self.app(scope, receive, send)
+            return
+
+        if dict(scope["headers"]).get(b"x-profile") != self.token:
+            await self.app(scope, receive, send)
+            return
+
+        profiler = cProfile.Profile()
+        profile_id = uuid.uuid4().hex
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        self._active = True
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            self._active = False
+            request_profiles.add(profile_id, {
+                "method": scope["method"],
+                "path": scope["path"],
+                "duration_ms": (time.perf_counter() - started) * 1000,
+                "stats": _pstats_text(profiler),
+            })
@@ -0,0 +1,229 @@
+"""
+Ограничение частоты запросов и дневная квота токенов LLM.
+
+- RateLimit: зависимость FastAPI с token bucket на пару (пользователь, маршрут).
+  Пользователь — sub из JWT, без токена — IP клиента. Превышение — 429 с Retry-After.
+- Квота: сколько токенов LLM пользователь потратил за сутки (UTC). После
+  исчерпания шлюз не ходит в LLM, и эндпоинт отвечает резервной логикой —
+  пользователь не получает ошибку, а бюджет OpenRouter не тратится.
+
+Состояние бакетов — в памяти процесса или, при RATELIMIT_STORE_PATH
+(или SHARED_CACHE_PATH), в SQLite, общем для воркеров. Хранилище — протокол take(); Redis-бэкенд подключается
+так же. Квота считается через shared_cache.get_cache().
+"""
+
+from __future__ import annotations
+
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Iterator, Optional, Protocol, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+from jose import JWTError, jwt
+
+from backend.core.metrics import LLM_QUOTA_DEGRADED, RATE_LIMIT_REJECTIONS
+
+# Кто сейчас обращается к LLM; выставляет RateLimit, читает шлюз
+_principal: ContextVar[Optional[str]] = ContextVar("principal", default=None)
+
+
+# ===== Хранилища бакетов =====
+
+class BucketStore(Protocol):
+    def take(self, key: str, rate: float, burst: int, cost: float = 1.0) -> Tuple[bool, float, float]:
+        """(разрешено, осталось токенов, через сколько секунд появится нужное количество)"""
+
+
+def _refill(tokens: float, updated: float, now: float, rate: float, burst: int) -> float:
+    return min(float(burst), tokens + (now - updated) * rate)
+
+
+def _decide(tokens: float, rate: float, cost: float) -> Tuple[bool, float, float]:
+    if tokens >= cost:
+        return True, tokens - cost, 0.0
+    return False, tokens, (cost - tokens) / rate
+
+
+class MemoryBucketStore:
+    def __init__(self, max_keys: int = 100000) -> None:
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: int, cost: float = 1.0) -> Tuple[bool, float, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (float(burst), now))
+            allowed, tokens, retry_after = _decide(_refill(tokens, updated, now, rate, burst), rate, cost)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, tokens, retry_after
+
+
+class SQLiteBucketStore:
+    """Бакеты в SQLite-файле: один лимит на всех воркеров хоста"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=2000")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, rate: float, burst: int, cost: float = 1.0) -> Tuple[bool, float, float]:
+        now = time.time()  # общее время для процессов — не monotonic
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens = _refill(*row, now, rate, burst) if row else float(burst)
+            allowed, tokens, retry_after = _decide(tokens, rate, cost)
+            conn.execute("INSERT OR REPLACE INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                         (key, tokens, now))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, tokens, retry_after
+
+
+_store: Optional[BucketStore] = None
+
+
+def get_bucket_store() -> BucketStore:
+    global _store
+    if _store is None:
+        from backend.core.config import settings
+
+        path = settings.ratelimit_store_path or settings.shared_cache_path
+        _store = SQLiteBucketStore(path) if path else MemoryBucketStore()
+    return _store
+
+
+# ===== Кто обращается =====
+
+def resolve_principal(request: Request) -> str:
+    """user:<email> по JWT (подпись проверяется, БД не трогаем) или ip:<адрес>"""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        from backend.core.auth import ALGORITHM, SECRET_KEY
+
+        try:
+            subject = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+        except JWTError:
+            subject = None
+        if subject:
+            return f"user:{subject}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def current_principal() -> Optional[str]:
+    return _principal.get()
+
+
+@contextmanager
+def acting_as(principal: Optional[str]) -> Iterator[None]:
+    """Фоновая работа от имени того, кто её поставил (очередь задач)"""
+    token = _principal.set(principal)
+    try:
+        yield
+    finally:
+        _principal.reset(token)
+
+
+def as_system():
+    """Фоновая работа (пополнение банка реплик) не расходует квоту пользователя"""
+    return acting_as(None)
+
+
+# ===== Зависимость для маршрутов =====
+
+class RateLimit:
+    """
+    Depends(RateLimit("vibe_assess", per_minute=30, burst=10)) — token bucket
+    на пару (пользователь, маршрут); заодно выставляет пользователя для учёта квоты.
+    """
+
+    def __init__(self, name: str, per_minute: float, burst: int) -> None:
+        self.name = name
+        self.rate = per_minute / 60.0
+        self.burst = burst
+
+    def take(self, principal: str) -> Tuple[bool, float, float]:
+        """Списывает токен из ведра principal вне HTTP-запроса (например, кадр WebSocket)"""
+        allowed, remaining, retry_after = get_bucket_store().take(
+            f"{self.name}:{principal}", self.rate, self.burst,
+        )
+        if not allowed:
+            RATE_LIMIT_REJECTIONS.inc(self.name, principal.split(":", 1)[0])
+        return allowed, remaining, retry_after
+
+    async def __call__(self, request: Request, response: Response) -> str:
+        from backend.core.config import settings
+
+        principal = resolve_principal(request)
+        _principal.set(principal)
+        if not settings.ratelimit_enabled:
+            return principal
+
+        allowed, remaining, retry_after = self.take(principal)
+        if not allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Слишком много запросов, попробуйте позже",
+                headers={
+                    "Retry-After": str(max(math.ceil(retry_after), 1)),
+                    "X-RateLimit-Limit": str(self.burst),
+                    "X-RateLimit-Remaining": "0",
+                },
+            )
+        response.headers["X-RateLimit-Limit"] = str(self.burst)
+        response.headers["X-RateLimit-Remaining"] = str(int(remaining))
+        return principal
+
+
+# ===== Дневная квота токенов LLM =====
+
+def _quota_key(principal: str) -> str:
+    return f"llm_quota:{datetime.now(timezone.utc):%Y%m%d}:{principal}"
+
+
+def quota_allows(prompt: str) -> bool:
+    """False — квота текущего пользователя на сегодня исчерпана"""
+    from backend.core.config import settings
+    from backend.core.shared_cache import get_cache
+
+    principal = _principal.get()
+    if principal is None or not settings.llm_daily_token_quota:
+        return True
+    if get_cache().get(_quota_key(principal), 0) < settings.llm_daily_token_quota:
+        return True
+    LLM_QUOTA_DEGRADED.inc(prompt)
+    return False
+
+
+def charge_quota(tokens: int) -> None:
+    from backend.core.shared_cache import get_cache
+
+    principal = _principal.get()
+    if principal is None or not tokens:
+        return
+    get_cache().incr(_quota_key(principal), tokens, ttl=2 * 24 * 3600)
@@ -0,0 +1,47 @@
+"""
+Быстрая отдача JSON.
+
+FastAPI с response_model валидирует возвращённую модель ещё раз, даже если это
+уже готовый экземпляр той же схемы. Крупные ответы (тренировка, прогноз, профиль)
+собираются одним model_validate и отдаются через model_response(): байты
+пишет Rust-ядро Pydantic, повторной валидации нет. response_model у маршрута
+остаётся — для схемы OpenAPI.
+
+Для документов без схемы (dict) — dumps(): orjson, если установлен, иначе json.
+Глобальный default_response_class не меняем: в FastAPI ≥ 0.130 он отключил бы
+быстрый путь сериализации для остальных маршрутов с response_model.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Mapping, Optional
+
+from fastapi import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # необязательная зависимость
+    orjson = None
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def dumps(document: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(document, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(document, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def model_response(model: BaseModel, status_code: int = 200,
+                   headers: Optional[Mapping[str, str]] = None) -> Response:
+    """Ответ из уже провалидированной модели, без второго прохода FastAPI"""
+    return Response(content=model.model_dump_json(), status_code=status_code,
+                    headers=headers, media_type=JSON_MEDIA_TYPE)
+
+
+def json_response(document: Any, status_code: int = 200,
+                  headers: Optional[Mapping[str, str]] = None) -> Response:
+    return Response(content=dumps(document), status_code=status_code,
+                    headers=headers, media_type=JSON_MEDIA_TYPE)
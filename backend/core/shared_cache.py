@@ -0,0 +1,189 @@
+"""
+Кэш, общий для воркеров одного хоста.
+
+В продакшене (run.py --prod) приложение работает в нескольких процессах, и всё,
+что лежит в памяти модуля, у каждого воркера своё:
+
+- можно держать локально (копия на воркер допустима): банк реплик тренера,
+  статистика промптов, классификатор вайба, профили запросов, метрики
+  (Prometheus собирает их с каждого воркера отдельно);
+- нужно делать общим (иначе воркеры расходятся): рейтинги и лидерборды,
+  лимиты запросов, одноразовые токены, результаты фоновых задач.
+
+Для второй группы — get_cache(). Если задан SHARED_CACHE_PATH, это SQLite-файл
+в WAL-режиме (лучше на tmpfs, например /dev/shm/neurocoach-cache.db): все воркеры
+видят одни и те же записи, запись — одна транзакция без сети. Без настройки —
+LocalCache в памяти процесса с тем же интерфейсом (режим разработки, один воркер).
+Значения сериализуются в JSON.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+
+class LocalCache:
+    """TTL-кэш в памяти процесса с вытеснением самых старых записей"""
+
+    def __init__(self, max_entries: int = 10000) -> None:
+        self.max_entries = max_entries
+        self._items: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return default
+            value, expires = item
+            if expires and expires < time.time():
+                del self._items[key]
+                return default
+            self._items.move_to_end(key)
+            return value
+
+    def _store(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        """Запись без блокировки — вызывать под self._lock"""
+        self._items[key] = (value, time.time() + ttl if ttl else 0.0)
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """Записывает, только если ключа нет; True — если записали"""
+        # Проверка и запись под одной блокировкой: одноразовые токены выигрывает один поток
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and not (item[1] and item[1] < time.time()):
+                return False
+            self._store(key, value, ttl)
+            return True
+
+    def incr(self, key: str, amount: float = 1, ttl: Optional[float] = None) -> float:
+        with self._lock:
+            item = self._items.get(key)
+            now = time.time()
+            if item is None or (item[1] and item[1] < now):
+                item = (0, now + ttl if ttl else 0.0)
+            value = item[0] + amount
+            self._items[key] = (value, item[1])
+            return value
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+
+class SQLiteCache:
+    """TTL-кэш в SQLite-файле, общий для всех процессов, открывших тот же путь"""
+
+    def __init__(self, path: str, busy_timeout_ms: int = 2000) -> None:
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # Соединение на поток: sqlite3 не разрешает делить его между потоками
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _expires(ttl: Optional[float]) -> float:
+        return time.time() + ttl if ttl else 0.0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        row = self._connect().execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires = 0 OR expires >= ?)", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._connect().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), self._expires(ttl)),
+        )
+
+    def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM cache WHERE key = ? AND expires != 0 AND expires < ?", (key, time.time()))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), self._expires(ttl)),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount == 1
+
+    def incr(self, key: str, amount: float = 1, ttl: Optional[float] = None) -> float:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            conn.execute("DELETE FROM cache WHERE key = ? AND expires != 0 AND expires < ?", (key, now))
+            conn.execute(
+                "INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS NUMERIC) + CAST(excluded.value AS NUMERIC)",
+                (key, json.dumps(amount), self._expires(ttl)),
+            )
+            value = conn.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()[0]
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return json.loads(str(value))
+
+    def delete(self, key: str) -> None:
+        self._connect().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def purge_expired(self) -> int:
+        cursor = self._connect().execute(
+            "DELETE FROM cache WHERE expires != 0 AND expires < ?", (time.time(),)
+        )
+        return cursor.rowcount
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Общий кэш по настройкам: SQLiteCache при SHARED_CACHE_PATH, иначе LocalCache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                from backend.core.config import settings
+
+                path = settings.shared_cache_path
+                _cache = SQLiteCache(path) if path else LocalCache()
+    return _cache
+
+
+def reset_cache_after_fork() -> None:
+    """Вызывается в post_fork: соединения SQLite нельзя переносить в дочерний процесс"""
+    global _cache
+    _cache = None
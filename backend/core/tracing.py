@@ -0,0 +1,337 @@
+"""
+Лёгкая внутрипроцессная трассировка запросов.
+
+Спаны хранятся в contextvars: корневой открывает TracingMiddleware, дочерние —
+get_current_user, хуки курсора SQLAlchemy и LLM-шлюз. Несэмплированный запрос
+не создаёт ни одного объекта. Сэмплированный экспортируется в OTLP/JSON (файл
+или коллектор). Заголовок x-trace: <profiling_token> включает трассировку для
+одного запроса и возвращает Server-Timing с разбивкой по этапам; без токена
+разбивка клиенту не отдаётся.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hmac
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from backend.core.metrics import route_template
+
+logger = logging.getLogger(__name__)
+
+# Значения SpanKind из OTLP
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+KIND_CLIENT = 3
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    kind: int = KIND_INTERNAL
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: bool = False
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+
+@dataclass
+class Trace:
+    trace_id: str
+    spans: List[Span] = field(default_factory=list)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def _new_id(n_bytes: int) -> str:
+    return os.urandom(n_bytes).hex()
+
+
+def start_span(name: str, kind: int = KIND_INTERNAL, **attributes: Any) -> Optional[Span]:
+    """Открывает спан без смены текущего — для пар колбэков (before/after)"""
+    trace = _current_trace.get()
+    if trace is None:
+        return None
+    parent = _current_span.get()
+    return Span(
+        trace_id=trace.trace_id,
+        span_id=_new_id(8),
+        parent_id=parent.span_id if parent else None,
+        name=name,
+        kind=kind,
+        attributes=attributes,
+    )
+
+
+def end_span(span: Optional[Span], error: bool = False) -> None:
+    if span is None:
+        return
+    span.end_ns = time.time_ns()
+    span.error = error
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.spans.append(span)
+
+
+@contextmanager
+def span(name: str, kind: int = KIND_INTERNAL, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Контекстный менеджер спана; вне сэмплированного запроса ничего не делает"""
+    current = start_span(name, kind, **attributes)
+    if current is None:
+        yield None
+        return
+
+    token = _current_span.set(current)
+    error = False
+    try:
+        yield current
+    except BaseException:
+        error = True
+        raise
+    finally:
+        _current_span.reset(token)
+        end_span(current, error)
+
+
+@contextmanager
+def ensure_trace() -> Iterator[Trace]:
+    """Текущая трасса запроса или новая локальная — для внутренних потребителей (запись трафика)"""
+    trace = _current_trace.get()
+    if trace is not None:
+        yield trace
+        return
+
+    trace = Trace(trace_id=_new_id(16))
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def span_totals(trace: Trace) -> Dict[str, List[float]]:
+    """Длительности дочерних спанов (мс), сгруппированные по имени"""
+    totals: Dict[str, List[float]] = {}
+    for s in trace.spans:
+        if s.kind == KIND_SERVER:
+            continue
+        totals.setdefault(s.name, []).append(s.duration_ms)
+    return totals
+
+
+# ===== Server-Timing =====
+
+def server_timing(trace: Trace, total_ms: float) -> str:
+    """Суммарная длительность по именам спанов: auth.jwt_decode;dur=0.4, db.query;dur=3.1;desc="2x" """
+    parts = []
+    for name, durations in span_totals(trace).items():
+        part = f"{name};dur={sum(durations):.2f}"
+        if len(durations) > 1:
+            part += f';desc="{len(durations)}x"'
+        parts.append(part)
+    parts.append(f"total;dur={total_ms:.2f}")
+    return ", ".join(parts)
+
+
+# ===== OTLP/JSON =====
+
+def _attribute(key: str, value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def to_otlp(trace: Trace, service_name: str) -> dict:
+    spans = []
+    for s in trace.spans:
+        item = {
+            "traceId": s.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": s.kind,
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns),
+            "attributes": [_attribute(k, v) for k, v in s.attributes.items()],
+            "status": {"code": 2 if s.error else 1},
+        }
+        if s.parent_id:
+            item["parentSpanId"] = s.parent_id
+        spans.append(item)
+
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [_attribute("service.name", service_name)]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+        }]
+    }
+
+
+class TraceExporter:
+    """Фоновый экспорт: очередь + одна задача, чтобы не задерживать ответ"""
+
+    def __init__(self, service_name: str, path: Optional[str] = None, url: Optional[str] = None,
+                 max_queue: int = 1000) -> None:
+        self.service_name = service_name
+        self.path = path
+        self.url = url
+        self.max_queue = max_queue
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path or self.url)
+
+    def submit(self, trace: Trace) -> None:
+        if not self.enabled:
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(self.max_queue)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+        try:
+            self._queue.put_nowait(trace)
+        except asyncio.QueueFull:
+            pass  # под нагрузкой лучше потерять трассу, чем копить память
+
+    async def _run(self) -> None:
+        while True:
+            trace = await self._queue.get()
+            payload = to_otlp(trace, self.service_name)
+            try:
+                if self.path:
+                    await asyncio.to_thread(self._append, payload)
+                if self.url:
+                    import httpx
+                    async with httpx.AsyncClient(timeout=5.0) as client:
+                        await client.post(self.url, json=payload)
+            except Exception:
+                logger.exception("Не удалось экспортировать трассу")
+
+    def _append(self, payload: dict) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+
+
+# ===== Middleware =====
+
+def _parse_traceparent(value: str) -> Optional[tuple]:
+    """W3C traceparent: 00-<trace_id>-<parent_id>-<flags>"""
+    parts = value.split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2], parts[3] == "01"
+
+
+class TracingMiddleware:
+    """ASGI-middleware: корневой спан запроса, сэмплирование, Server-Timing и экспорт"""
+
+    def __init__(self, app, sample_rate: float = 0.0, exporter: Optional[TraceExporter] = None,
+                 token: Optional[str] = None) -> None:
+        self.app = app
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+        self.token = token.encode() if token else None
+
+    def _authorized(self, headers: Dict[bytes, bytes]) -> bool:
+        """x-trace с секретом (profiling_token); без настроенного токена заголовок игнорируется"""
+        value = headers.get(b"x-trace")
+        return self.token is not None and value is not None and hmac.compare_digest(value, self.token)
+
+    def _sample(self, headers: Dict[bytes, bytes], authorized: bool) -> Optional[tuple]:
+        parent = _parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        if authorized or (parent and parent[2]):
+            return parent or (_new_id(16), None, True)
+        if self.sample_rate and random.random() < self.sample_rate:
+            return parent or (_new_id(16), None, True)
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        authorized = self._authorized(headers)
+        sampled = self._sample(headers, authorized)
+        if sampled is None:
+            await self.app(scope, receive, send)
+            return
+
+        trace_id, parent_id, _ = sampled
+        trace = Trace(trace_id=trace_id)
+        root = Span(trace_id=trace_id, span_id=_new_id(8), parent_id=parent_id,
+                    name=f"{scope['method']} {scope['path']}", kind=KIND_SERVER)
+        trace_token = _current_trace.set(trace)
+        span_token = _current_span.set(root)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                root.attributes["http.status_code"] = message["status"]
+                total_ms = (time.time_ns() - root.start_ns) / 1e6
+                response_headers = list(message.get("headers", []))
+                if authorized:
+                    # Разбивка по этапам (БД, LLM, KDF) — только тому, кто знает токен
+                    response_headers.append((b"server-timing", server_timing(trace, total_ms).encode("latin-1")))
+                response_headers.append((b"traceparent", f"00-{trace_id}-{root.span_id}-01".encode("latin-1")))
+                message = {**message, "headers": response_headers}
+            await send(message)
+
+        error = False
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException:
+            error = True
+            raise
+        finally:
+            root.name = f"{scope['method']} {route_template(scope)}"
+            root.attributes["http.route"] = route_template(scope)
+            root.attributes["http.target"] = scope["path"]
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+            root.end_ns = time.time_ns()
+            root.error = error
+            trace.spans.append(root)
+            if self.exporter is not None:
+                self.exporter.submit(trace)
+
+
+def instrument_engine(engine) -> None:
+    """Спаны db.query вокруг каждого SQL-запроса"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement else "UNKNOWN"
+        conn.info.setdefault("trace_spans", []).append(start_span("db.query", KIND_CLIENT, operation=operation))
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        end_span(conn.info["trace_spans"].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("trace_spans"):
+            end_span(conn.info["trace_spans"].pop(), error=True)
@@ -1,53 +1,66 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import APIRouter, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 # Импорты из нашего пакета
-from backend.core.config import settings
-from backend.core.database import create_tables
+from backend.core.config import get_settings
+from backend.core.database import get_engine
+from backend.core.metrics import REGISTRY, CONTENT_TYPE_LATEST, MetricsMiddleware, monitor_event_loop_lag
+from backend.core.tracing import TraceExporter, TracingMiddleware
+from backend.core.profiling import ProfilingMiddleware
+from backend.core.http_cache import CachePolicy, HTTPCacheMiddleware
+from backend.core.compression import CompressionMiddleware
+from backend.core.capture import Anonymizer, CaptureMiddleware, CaptureWriter
+from backend.core.passwords import get_password_hasher
+from backend.core.jobs import JobWorkers, get_job_queue
+from backend.utils.llm_gateway import aclose_client
 from backend.api.endpoints import (
     vibe_router,
     workout_router,
     coach_router,
     profile_router,
     forecast_router,
+    admin_router,
+    catalog_router,
+    jobs_router,
+    session_router,
 )
-# Создаем таблицы при старте
-create_tables()
-
-app = FastAPI(
-    title=settings.app_name,
-    description="AI-тренер для персонализированных тренировок",
-    version="1.0.0",
-    docs_url="/api/docs",
-    redoc_url="/api/redoc",
-    debug=settings.debug,
-)
+# Схема БД создаётся отдельным шагом: python -m backend.migrate
+
+# Роутеры API
+ROUTERS = [
+    (vibe_router, "vibe"),
+    (workout_router, "workout"),
+    (coach_router, "coach"),
+    (profile_router, "profile"),
+    (forecast_router, "forecast"),
+    (admin_router, "admin"),
+    (catalog_router, "catalog"),
+    (jobs_router, "jobs"),
+]
+
+# Условные GET (core/http_cache.py); маршруты со своим ETag middleware пропускает
+HTTP_CACHE_POLICIES = [
+    CachePolicy("/api/catalog", cache_control="public, max-age=86400"),
+    CachePolicy("/api/workout/", cache_control="private, max-age=86400"),
+    CachePolicy("/api/admin/models", cache_control="private, no-cache"),
+    CachePolicy("/api/ping", cache_control="public, max-age=60", ttl=60),
+]
 
+# Служебные маршруты (корень, health, метрики)
+service_router = APIRouter()
 
-@app.get("/api/ping")
+
+@service_router.get("/api/ping")
 async def ping():
     return {"status": "ok"}
-    
-# Настройка CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Временное упрощение
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Подключаем только работающие роутеры
-app.include_router(vibe_router, prefix=settings.api_prefix, tags=["vibe"])
-# Остальные закомментированы до создания
-app.include_router(workout_router, prefix=settings.api_prefix, tags=["workout"])
-app.include_router(coach_router, prefix=settings.api_prefix, tags=["coach"])
-app.include_router(profile_router, prefix=settings.api_prefix, tags=["profile"])
-app.include_router(forecast_router, prefix=settings.api_prefix, tags=["forecast"])
 
 
-@app.get("/")
+@service_router.get("/")
 async def root():
+    settings = get_settings()
     return {
         "message": settings.app_name,
         "status": "running",
@@ -66,19 +79,26 @@ async def root():
     }
 
 
-@app.get("/health")
+@service_router.get("/health")
 async def health_check():
     return {
         "status": "healthy",
-        "service": settings.app_name,
-        "active_routers": 1,
-        "database": "SQLite"
+        "service": get_settings().app_name,
+        "active_routers": len(ROUTERS),
+        "database": get_engine().dialect.name
     }
 
 
-@app.get("/api/test")
+@service_router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Метрики в текстовом формате Prometheus"""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE_LATEST)
+
+
+@service_router.get("/api/test")
 async def test_api():
     """Тестовый эндпоинт для проверки работы"""
+    settings = get_settings()
     return {
         "success": True,
         "message": "API работает!",
@@ -96,16 +116,103 @@ async def test_api():
     }
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Действия при запуске приложения"""
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Запуск и остановка приложения: фоновые задачи и общие клиенты"""
+    settings = get_settings()
     print(f"🚀 {settings.app_name} запущен!")
     print(f"🔧 Режим отладки: {settings.debug}")
     print(f"📚 Документация: http://localhost:8000/api/docs")
     print(f"🎯 Активный эндпоинт: POST {settings.api_prefix}/vibe/assess")
+    loop_lag_task = asyncio.create_task(monitor_event_loop_lag())
+    job_workers = None
+    if settings.jobs_workers:
+        job_workers = JobWorkers(get_job_queue(), concurrency=settings.jobs_workers)
+        job_workers.start()
+    try:
+        yield
+    finally:
+        loop_lag_task.cancel()
+        if job_workers is not None:
+            await job_workers.stop()
+        capture_writer = getattr(app.state, "capture_writer", None)
+        if capture_writer is not None:
+            await capture_writer.flush()
+        await aclose_client()
+        get_password_hasher().shutdown()
+
+
+def create_app() -> FastAPI:
+    """Сборка приложения: без обращений к БД и сети, только конфигурация"""
+    settings = get_settings()
+    app = FastAPI(
+        title=settings.app_name,
+        description="AI-тренер для персонализированных тренировок",
+        version="1.0.0",
+        docs_url="/api/docs",
+        redoc_url="/api/redoc",
+        debug=settings.debug,
+        lifespan=lifespan,
+    )
+
+    # Кэш ответов — внутри CORS: заголовки CORS зависят от Origin и в кэш не попадают
+    if settings.http_cache_enabled:
+        app.add_middleware(HTTPCacheMiddleware, policies=HTTP_CACHE_POLICIES)
+    # Настройка CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Временное упрощение
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    # Сжатие — снаружи кэша ответов и CORS: кэш хранит несжатые тела
+    if settings.compression_enabled:
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.compression_min_size,
+            gzip_level=settings.compression_gzip_level,
+            brotli_quality=settings.compression_brotli_quality,
+        )
+    if settings.profiling_token:
+        app.add_middleware(ProfilingMiddleware, token=settings.profiling_token)
+    if settings.capture_sample_rate:
+        app.state.capture_writer = CaptureWriter(
+            settings.capture_dir,
+            max_bytes=settings.capture_max_file_mb * 1024 * 1024,
+            backup_count=settings.capture_backup_count,
+        )
+        app.add_middleware(
+            CaptureMiddleware,
+            sample_rate=settings.capture_sample_rate,
+            writer=app.state.capture_writer,
+            anonymizer=Anonymizer(settings.capture_salt),
+        )
+    app.add_middleware(
+        TracingMiddleware,
+        sample_rate=settings.tracing_sample_rate,
+        token=settings.profiling_token,
+        exporter=TraceExporter(
+            service_name=settings.app_name,
+            path=settings.tracing_export_path,
+            url=settings.tracing_export_url,
+        ),
+    )
+    app.add_middleware(MetricsMiddleware)
+
+    # Подключаем роутеры
+    app.include_router(service_router)
+    # WebSocket живой сессии — /ws/session, вне префикса API
+    app.include_router(session_router, tags=["session"])
+    for router, tag in ROUTERS:
+        app.include_router(router, prefix=settings.api_prefix, tags=[tag])
+    return app
 
 
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Действия при остановке приложения"""
-    print(f"👋 {settings.app_name} остановлен")
\ No newline at end of file
+def __getattr__(name: str):
+    # backend.main:app (uvicorn, gunicorn) собирается при первом обращении: импорт
+    # модуля не читает настройки, так что роутеры и main импортируются без .env
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,19 @@
+"""
+Создание схемы БД отдельным шагом, а не при импорте приложения.
+
+    python -m backend.migrate
+
+Запускать перед стартом воркеров (run.py делает это сам в режиме разработки).
+"""
+
+from backend.core.database import create_tables, get_engine
+
+
+def main() -> int:
+    create_tables()
+    print(f"Схема БД готова: {get_engine().url.render_as_string(hide_password=True)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -4,11 +4,11 @@
 
 # Импорты будут добавлены по мере создания моделей
 from .user import User
-# from .workout import Workout
+from .workout import Workout
 # from .profile import UserProfile
 
 __all__ = [
     "User",
-    # "Workout",
+    "Workout",
     # "UserProfile",
 ]
\ No newline at end of file
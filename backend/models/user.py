@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON, Float
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, JSON, Float, Index
 from ..core.database import Base
 
 class User(Base):
@@ -18,3 +18,23 @@ class User(Base):
     rating = Column(Integer, nullable=False, default=0)         # текущий рейтинг
     rating_level = Column(String, nullable=False, default="Новичок")  # название уровня
 
+    # Под keyset-пагинацию списка пользователей: фильтр + порядок по id
+    __table_args__ = (
+        Index("ix_users_rating_level_id", "rating_level", "id"),
+        Index("ix_users_fitness_level_id", "fitness_level", "id"),
+    )
+
+    def to_dict(self) -> dict:
+        """Публичные поля пользователя (без хеша пароля)"""
+        return {
+            "id": self.id,
+            "email": self.email,
+            "username": self.username,
+            "is_active": self.is_active,
+            "fitness_level": self.fitness_level,
+            "preferences": self.preferences or {},
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "rating": self.rating,
+            "rating_level": self.rating_level,
+        }
+
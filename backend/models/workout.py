@@ -0,0 +1,28 @@
+import hashlib
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, String
+from ..core.database import Base
+from ..utils import compact
+
+
+class Workout(Base):
+    """Сгенерированный план тренировки; неизменяем после создания"""
+    __tablename__ = "workouts"
+
+    id = Column(String(26), primary_key=True)          # ULID
+    owner = Column(String, nullable=True, index=True)  # user:<email> или ip:<адрес>
+    vibe_mode = Column(String, nullable=False)
+    duration_min = Column(Integer, nullable=False)
+    etag = Column(String(32), nullable=False)          # хеш несжатого плана
+    codec = Column(String(8), nullable=False)          # utils/compact.py
+    payload = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    def set_plan(self, plan: dict) -> None:
+        raw = compact.dumps(plan)
+        self.etag = hashlib.sha256(raw).hexdigest()[:32]
+        self.codec, self.payload = compact.compress(raw)
+
+    def plan(self) -> dict:
+        return compact.unpack(self.codec, self.payload)
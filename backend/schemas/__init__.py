@@ -8,8 +8,21 @@ from .workout import (
     WorkoutPlan,
 )
 
+from .llm import (
+    VibeLLMOutput,
+    WorkoutLLMOutput,
+    ProfileLLMOutput,
+    ForecastLLMOutput,
+    PhraseBatchLLMOutput,
+)
+
 __all__ = [
     "VibeMode",
     "ExerciseStep",
     "WorkoutPlan",
+    "VibeLLMOutput",
+    "WorkoutLLMOutput",
+    "ProfileLLMOutput",
+    "ForecastLLMOutput",
+    "PhraseBatchLLMOutput",
 ]
\ No newline at end of file
@@ -0,0 +1,63 @@
+# schemas/llm.py
+"""
+Схемы JSON-ответов LLM. Ответ, не прошедший валидацию, не отдаётся пользователю:
+маршрутизатор моделей (utils/model_router.py) переспрашивает следующую модель лестницы.
+Значения по умолчанию совпадают с прежними .get(...) в эндпоинтах.
+"""
+from pydantic import BaseModel, Field, field_validator
+from typing import Any, Dict, List, Optional
+
+from .workout import VibeMode
+from ..utils.constants import EXERCISES
+
+
+class VibeLLMOutput(BaseModel):
+    mode: VibeMode
+    confidence: float = Field(0.7, ge=0.0, le=1.0)
+    description: str = "Состояние определено"
+    recommended_intensity: float = Field(0.6, ge=0.0, le=1.0)
+    coach_style: str = "balanced"
+    workout_duration: int = Field(30, ge=5, le=180)
+
+
+class LLMExercise(BaseModel):
+    slug: Optional[str] = None
+    name: str
+    duration_sec: int = Field(..., gt=0)
+    instructions: str
+    difficulty: str = "medium"
+
+    @field_validator("slug")
+    @classmethod
+    def known_slug(cls, value: Optional[str]) -> Optional[str]:
+        # Выдуманный slug не бракует весь план: упражнение просто считается «своим»
+        return value if value in EXERCISES else None
+
+
+class WorkoutLLMOutput(BaseModel):
+    intensity: float = Field(0.6, ge=0.0, le=1.0)
+    estimated_calories: int = Field(200, ge=0)
+    warm_up: List[LLMExercise] = []
+    main_block: List[LLMExercise] = Field(..., min_length=1)
+    cool_down: List[LLMExercise] = []
+
+
+class ProfileLLMOutput(BaseModel):
+    user_type: str
+    analysis: str
+    strengths: List[str] = []
+    weaknesses: List[str] = []
+    recommendations: List[str] = []
+    optimal_training_schedule: Dict[str, Any] = {}
+
+
+class ForecastLLMOutput(BaseModel):
+    optimistic_scenario: Dict[str, Any]
+    pessimistic_scenario: Dict[str, Any]
+    comparison: Dict[str, Any] = {}
+    key_milestones: List[Dict[str, Any]] = []
+    recommendations: List[str] = []
+
+
+class PhraseBatchLLMOutput(BaseModel):
+    phrases: List[str] = Field(..., min_length=1)
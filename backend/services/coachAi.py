@@ -1,13 +1,9 @@
 from typing import Literal
 from app.ai.llm_provider import LLMProvider
+from backend.utils.prompts import COACH_STYLES, PROMPTS
 
 class CoachAI:
-    STYLES = {
-        "strict": "Ты строгий армейский инструктор. Кратко, жёстко, по делу.",
-        "soft": "Ты заботливый поддерживающий друг. Подбадриваешь мягко.",
-        "comedy": "Ты юмористический комментатор. Шутишь, но мотивируешь.",
-        "anime": "Ты аниме-сенсей. Драматично, с японскими терминами."
-    }
+    STYLES = COACH_STYLES
 
     def __init__(self):
         self.llm = LLMProvider()
@@ -22,15 +18,12 @@ class CoachAI:
         """
         Генерирует мотивационную реплику для упражнения
         """
-        prompt = f"""
-        Стиль тренера: {self.STYLES[style]}
-        
-        Упражнение: {exercise}
-        Результат: {"Успешно выполнено" if success else "Нужно улучшить"}
-        Прогресс пользователя: {user_progress*100}%
-        
-        Сгенерируй одну короткую реплику тренера (до 10 слов) для этого момента.
-        """
+        prompt = PROMPTS.get("coach_comment").render_text(
+            style_description=self.STYLES[style],
+            exercise=exercise,
+            result="Успешно выполнено" if success else "Нужно улучшить",
+            progress=user_progress * 100,
+            context="",
+        )
 
         return await self.llm.generate_text(prompt)
-    
\ No newline at end of file
@@ -0,0 +1,151 @@
+"""
+Состояние живой сессии тренировки (/ws/session).
+
+Соединение аутентифицируется один раз, дальше клиент шлёт события выполнения
+упражнений, а сервер отвечает кадрами result с очками, текущим рейтингом и
+репликой тренера. Каждому result присваивается номер seq; последние кадры
+лежат в буфере повтора, чтобы после обрыва клиент переподключился с
+last_seq и получил то, что не дошло.
+
+Очки копятся в pending и пишутся в БД пачкой (flush) — одним UPDATE
+rating = rating + delta, а не commit на каждое упражнение. Номера уже
+учтённых событий (id от клиента) запоминаются: повторная отправка после
+обрыва не начисляет очки дважды.
+
+Между соединениями состояние живёт в shared_cache (ws_session:<id>) до
+истечения TTL, поэтому продолжить сессию можно на любом воркере. Два
+одновременных соединения с одной сессией не поддерживаются: побеждает
+последнее сохранение.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Optional
+
+from backend.core.metrics import WS_FLUSH_BATCH
+from backend.core.shared_cache import get_cache
+from backend.utils.ulid import new_ulid
+
+SEEN_LIMIT = 1000  # запомненных id событий на сессию
+
+
+def _cache_key(session_id: str) -> str:
+    return f"ws_session:{session_id}"
+
+
+class LiveSession:
+    def __init__(
+            self,
+            principal: str,
+            user_id: int,
+            rating: int,
+            session_id: Optional[str] = None,
+            replay_size: int = 100,
+    ) -> None:
+        self.session_id = session_id or new_ulid()
+        self.principal = principal
+        self.user_id = user_id
+        self.rating = rating       # сохранённый в БД рейтинг
+        self.pending = 0           # начислено, но ещё не записано
+        self.pending_events = 0
+        self.seq = 0
+        self.saved_seq = 0         # последний seq, чьи очки уже в БД
+        self.replay: Deque[dict] = deque(maxlen=replay_size)
+        self.seen: "OrderedDict[str, int]" = OrderedDict()
+        self.last_flush = time.monotonic()
+
+    @property
+    def total_rating(self) -> int:
+        return self.rating + self.pending
+
+    def seen_seq(self, event_id: str) -> Optional[int]:
+        return self.seen.get(event_id)
+
+    def replay_frame(self, seq: int) -> Optional[dict]:
+        for frame in self.replay:
+            if frame["seq"] == seq:
+                return frame
+        return None
+
+    def record(self, event_id: str, points: int, frame: dict) -> dict:
+        """Начисляет очки события и возвращает кадр result с новым seq"""
+        self.seq += 1
+        self.pending += points
+        self.pending_events += 1
+        frame = {"type": "result", "seq": self.seq, "id": event_id, **frame,
+                 "points_earned": points, "total_rating": self.total_rating}
+        self.replay.append(frame)
+        self.seen[event_id] = self.seq
+        while len(self.seen) > SEEN_LIMIT:
+            self.seen.popitem(last=False)
+        return frame
+
+    def missed_since(self, last_seq: int) -> Optional[List[dict]]:
+        """Кадры после last_seq; None — часть уже вытеснена из буфера"""
+        frames = [frame for frame in self.replay if frame["seq"] > last_seq]
+        first = frames[0]["seq"] if frames else self.seq + 1
+        if last_seq < self.seq and first != last_seq + 1:
+            return None
+        return frames
+
+    def flush_due(self, interval_sec: float, max_events: int) -> bool:
+        if not self.pending_events:
+            return False
+        return (self.pending_events >= max_events
+                or time.monotonic() - self.last_flush >= interval_sec)
+
+    def flush(self, apply: Callable[[int, int], Optional[int]], ttl_sec: Optional[float] = None) -> None:
+        """
+        Пишет накопленные очки: apply(user_id, delta) -> рейтинг из БД, затем
+        сохраняет состояние, если задан ttl_sec. Блокирующий — вызывать через
+        asyncio.to_thread: запись и сохранение доходят до конца, даже если
+        задачу соединения отменили. При ошибке очки остаются в pending.
+        """
+        self.last_flush = time.monotonic()
+        if self.pending_events:
+            delta, events, through = self.pending, self.pending_events, self.seq
+            rating = apply(self.user_id, delta)
+            self.pending -= delta
+            self.pending_events -= events
+            self.saved_seq = through
+            if rating is not None:
+                self.rating = rating
+            WS_FLUSH_BATCH.observe(events)
+        if ttl_sec:
+            self.save(ttl_sec)
+
+    # ===== Сохранение между соединениями =====
+
+    def to_state(self) -> dict:
+        return {
+            "principal": self.principal,
+            "user_id": self.user_id,
+            "rating": self.rating,
+            "pending": self.pending,
+            "pending_events": self.pending_events,
+            "seq": self.seq,
+            "saved_seq": self.saved_seq,
+            "replay": list(self.replay),
+            "seen": list(self.seen.items()),
+        }
+
+    def save(self, ttl_sec: float) -> None:
+        get_cache().set(_cache_key(self.session_id), self.to_state(), ttl=ttl_sec)
+
+    @classmethod
+    def load(cls, session_id: str, principal: str, replay_size: int = 100) -> Optional["LiveSession"]:
+        """Сессия из кэша, если она не истекла и принадлежит тому же пользователю"""
+        state: Optional[Dict] = get_cache().get(_cache_key(session_id))
+        if not state or state.get("principal") != principal:
+            return None
+        session = cls(principal, state["user_id"], state["rating"],
+                      session_id=session_id, replay_size=replay_size)
+        session.pending = state["pending"]
+        session.pending_events = state["pending_events"]
+        session.seq = state["seq"]
+        session.saved_seq = state["saved_seq"]
+        session.replay.extend(state["replay"])
+        session.seen.update((event_id, seq) for event_id, seq in state["seen"])
+        return session
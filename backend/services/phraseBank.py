@@ -0,0 +1,146 @@
+"""
+Банк заранее сгенерированных реплик тренера.
+
+Пулы реплик по ключу (стиль, успех, корзина прогресса, категория упражнения).
+Пул засевается резервными репликами и пополняется фоновой задачей пачками из LLM.
+Выдача — O(1), без повторов для одного пользователя, пока пул не исчерпан.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from backend.utils.constants import EXERCISES
+
+logger = logging.getLogger(__name__)
+
+PoolKey = Tuple[str, bool, str, str]  # (style, success, progress_bucket, category)
+
+GENERAL_CATEGORY = "general"
+
+_LABEL_TO_CATEGORY = {cfg.label.lower(): cfg.category.value for cfg in EXERCISES.values()}
+
+
+def progress_bucket(progress: float) -> str:
+    if progress < 0.34:
+        return "low"
+    if progress < 0.67:
+        return "mid"
+    return "high"
+
+
+def exercise_category(exercise: str) -> str:
+    """Категория по slug или названию упражнения из EXERCISES"""
+    cfg = EXERCISES.get(exercise)
+    if cfg is not None:
+        return cfg.category.value
+    return _LABEL_TO_CATEGORY.get(exercise.strip().lower(), GENERAL_CATEGORY)
+
+
+class PhraseBank:
+    def __init__(
+            self,
+            seed: Callable[[str, bool], str],
+            generate: Callable[[PoolKey, int], Awaitable[List[str]]],
+            low_water: int = 8,
+            batch_size: int = 20,
+            max_pool_size: int = 200,
+            refill_cooldown_sec: float = 60.0,
+            max_tracked_users: int = 10000,
+    ) -> None:
+        self._seed = seed
+        self._generate = generate
+        self.low_water = low_water
+        self.batch_size = batch_size
+        self.max_pool_size = max_pool_size
+        self.refill_cooldown_sec = refill_cooldown_sec
+        self.max_tracked_users = max_tracked_users
+
+        self._pools: Dict[PoolKey, List[str]] = {}
+        self._known: Dict[PoolKey, Set[str]] = {}
+        # Позиция пользователя в пуле: пулы только дополняются, поэтому
+        # сдвигающийся курсор не повторяет реплики, пока пул не пройден целиком
+        self._cursors: "OrderedDict[Tuple[str, PoolKey], int]" = OrderedDict()
+
+        self._pending: "OrderedDict[PoolKey, None]" = OrderedDict()
+        self._last_refill: Dict[PoolKey, float] = {}
+        self._worker: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def key_for(style: str, success: bool, progress: float, exercise: str) -> PoolKey:
+        return style, success, progress_bucket(progress), exercise_category(exercise)
+
+    def pool(self, key: PoolKey) -> List[str]:
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = [self._seed(key[0], key[1])]
+            self._pools[key] = pool
+            self._known[key] = set(pool)
+        return pool
+
+    def add(self, key: PoolKey, phrases: List[str]) -> int:
+        """Добавляет новые реплики в пул; возвращает сколько добавлено"""
+        pool = self.pool(key)
+        known = self._known[key]
+        added = 0
+        for phrase in phrases:
+            if len(pool) >= self.max_pool_size:
+                break
+            if phrase and phrase not in known:
+                pool.append(phrase)
+                known.add(phrase)
+                added += 1
+        return added
+
+    def next_phrase(self, user_key: str, style: str, success: bool, progress: float, exercise: str) -> str:
+        key = self.key_for(style, success, progress, exercise)
+        pool = self.pool(key)
+
+        cursor_key = (user_key, key)
+        cursor = self._cursors.pop(cursor_key, None)
+        if cursor is None:
+            cursor = random.randrange(len(pool))
+        phrase = pool[cursor % len(pool)]
+
+        self._cursors[cursor_key] = cursor + 1
+        if len(self._cursors) > self.max_tracked_users:
+            self._cursors.popitem(last=False)
+
+        if len(pool) < self.low_water:
+            self.schedule_refill(key)
+        return phrase
+
+    def schedule_refill(self, key: PoolKey) -> None:
+        """Ставит пул в очередь на пополнение; генерация идёт в фоне"""
+        if key in self._pending:
+            return
+        if time.monotonic() - self._last_refill.get(key, float("-inf")) < self.refill_cooldown_sec:
+            return
+        self._pending[key] = None
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._refill_worker())
+
+    async def _refill_worker(self) -> None:
+        # Один воркер на процесс: пулы пополняются по очереди, не нагружая LLM параллельно
+        while self._pending:
+            key, _ = self._pending.popitem(last=False)
+            self._last_refill[key] = time.monotonic()
+            try:
+                phrases = await self._generate(key, self.batch_size)
+            except Exception:
+                logger.exception("Не удалось пополнить банк реплик %s", key)
+                continue
+            self.add(key, phrases)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pools": len(self._pools),
+            "phrases": sum(len(pool) for pool in self._pools.values()),
+            "pending_refills": len(self._pending),
+            "tracked_users": len(self._cursors),
+        }
@@ -1,5 +1,7 @@
 from enum import Enum
 from typing import Optional
+
+from backend.utils.prompts import PROMPTS
 # from app.ai.llm_provider import LLMProvider
 # from app.schemas.workout import VibeMode
 
@@ -11,17 +13,7 @@ class VibeAnalyzer:
         """
         Анализирует текстовое или голосовое описание состояния
         """
-        prompt = f"""
-        Проанализируй состояние пользователя и определи один из режимов:
-        - anti_stress: усталость, стресс, нужна мягкая восстановительная тренировка
-        - rage: агрессия, злость, нужна интенсивная силовая/кардио нагрузка
-        - boost: хорошее настроение, энергия, можно дать сложную тренировку
-        - neutral: нормальное состояние, стандартная тренировка
-        
-        Описание пользователя: {text}
-        
-        Верни JSON: {{"mode": "anti_stress|rage|boost|neutral", "confidence": 0.85, "description": "описание", "recommended_intensity": 0.7}}
-        """
+        prompt = PROMPTS.get("vibe_assess").render_text(text=text or "")
 
         # response = await self.llm.generate_json(prompt)
         # return response
@@ -0,0 +1,392 @@
+"""
+Локальный классификатор вайба: хешированные символьные n-граммы + линейная модель.
+
+Обучается офлайн на логах пар (текст, метка LLM), грузится за миллисекунды
+и отвечает за микросекунды. Если уверенность ниже порога — запрос уходит в LLM.
+
+CLI:
+    python -m backend.services.vibeClassifier train --data vibe_labels.jsonl --out vibe_model.npz
+    python -m backend.services.vibeClassifier eval --data holdout.jsonl --model vibe_model.npz --report report.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.schemas.workout import VibeMode
+
+logger = logging.getLogger(__name__)
+
+LABELS: Tuple[str, ...] = tuple(mode.value for mode in VibeMode)
+
+DEFAULT_N_FEATURES = 2 ** 16
+DEFAULT_NGRAM_RANGE = (2, 4)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+# ===== Признаки =====
+
+def featurize(
+        text: str,
+        n_features: int = DEFAULT_N_FEATURES,
+        ngram_range: Tuple[int, int] = DEFAULT_NGRAM_RANGE,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Превращает текст в разреженный вектор хешированных символьных n-грамм.
+
+    Возвращает (индексы, значения): log(1 + tf), нормированные по L2.
+    Хеш — crc32, чтобы индексы не зависели от PYTHONHASHSEED.
+    """
+    normalized = " " + _WHITESPACE_RE.sub(" ", text.lower()).strip() + " "
+    counts: Dict[int, int] = {}
+    min_n, max_n = ngram_range
+    for n in range(min_n, max_n + 1):
+        for i in range(len(normalized) - n + 1):
+            idx = zlib.crc32(normalized[i:i + n].encode("utf-8")) % n_features
+            counts[idx] = counts.get(idx, 0) + 1
+
+    if not counts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+    indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    values = np.log1p(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+    values /= np.linalg.norm(values)
+    return indices, values
+
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    shifted = scores - scores.max(axis=-1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+# ===== Модель =====
+
+@dataclass
+class VibePrediction:
+    mode: str
+    confidence: float
+    probabilities: Dict[str, float]
+
+
+class VibeClassifier:
+    """Линейный классификатор поверх хешированных n-грамм (веса — матрица NumPy)"""
+
+    def __init__(
+            self,
+            weights: np.ndarray,
+            bias: np.ndarray,
+            labels: Sequence[str] = LABELS,
+            ngram_range: Tuple[int, int] = DEFAULT_NGRAM_RANGE,
+            threshold: float = 0.75,
+    ) -> None:
+        self.weights = weights.astype(np.float32, copy=False)
+        self.bias = bias.astype(np.float32, copy=False)
+        self.labels = tuple(labels)
+        self.ngram_range = (int(ngram_range[0]), int(ngram_range[1]))
+        self.threshold = threshold
+
+    @property
+    def n_features(self) -> int:
+        return self.weights.shape[0]
+
+    @classmethod
+    def zeros(cls, n_features: int = DEFAULT_N_FEATURES, **kwargs) -> "VibeClassifier":
+        labels = kwargs.pop("labels", LABELS)
+        return cls(
+            weights=np.zeros((n_features, len(labels)), dtype=np.float32),
+            bias=np.zeros(len(labels), dtype=np.float32),
+            labels=labels,
+            **kwargs,
+        )
+
+    @classmethod
+    def load(cls, path: str, threshold: float = 0.75) -> "VibeClassifier":
+        """Загружает модель из .npz (несжатый — чтобы грузилось за миллисекунды)"""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                weights=data["weights"],
+                bias=data["bias"],
+                labels=[str(label) for label in data["labels"]],
+                ngram_range=tuple(data["ngram_range"]),
+                threshold=threshold,
+            )
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                weights=self.weights,
+                bias=self.bias,
+                labels=np.array(self.labels),
+                ngram_range=np.array(self.ngram_range, dtype=np.int64),
+            )
+
+    def predict_proba(self, text: str) -> np.ndarray:
+        indices, values = featurize(text, self.n_features, self.ngram_range)
+        scores = values @ self.weights[indices] + self.bias
+        return _softmax(scores)
+
+    def predict(self, text: str) -> VibePrediction:
+        proba = self.predict_proba(text)
+        best = int(proba.argmax())
+        return VibePrediction(
+            mode=self.labels[best],
+            confidence=float(proba[best]),
+            probabilities={label: float(p) for label, p in zip(self.labels, proba)},
+        )
+
+    def is_confident(self, prediction: VibePrediction) -> bool:
+        return prediction.confidence >= self.threshold
+
+
+# ===== Обучение =====
+
+def train(
+        examples: Sequence[Tuple[str, str]],
+        n_features: int = DEFAULT_N_FEATURES,
+        ngram_range: Tuple[int, int] = DEFAULT_NGRAM_RANGE,
+        epochs: int = 30,
+        learning_rate: float = 2.0,
+        l2: float = 1e-5,
+        batch_size: int = 32,
+        seed: int = 42,
+) -> VibeClassifier:
+    """
+    Мультиклассовая логистическая регрессия, мини-батч SGD по разреженным признакам.
+    Обновляются только строки весов, встретившиеся в батче.
+    """
+    model = VibeClassifier.zeros(n_features, ngram_range=ngram_range)
+    label_index = {label: i for i, label in enumerate(model.labels)}
+
+    rows = [featurize(text, n_features, ngram_range) for text, _ in examples]
+    targets = np.array([label_index[label] for _, label in examples], dtype=np.int64)
+    n_classes = len(model.labels)
+
+    rng = random.Random(seed)
+    order = list(range(len(rows)))
+
+    for epoch in range(epochs):
+        rng.shuffle(order)
+        lr = learning_rate / (1.0 + 0.1 * epoch)
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+
+            row_ids = np.concatenate([np.full(len(rows[i][0]), k) for k, i in enumerate(batch)])
+            feat_ids = np.concatenate([rows[i][0] for i in batch])
+            values = np.concatenate([rows[i][1] for i in batch])
+
+            scores = np.tile(model.bias, (len(batch), 1))
+            np.add.at(scores, row_ids, model.weights[feat_ids] * values[:, None])
+            grad = _softmax(scores)
+            grad[np.arange(len(batch)), targets[batch]] -= 1.0
+            grad /= len(batch)
+
+            touched, inverse = np.unique(feat_ids, return_inverse=True)
+            grad_w = np.zeros((len(touched), n_classes), dtype=np.float32)
+            np.add.at(grad_w, inverse, values[:, None] * grad[row_ids])
+            grad_w += l2 * model.weights[touched]
+
+            model.weights[touched] -= lr * grad_w
+            model.bias -= lr * grad.sum(axis=0)
+
+    return model
+
+
+# ===== Оценка =====
+
+def evaluate(model: VibeClassifier, examples: Sequence[Tuple[str, str]]) -> dict:
+    """Точность относительно меток LLM: общая, на уверенных ответах и покрытие порогом"""
+    labels = model.labels
+    confusion = {true: {pred: 0 for pred in labels} for true in labels}
+    latencies_us: List[float] = []
+    correct = confident = confident_correct = 0
+
+    for text, label in examples:
+        start = time.perf_counter()
+        prediction = model.predict(text)
+        latencies_us.append((time.perf_counter() - start) * 1e6)
+
+        confusion[label][prediction.mode] += 1
+        hit = prediction.mode == label
+        correct += hit
+        if model.is_confident(prediction):
+            confident += 1
+            confident_correct += hit
+
+    total = len(examples) or 1
+    per_class = {}
+    for label in labels:
+        tp = confusion[label][label]
+        predicted = sum(confusion[true][label] for true in labels)
+        actual = sum(confusion[label].values())
+        per_class[label] = {
+            "precision": tp / predicted if predicted else 0.0,
+            "recall": tp / actual if actual else 0.0,
+            "support": actual,
+        }
+
+    latencies = np.array(latencies_us or [0.0])
+    return {
+        "examples": len(examples),
+        "threshold": model.threshold,
+        "accuracy_vs_llm": correct / total,
+        "coverage": confident / total,
+        "accuracy_when_confident": confident_correct / confident if confident else 0.0,
+        "escalation_rate": 1.0 - confident / total,
+        "per_class": per_class,
+        "confusion": confusion,
+        "latency_us": {
+            "p50": float(np.percentile(latencies, 50)),
+            "p99": float(np.percentile(latencies, 99)),
+        },
+    }
+
+
+# ===== Логи пар (текст, метка LLM) =====
+
+def read_examples(path: str) -> List[Tuple[str, str]]:
+    """Читает JSONL вида {"input": "...", "label": "anti_stress"}"""
+    examples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if record.get("label") in LABELS and record.get("input"):
+                examples.append((record["input"], record["label"]))
+    return examples
+
+
+_log_lock = threading.Lock()
+
+
+def log_labeled_example(path: str, text: str, label: str) -> None:
+    """Дописывает пару (текст, метка LLM) в JSONL для последующего обучения"""
+    if label not in LABELS or not text:
+        return
+    line = json.dumps({"input": text, "label": label, "ts": time.time()}, ensure_ascii=False)
+    with _log_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+
+# ===== Глобальный экземпляр =====
+
+_classifier: Optional[VibeClassifier] = None
+_classifier_loaded = False
+
+
+def get_vibe_classifier() -> Optional[VibeClassifier]:
+    """Лениво загружает модель из настроек; None, если модель не настроена"""
+    global _classifier, _classifier_loaded
+    if _classifier_loaded:
+        return _classifier
+
+    from backend.core.config import settings
+
+    path = settings.vibe_classifier_path
+    if path and os.path.exists(path):
+        try:
+            _classifier = VibeClassifier.load(path, threshold=settings.vibe_classifier_threshold)
+        except Exception:
+            logger.exception("Не удалось загрузить классификатор вайба из %s", path)
+    elif path:
+        logger.warning("Файл классификатора вайба не найден: %s", path)
+
+    _classifier_loaded = True
+    return _classifier
+
+
+# ===== CLI =====
+
+def _split(examples: List[Tuple[str, str]], holdout: float, seed: int):
+    shuffled = list(examples)
+    random.Random(seed).shuffle(shuffled)
+    cut = int(len(shuffled) * (1 - holdout))
+    return shuffled[:cut], shuffled[cut:]
+
+
+def _print_report(report: dict) -> None:
+    print(f"Примеров: {report['examples']}, порог: {report['threshold']:.2f}")
+    print(f"Точность относительно LLM: {report['accuracy_vs_llm']:.3f}")
+    print(f"Покрытие (ответ без LLM): {report['coverage']:.3f}")
+    print(f"Точность на уверенных ответах: {report['accuracy_when_confident']:.3f}")
+    print(f"Латентность, мкс: p50={report['latency_us']['p50']:.1f} p99={report['latency_us']['p99']:.1f}")
+    for label, stats in report["per_class"].items():
+        print(f"  {label:<12} P={stats['precision']:.3f} R={stats['recall']:.3f} n={stats['support']}")
+
+
+def _write_report(report: dict, path: Optional[str]) -> None:
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Обучение и оценка локального классификатора вайба")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train_cmd = sub.add_parser("train", help="обучить модель на логах меток LLM")
+    train_cmd.add_argument("--data", required=True, help="JSONL с парами input/label")
+    train_cmd.add_argument("--out", required=True, help="куда сохранить .npz")
+    train_cmd.add_argument("--features", type=int, default=DEFAULT_N_FEATURES)
+    train_cmd.add_argument("--epochs", type=int, default=30)
+    train_cmd.add_argument("--lr", type=float, default=2.0)
+    train_cmd.add_argument("--holdout", type=float, default=0.2, help="доля отложенной выборки для отчёта")
+    train_cmd.add_argument("--threshold", type=float, default=0.75)
+    train_cmd.add_argument("--seed", type=int, default=42)
+    train_cmd.add_argument("--report", help="сохранить отчёт в JSON")
+
+    eval_cmd = sub.add_parser("eval", help="сравнить модель с метками LLM")
+    eval_cmd.add_argument("--data", required=True)
+    eval_cmd.add_argument("--model", required=True)
+    eval_cmd.add_argument("--threshold", type=float, default=0.75)
+    eval_cmd.add_argument("--report", help="сохранить отчёт в JSON")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "train":
+        examples = read_examples(args.data)
+        if not examples:
+            print("Нет размеченных примеров", file=sys.stderr)
+            return 1
+        train_set, holdout_set = _split(examples, args.holdout, args.seed)
+        started = time.perf_counter()
+        model = train(train_set, n_features=args.features, epochs=args.epochs,
+                      learning_rate=args.lr, seed=args.seed)
+        model.threshold = args.threshold
+        print(f"Обучено на {len(train_set)} примерах за {time.perf_counter() - started:.1f} c")
+        model.save(args.out)
+        if holdout_set:
+            report = evaluate(model, holdout_set)
+            _print_report(report)
+            _write_report(report, args.report)
+        return 0
+
+    examples = read_examples(args.data)
+    started = time.perf_counter()
+    model = VibeClassifier.load(args.model, threshold=args.threshold)
+    print(f"Модель загружена за {(time.perf_counter() - started) * 1000:.1f} мс")
+    report = evaluate(model, examples)
+    _print_report(report)
+    _write_report(report, args.report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+"""
+Числовая модель вайба по слайдерам усталости, стресса и мотивации.
+
+Без LLM и без NumPy: четыре линейных оценки и softmax — доли микросекунды.
+Может смешиваться с вероятностями текстового классификатора (vibeClassifier).
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+# Шкала слайдеров в клиенте: 1..5
+SLIDER_MIN = 1
+SLIDER_MAX = 5
+
+# Нейтральное значение для не переданного слайдера (после нормировки в 0..1)
+_MISSING = 0.5
+
+# Чем меньше температура, тем «увереннее» модель на крайних значениях
+_TEMPERATURE = 0.35
+
+
+@dataclass
+class SliderScore:
+    fatigue: float      # 0..1
+    stress: float       # 0..1
+    motivation: float   # 0..1
+    present: int        # сколько слайдеров передано
+    probabilities: Dict[str, float]
+
+    @property
+    def mode(self) -> str:
+        return max(self.probabilities, key=self.probabilities.get)
+
+    @property
+    def confidence(self) -> float:
+        return self.probabilities[self.mode]
+
+
+def _normalize(level: Optional[int]) -> Optional[float]:
+    if level is None:
+        return None
+    clamped = min(max(level, SLIDER_MIN), SLIDER_MAX)
+    return (clamped - SLIDER_MIN) / (SLIDER_MAX - SLIDER_MIN)
+
+
+def _softmax(scores: Dict[str, float]) -> Dict[str, float]:
+    top = max(scores.values())
+    exp = {mode: math.exp((score - top) / _TEMPERATURE) for mode, score in scores.items()}
+    total = sum(exp.values())
+    return {mode: value / total for mode, value in exp.items()}
+
+
+def score_sliders(
+        fatigue_level: Optional[int],
+        stress_level: Optional[int],
+        motivation_level: Optional[int],
+) -> Optional[SliderScore]:
+    """Оценивает режим по слайдерам; None, если ни один слайдер не передан"""
+    levels = [_normalize(fatigue_level), _normalize(stress_level), _normalize(motivation_level)]
+    present = sum(level is not None for level in levels)
+    if not present:
+        return None
+
+    f, s, m = (_MISSING if level is None else level for level in levels)
+    scores = {
+        "anti_stress": 1.2 * f - 0.6 * m,
+        "rage": 1.2 * s - 0.6 * f,
+        "boost": 1.0 * m - 0.6 * f - 0.4 * s,
+        "neutral": 0.5 - 0.8 * (abs(f - 0.5) + abs(s - 0.5) + abs(m - 0.5)),
+    }
+    probabilities = _softmax(scores)
+
+    # Частично заполненные слайдеры — меньше доверия: подмешиваем равномерное распределение
+    if present < 3:
+        weight = present / 3
+        uniform = 1 / len(probabilities)
+        probabilities = {mode: weight * p + (1 - weight) * uniform for mode, p in probabilities.items()}
+
+    return SliderScore(fatigue=f, stress=s, motivation=m, present=present, probabilities=probabilities)
+
+
+def combine_with_text(score: SliderScore, text_probabilities: Dict[str, float], text_weight: float) -> SliderScore:
+    """Смешивает вероятности слайдеров и текстового классификатора"""
+    probabilities = {
+        mode: (1 - text_weight) * p + text_weight * text_probabilities.get(mode, 0.0)
+        for mode, p in score.probabilities.items()
+    }
+    return SliderScore(
+        fatigue=score.fatigue,
+        stress=score.stress,
+        motivation=score.motivation,
+        present=score.present,
+        probabilities=probabilities,
+    )
+
+
+def recommend_intensity(base: float, score: SliderScore) -> float:
+    """Сдвигает интенсивность режима: мотивация повышает, усталость понижает"""
+    intensity = base + 0.2 * (score.motivation - 0.5) - 0.2 * (score.fatigue - 0.5)
+    return round(min(max(intensity, 0.1), 1.0), 2)
+
+
+def recommend_duration(base: int, score: SliderScore) -> int:
+    """Длительность в минутах, кратная 5, в пределах 10..90 (как в WorkoutRequest)"""
+    factor = 1 + 0.4 * (score.motivation - 0.5) - 0.4 * (score.fatigue - 0.5)
+    duration = int(round(base * factor / 5) * 5)
+    return min(max(duration, 10), 90)
@@ -0,0 +1,110 @@
+"""
+Спекулятивная генерация тренировки, пока пользователь ещё на экране вайба.
+
+Сценарий всегда один: /vibe/assess, затем /workout/generate с тем же режимом
+и рекомендованной длительностью — два последовательных ожидания LLM. Оценка
+вайба сразу запускает генерацию вероятной тренировки в фоне и отдаёт токен;
+/workout/generate с этим токеном и совпадающими параметрами забирает готовый
+(или ещё генерируемый) результат вместо нового запроса к LLM.
+
+Токен одноразовый и привязан к пользователю. Незавершённая генерация живёт в
+памяти воркера, готовый результат — в shared_cache (его заберёт любой воркер)
+до истечения TTL. Доля использованных заготовок — workout_prefetch_total{outcome}.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import secrets
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from backend.core.metrics import WORKOUT_PREFETCH
+from backend.core.shared_cache import get_cache
+
+PrefetchKey = Tuple[str, int, str]  # (vibe_mode, duration_min, fitness_level)
+
+OUTCOME_STARTED = "started"
+OUTCOME_SKIPPED = "skipped"        # лимит фоновых генераций
+OUTCOME_HIT = "hit"                # результат уже был готов
+OUTCOME_HIT_PENDING = "hit_pending"  # дождались идущей генерации
+OUTCOME_MISMATCH = "mismatch"      # пользователь поменял параметры
+OUTCOME_MISS = "miss"              # токен неизвестен, истёк или уже использован
+
+
+class WorkoutPrefetcher:
+    def __init__(
+            self,
+            generate: Callable[[str, int], Awaitable[dict]],
+            ttl_sec: float = 300.0,
+            max_inflight: int = 100,
+    ) -> None:
+        self._generate = generate
+        self.ttl_sec = ttl_sec
+        self.max_inflight = max_inflight
+        # token → (ключ, пользователь, задача, время запуска)
+        self._inflight: Dict[str, Tuple[PrefetchKey, Optional[str], asyncio.Task, float]] = {}
+
+    def start(self, key: PrefetchKey, principal: Optional[str]) -> Optional[str]:
+        """Запускает фоновую генерацию; возвращает токен или None, если мест нет"""
+        self.expire()
+        if len(self._inflight) >= self.max_inflight:
+            WORKOUT_PREFETCH.inc(OUTCOME_SKIPPED)
+            return None
+
+        token = secrets.token_urlsafe(16)
+        task = asyncio.get_running_loop().create_task(self._run(token, key, principal))
+        self._inflight[token] = (key, principal, task, time.monotonic())
+        WORKOUT_PREFETCH.inc(OUTCOME_STARTED)
+        return token
+
+    async def _run(self, token: str, key: PrefetchKey, principal: Optional[str]) -> dict:
+        vibe_mode, duration, _ = key
+        try:
+            result = await self._generate(vibe_mode, duration)
+            get_cache().set(
+                f"prefetch:{token}",
+                {"key": list(key), "principal": principal, "result": result},
+                ttl=self.ttl_sec,
+            )
+            return result
+        finally:
+            self._inflight.pop(token, None)
+
+    async def claim(self, token: str, key: PrefetchKey, principal: Optional[str]) -> Optional[dict]:
+        """Результат заготовки, если токен действителен и параметры совпадают; иначе None"""
+        cache = get_cache()
+        if not cache.add(f"prefetch_claim:{token}", 1, ttl=self.ttl_sec):
+            WORKOUT_PREFETCH.inc(OUTCOME_MISS)
+            return None
+
+        inflight = self._inflight.pop(token, None)
+        if inflight is not None:
+            inflight_key, owner, task, _ = inflight
+            if inflight_key != key or owner != principal:
+                task.cancel()
+                WORKOUT_PREFETCH.inc(OUTCOME_MISMATCH)
+                return None
+            result = await task
+            cache.delete(f"prefetch:{token}")
+            WORKOUT_PREFETCH.inc(OUTCOME_HIT_PENDING)
+            return result
+
+        entry = cache.get(f"prefetch:{token}")
+        if entry is None:
+            WORKOUT_PREFETCH.inc(OUTCOME_MISS)
+            return None
+        cache.delete(f"prefetch:{token}")
+        if tuple(entry["key"]) != key or entry["principal"] != principal:
+            WORKOUT_PREFETCH.inc(OUTCOME_MISMATCH)
+            return None
+        WORKOUT_PREFETCH.inc(OUTCOME_HIT)
+        return entry["result"]
+
+    def expire(self) -> None:
+        """Снимает зависшие генерации старше TTL"""
+        deadline = time.monotonic() - self.ttl_sec
+        for token, (_, _, task, started) in list(self._inflight.items()):
+            if started < deadline:
+                task.cancel()
+                self._inflight.pop(token, None)
@@ -0,0 +1,53 @@
+"""
+Компактное хранение JSON-документов в БД: JSON без пробелов, сжатый zstd
+(если установлен zstandard) или zlib. Кодек пишется рядом с данными, поэтому
+записи, сжатые одним кодеком, читаются и после смены окружения.
+"""
+
+from __future__ import annotations
+
+import json
+import zlib
+from typing import Any, Tuple
+
+try:
+    import zstandard
+except ImportError:  # необязательная зависимость
+    zstandard = None
+
+CODEC_ZSTD = "zstd"
+CODEC_ZLIB = "zlib"
+CODEC_JSON = "json"
+
+ZSTD_LEVEL = 3
+ZLIB_LEVEL = 6
+
+
+def dumps(document: Any) -> bytes:
+    """Канонический JSON: одинаковый документ — одинаковые байты (годится для ETag)"""
+    return json.dumps(document, ensure_ascii=False, separators=(",", ":"), sort_keys=True, default=str).encode("utf-8")
+
+
+def compress(raw: bytes) -> Tuple[str, bytes]:
+    """(кодек, байты) для записи в БД"""
+    if zstandard is not None:
+        return CODEC_ZSTD, zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return CODEC_ZLIB, zlib.compress(raw, ZLIB_LEVEL)
+
+
+def pack(document: Any) -> Tuple[str, bytes]:
+    return compress(dumps(document))
+
+
+def unpack(codec: str, data: bytes) -> Any:
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Запись сжата zstd, а пакет zstandard не установлен")
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    elif codec == CODEC_ZLIB:
+        raw = zlib.decompress(data)
+    elif codec == CODEC_JSON:
+        raw = data
+    else:
+        raise ValueError(f"Неизвестный кодек: {codec}")
+    return json.loads(raw)
@@ -0,0 +1,135 @@
+"""
+Единая точка вызова LLM через OpenRouter (chat/completions).
+
+Рендерит шаблон из реестра промптов, держит один HTTP-клиент на процесс
+и учитывает расход токенов по шаблонам.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import httpx
+
+from backend.core.config import get_settings
+from backend.core.metrics import record_llm_call
+from backend.core.ratelimit import charge_quota, quota_allows
+from backend.core.tracing import KIND_CLIENT, span
+from backend.utils.prompts import PROMPTS, estimate_tokens
+
+_JSON_RE = re.compile(r"\{.*\}", re.DOTALL)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_api_key() -> Optional[str]:
+    return get_settings().openrouter_api_key or os.getenv("OPENAI_API_KEY")
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Общий клиент: переиспользует соединения с OpenRouter между запросами"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(base_url=get_settings().openrouter_base_url, timeout=get_settings().llm_timeout_sec)
+    return _client
+
+
+async def aclose_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def extract_json(content: str) -> Optional[dict]:
+    """Достаёт первый JSON-объект из текста ответа модели"""
+    match = _JSON_RE.search(content)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group())
+    except json.JSONDecodeError:
+        return None
+
+
+@dataclass
+class Completion:
+    content: Optional[str]
+    model: str
+    latency: float               # секунды
+    usage: Optional[dict] = None
+
+
+async def complete(
+        prompt: str,
+        model: str,
+        temperature: float,
+        max_tokens: Optional[int] = None,
+        **variables: Any,
+) -> Optional[Completion]:
+    """
+    Рендерит шаблон prompt из реестра и вызывает модель.
+    None — если ключа нет, дневная квота пользователя исчерпана или провайдер
+    ответил ошибкой (вызывающий уходит в fallback).
+    """
+    api_key = get_api_key()
+    if not api_key or not quota_allows(prompt):
+        return None
+
+    template = PROMPTS.get(prompt)
+    messages = template.render(**variables)
+    estimated_tokens = template.prefix_tokens + estimate_tokens(messages[-1]["content"])
+
+    payload = {"model": model, "messages": messages, "temperature": temperature}
+    if max_tokens is not None:
+        payload["max_tokens"] = max_tokens
+
+    started = time.perf_counter()
+    try:
+        with span("llm.chat_completion", KIND_CLIENT, prompt=template.key, model=model) as llm_span:
+            response = await _get_client().post(
+                "/chat/completions",
+                headers={
+                    "Authorization": f"Bearer {api_key}",
+                    "Content-Type": "application/json"
+                },
+                json=payload,
+            )
+            if llm_span is not None:
+                llm_span.attributes["http.status_code"] = response.status_code
+    except httpx.HTTPError as e:
+        record_llm_call(prompt, model, type(e).__name__, time.perf_counter() - started)
+        return None
+
+    latency = time.perf_counter() - started
+    if response.status_code != 200:
+        record_llm_call(prompt, model, f"http_{response.status_code}", latency)
+        return None
+
+    result = response.json()
+    usage = result.get("usage")
+    record_llm_call(prompt, model, "ok", latency, usage)
+    PROMPTS.record_usage(prompt, usage, estimated_tokens)
+    charge_quota((usage or {}).get("total_tokens", 0))
+    try:
+        content = result["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        content = None
+    return Completion(content=content, model=model, latency=latency, usage=usage)
+
+
+async def chat_completion(
+        prompt: str,
+        model: str,
+        temperature: float,
+        max_tokens: Optional[int] = None,
+        **variables: Any,
+) -> Optional[str]:
+    """Только текст ответа модели; None — как у complete()"""
+    completion = await complete(prompt, model, temperature, max_tokens, **variables)
+    return completion.content if completion else None
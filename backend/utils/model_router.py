@@ -0,0 +1,187 @@
+"""
+Маршрутизация задач по моделям: сначала самая быстрая и дешёвая модель лестницы,
+следующая — только если ответ не разобрался по схеме или модель в нём не уверена.
+
+Лестницы задаются по задаче (ключ шаблона в реестре промптов) и переопределяются
+через MODEL_LADDERS (JSON: {"vibe_assess": ["openai/gpt-4.1-mini"]}). Ошибка
+провайдера или исчерпанная квота — не повод эскалировать: вызывающий сразу
+уходит в fallback, а не ждёт ещё один таймаут.
+
+По каждой паре (задача, модель) копятся латентность, стоимость и доля эскалаций —
+в /metrics и GET /api/admin/models.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Generic, List, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from backend.core.config import get_settings
+from backend.core.metrics import LLM_COST, MODEL_ROUTE_OUTCOMES
+from backend.utils.llm_gateway import complete, extract_json
+
+T = TypeVar("T", BaseModel, str)
+
+# Стоимость за миллион токенов (prompt, completion), USD; пресеты OpenRouter не оцениваются
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "openai/gpt-4.1-nano": (0.10, 0.40),
+    "openai/gpt-4.1-mini": (0.40, 1.60),
+    "openai/gpt-4.1": (2.00, 8.00),
+    "openai/gpt-3.5-turbo": (0.50, 1.50),
+}
+
+DEFAULT_LADDERS: Dict[str, List[str]] = {
+    "vibe_assess": ["openai/gpt-4.1-nano", "openai/gpt-4.1-mini"],
+    "workout_generate": ["openai/gpt-4.1-nano", "openai/gpt-4.1-mini"],
+    "profile_analyze": ["openai/gpt-4.1-mini", "openai/gpt-4.1"],
+    "forecast_30days": ["openai/gpt-4.1-mini", "openai/gpt-4.1"],
+    # Голос тренера настроен в пресете OpenRouter — его не подменяем
+    "coach_comment": ["@preset/neuro-trainer"],
+    "coach_phrase_batch": ["@preset/neuro-trainer"],
+    "chat": ["openai/gpt-4.1-mini"],
+}
+
+# Ниже — ответ считается неуверенным и задача уходит на следующую ступень
+MIN_CONFIDENCE: Dict[str, float] = {
+    "vibe_assess": 0.6,
+}
+
+OUTCOME_ACCEPTED = "accepted"
+OUTCOME_PARSE_FAILURE = "parse_failure"
+OUTCOME_LOW_CONFIDENCE = "low_confidence"
+OUTCOME_NO_RESPONSE = "no_response"
+
+LATENCY_WINDOW = 500
+
+
+def ladder(task: str) -> List[str]:
+    return get_settings().model_ladders.get(task) or DEFAULT_LADDERS[task]
+
+
+def estimate_cost(model: str, usage: Optional[dict]) -> float:
+    prices = MODEL_PRICES.get(model)
+    if not prices or not usage:
+        return 0.0
+    prompt_price, completion_price = prices
+    return (usage.get("prompt_tokens", 0) * prompt_price
+            + usage.get("completion_tokens", 0) * completion_price) / 1_000_000
+
+
+class _ModelStats:
+    def __init__(self) -> None:
+        self.outcomes: Dict[str, int] = {}
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.cost = 0.0
+
+    def snapshot(self) -> dict:
+        latencies = sorted(self.latencies)
+        calls = sum(self.outcomes.values())
+        escalated = self.outcomes.get(OUTCOME_PARSE_FAILURE, 0) + self.outcomes.get(OUTCOME_LOW_CONFIDENCE, 0)
+
+        def pct(q: float) -> Optional[float]:
+            return round(latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1000, 1) if latencies else None
+
+        return {
+            "calls": calls,
+            "outcomes": dict(self.outcomes),
+            "escalation_rate": round(escalated / calls, 4) if calls else 0.0,
+            "latency_p50_ms": pct(0.5),
+            "latency_p95_ms": pct(0.95),
+            "cost_usd": round(self.cost, 6),
+            "cost_per_call_usd": round(self.cost / calls, 6) if calls else 0.0,
+        }
+
+
+class RouterStats:
+    def __init__(self) -> None:
+        self._stats: Dict[Tuple[str, str], _ModelStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, task: str, model: str, outcome: str, latency: Optional[float] = None, cost: float = 0.0) -> None:
+        MODEL_ROUTE_OUTCOMES.inc(task, model, outcome)
+        if cost:
+            LLM_COST.inc(task, model, amount=cost)
+        with self._lock:
+            stats = self._stats.setdefault((task, model), _ModelStats())
+            stats.outcomes[outcome] = stats.outcomes.get(outcome, 0) + 1
+            if latency is not None:
+                stats.latencies.append(latency)
+            stats.cost += cost
+
+    def snapshot(self) -> Dict[str, Dict[str, dict]]:
+        with self._lock:
+            items = sorted(self._stats.items())
+            result: Dict[str, Dict[str, dict]] = {}
+            for (task, model), stats in items:
+                result.setdefault(task, {})[model] = stats.snapshot()
+        return result
+
+
+router_stats = RouterStats()
+
+
+@dataclass
+class Routed(Generic[T]):
+    output: T
+    model: str
+    attempts: int
+
+
+def _parse(content: Optional[str], schema: Optional[Type[BaseModel]]):
+    """Объект схемы (или непустой текст без схемы); None — ответ не годится"""
+    if schema is None:
+        text = (content or "").strip()
+        return text or None
+    data = extract_json(content) if content else None
+    if data is None:
+        return None
+    try:
+        return schema.model_validate(data)
+    except ValidationError:
+        return None
+
+
+async def routed_completion(
+        task: str,
+        temperature: float,
+        schema: Optional[Type[BaseModel]] = None,
+        max_tokens: Optional[int] = None,
+        **variables: Any,
+) -> Optional[Routed]:
+    """
+    Проходит лестницу моделей задачи task (она же ключ шаблона промпта).
+    None — ни одна модель не дала годного ответа; вызывающий уходит в fallback.
+    """
+    models = ladder(task)
+    min_confidence = MIN_CONFIDENCE.get(task)
+    best: Optional[Routed] = None
+
+    for attempt, model in enumerate(models, start=1):
+        completion = await complete(task, model, temperature, max_tokens, **variables)
+        if completion is None:
+            router_stats.record(task, model, OUTCOME_NO_RESPONSE)
+            break
+
+        cost = estimate_cost(model, completion.usage)
+        output = _parse(completion.content, schema)
+        if output is None:
+            router_stats.record(task, model, OUTCOME_PARSE_FAILURE, completion.latency, cost)
+            continue
+
+        candidate = Routed(output=output, model=model, attempts=attempt)
+        confidence = getattr(output, "confidence", None)
+        if min_confidence is not None and confidence is not None and confidence < min_confidence:
+            router_stats.record(task, model, OUTCOME_LOW_CONFIDENCE, completion.latency, cost)
+            if best is None or confidence > best.output.confidence:
+                best = candidate
+            continue
+
+        router_stats.record(task, model, OUTCOME_ACCEPTED, completion.latency, cost)
+        return candidate
+
+    # Все ступени не уверены — лучший из разобранных ответов всё же лучше fallback
+    return best
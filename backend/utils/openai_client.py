@@ -1,17 +1,20 @@
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import List, Dict, Any, Optional
 
-from openai import OpenAI
-
-from backend.core.config import settings
+from backend.core.config import get_settings
 
 
 class OpenAIClient:
     """Клиент для работы с OpenRouter как с ChatGPT-подобной LLM."""
 
     def __init__(self) -> None:
+        # SDK тяжёлый — импортируем, только когда клиент действительно нужен
+        from openai import OpenAI
+
+        settings = get_settings()
         # OpenRouter работает как OpenAI API, только с другим base_url
         self.client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
+            base_url=settings.openrouter_base_url,
             api_key=settings.openrouter_api_key,
             # эти хедеры не обязательны, но полезны для статистики приложения
             default_headers={
@@ -23,17 +26,31 @@ class OpenAIClient:
     def chat(
         self,
         messages: List[Dict[str, Any]],
-        model: str = "openai/gpt-4.1-mini",
+        model: Optional[str] = None,
     ) -> str:
         """
         Отправить список сообщений в модель и вернуть текст ответа.
         Messages: [{"role": "user" / "system" / "assistant", "content": "..."}]
+        Model: по умолчанию — первая ступень лестницы "chat" (utils/model_router.py)
         """
+        if model is None:
+            from backend.utils.model_router import ladder
+
+            model = ladder("chat")[0]
         response = self.client.chat.completions.create(
             model=model,
             messages=messages,
         )
         return response.choices[0].message.content
 
-# Один общий экземпляр на приложение
-openai_client = OpenAIClient()
\ No newline at end of file
+@lru_cache
+def get_openai_client() -> OpenAIClient:
+    """Один общий экземпляр на приложение, создаётся при первом вызове"""
+    return OpenAIClient()
+
+
+def __getattr__(name: str):
+    # Совместимость со старым `from backend.utils.openai_client import openai_client`
+    if name == "openai_client":
+        return get_openai_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
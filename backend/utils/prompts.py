@@ -0,0 +1,327 @@
+"""
+Реестр промптов: версионированные шаблоны со статическим префиксом и бюджетом токенов.
+
+Статический префикс (инструкции и формат JSON) собирается один раз при регистрации
+и помечается для кэширования промпта на стороне провайдера. Переменные секции
+обрезаются по бюджету токенов, а фактический расход берётся из поля usage ответа.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from backend.utils.constants import EXERCISES
+
+# Грубая оценка: для смеси кириллицы и JSON ~3 символа на токен
+CHARS_PER_TOKEN = 3
+
+TRUNCATION_MARK = "…"
+
+
+def estimate_tokens(text: str) -> int:
+    """Оценка числа токенов без токенизатора"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _to_text(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+    return str(value)
+
+
+def truncate_to_budget(text: str, budget: int) -> str:
+    """Обрезает текст так, чтобы оценка токенов не превышала бюджет"""
+    if estimate_tokens(text) <= budget:
+        return text
+    limit = max(budget * CHARS_PER_TOKEN - len(TRUNCATION_MARK), 0)
+    return text[:limit] + TRUNCATION_MARK
+
+
+@dataclass
+class PromptUsage:
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    estimated_prompt_tokens: int = 0
+
+
+class PromptTemplate:
+    """Шаблон промпта: статический префикс + переменная часть (str.format)"""
+
+    def __init__(
+            self,
+            name: str,
+            version: int,
+            prefix: str,
+            body: str,
+            budgets: Optional[Dict[str, int]] = None,
+    ) -> None:
+        self.name = name
+        self.version = version
+        self.prefix = prefix.strip()
+        self.body = body.strip()
+        self.budgets = budgets or {}
+
+        # Компилируется один раз: одинаковый префикс байт-в-байт — условие кэша провайдера
+        self.prefix_message = {
+            "role": "system",
+            "content": [{"type": "text", "text": self.prefix, "cache_control": {"type": "ephemeral"}}],
+        }
+        self.prefix_tokens = estimate_tokens(self.prefix)
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}@v{self.version}"
+
+    def render_body(self, **variables: Any) -> str:
+        values = {}
+        for name, value in variables.items():
+            text = _to_text(value)
+            budget = self.budgets.get(name)
+            values[name] = truncate_to_budget(text, budget) if budget else text
+        return self.body.format(**values)
+
+    def render(self, **variables: Any) -> List[dict]:
+        """Сообщения для chat/completions: закэшированный префикс + переменная часть"""
+        return [self.prefix_message, {"role": "user", "content": self.render_body(**variables)}]
+
+    def render_text(self, **variables: Any) -> str:
+        """Промпт одной строкой — для провайдеров без поддержки сообщений"""
+        return f"{self.render_body(**variables)}\n\n{self.prefix}"
+
+    def estimate(self, **variables: Any) -> int:
+        return self.prefix_tokens + estimate_tokens(self.render_body(**variables))
+
+
+@dataclass
+class PromptRegistry:
+    _templates: Dict[str, PromptTemplate] = field(default_factory=dict)
+    _usage: Dict[str, PromptUsage] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def register(self, template: PromptTemplate) -> PromptTemplate:
+        current = self._templates.get(template.name)
+        if current is None or template.version >= current.version:
+            self._templates[template.name] = template
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        return self._templates[name]
+
+    def render(self, name: str, **variables: Any) -> List[dict]:
+        return self.get(name).render(**variables)
+
+    def record_usage(self, name: str, usage: Optional[dict], estimated_prompt_tokens: int = 0) -> None:
+        """Учитывает расход токенов по полю usage ответа провайдера"""
+        key = self.get(name).key if name in self._templates else name
+        usage = usage or {}
+        details = usage.get("prompt_tokens_details") or {}
+        with self._lock:
+            stats = self._usage.setdefault(key, PromptUsage())
+            stats.calls += 1
+            stats.prompt_tokens += usage.get("prompt_tokens") or 0
+            stats.completion_tokens += usage.get("completion_tokens") or 0
+            stats.cached_tokens += details.get("cached_tokens") or 0
+            stats.estimated_prompt_tokens += estimated_prompt_tokens
+
+    def usage_stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {key: vars(stats).copy() for key, stats in self._usage.items()}
+
+
+PROMPTS = PromptRegistry()
+
+
+# ===== Шаблоны =====
+
+COACH_STYLES = {
+    "strict": "Ты строгий армейский инструктор. Говори кратко, жёстко, по делу.",
+    "soft": "Ты заботливый поддерживающий друг. Подбадриваешь мягко и тепло.",
+    "comedy": "Ты юмористический комментатор. Шутишь, но при этом мотивируешь.",
+    "anime": "Ты аниме-сенсей. Говоришь драматично, с японскими терминами.",
+    "balanced": "Ты профессиональный тренер. Даёшь сбалансированные комментарии.",
+}
+
+PROMPTS.register(PromptTemplate(
+    name="vibe_assess",
+    version=1,
+    prefix="""
+Проанализируй состояние пользователя и определи режим тренировки:
+1. anti_stress - если усталость, стресс, нужна мягкая восстановительная тренировка
+2. rage - если агрессия, злость, нужна интенсивная силовая/кардио нагрузка
+3. boost - если хорошее настроение, энергия, можно дать сложную тренировку
+4. neutral - если нормальное состояние, стандартная тренировка
+
+Верни JSON: {
+  "mode": "anti_stress|rage|boost|neutral",
+  "confidence": 0.85,
+  "description": "краткое описание состояния",
+  "recommended_intensity": 0.7,
+  "coach_style": "strict|soft|comedy|anime|balanced",
+  "workout_duration": 30
+}
+""",
+    body="Описание пользователя: {text}",
+    budgets={"text": 300},
+))
+
+# Каталог упражнений в префиксе workout_generate: по slug клиент берёт подписи
+# из /catalog/exercises (компактный формат) и начисляет очки
+EXERCISE_CATALOG_LINES = "\n".join(f"- {cfg.slug}: {cfg.label}" for cfg in EXERCISES.values())
+
+PROMPTS.register(PromptTemplate(
+    name="workout_generate",
+    version=2,
+    prefix="""
+Режимы:
+- anti_stress: мягкая восстановительная тренировка, растяжка, дыхательные упражнения
+- rage: интенсивная силовая/кардио нагрузка, высокая интенсивность
+- boost: энергичная тренировка со сложными упражнениями
+- neutral: сбалансированная тренировка, средняя интенсивность
+
+Упражнения выбирай из каталога и указывай их slug, название — как в каталоге.
+Упражнение не из каталога (например, суставная разминка) — со "slug": null.
+Каталог (slug: название):
+""" + EXERCISE_CATALOG_LINES + """
+
+Верни JSON структуру тренировки:
+{
+  "intensity": 0.7,
+  "estimated_calories": 250,
+  "warm_up": [
+    {"slug": null, "name": "название", "duration_sec": 180, "instructions": "описание", "difficulty": "easy"}
+  ],
+  "main_block": [
+    {"slug": "squat", "name": "Приседания", "duration_sec": 300, "instructions": "описание", "difficulty": "medium"}
+  ],
+  "cool_down": [
+    {"slug": "stretching", "name": "Растяжка (ноги/спина/руки)", "duration_sec": 180, "instructions": "описание", "difficulty": "easy"}
+  ]
+}
+""",
+    body="Сгенерируй план тренировки на {duration} минут для режима: {vibe_mode}",
+    budgets={"vibe_mode": 20},
+))
+
+PROMPTS.register(PromptTemplate(
+    name="coach_comment",
+    version=1,
+    prefix="""
+Ты комментируешь выполнение упражнений от лица тренера в заданном стиле.
+Сгенерируй одну короткую реплику тренера (до 10 слов) для этого момента.
+Только реплику, без пояснений.
+""",
+    body="""
+{style_description}
+
+Упражнение: {exercise}
+Результат: {result}
+Прогресс пользователя: {progress}%
+Контекст: {context}
+""",
+    budgets={"exercise": 50, "context": 200},
+))
+
+PROMPTS.register(PromptTemplate(
+    name="coach_phrase_batch",
+    version=1,
+    prefix="""
+Ты пишешь реплики тренера для фитнес-приложения в заданном стиле.
+Каждая реплика — до 10 слов, без нумерации и пояснений, все реплики разные.
+
+Верни JSON: {"phrases": ["реплика 1", "реплика 2"]}
+""",
+    body="""
+{style_description}
+
+Категория упражнения: {category}
+Результат: {result}
+Прогресс пользователя: {progress}
+Количество реплик: {count}
+""",
+))
+
+PROMPTS.register(PromptTemplate(
+    name="profile_analyze",
+    version=1,
+    prefix="""
+Проанализируй спортивный профиль пользователя на основе истории тренировок.
+
+Проанализируй и верни JSON:
+{
+  "user_type": "тип пользователя (например: новичок, энтузиаст, спортсмен)",
+  "analysis": "анализ тренировочных привычек (2-3 предложения)",
+  "strengths": ["сильная сторона 1", "сильная сторона 2"],
+  "weaknesses": ["слабая сторона 1", "слабая сторона 2"],
+  "recommendations": ["рекомендация 1", "рекомендация 2", "рекомендация 3"],
+  "optimal_training_schedule": {
+    "frequency": "рекомендуемая частота",
+    "duration": "рекомендуемая длительность",
+    "intensity": "рекомендуемая интенсивность",
+    "coach_style": "рекомендуемый стиль тренера"
+  }
+}
+""",
+    body="""
+История тренировок:
+{history_summary}
+
+Цели пользователя: {goals}
+""",
+    budgets={"history_summary": 400, "goals": 200},
+))
+
+PROMPTS.register(PromptTemplate(
+    name="forecast_30days",
+    version=1,
+    prefix="""
+Создай прогноз спортивной формы на 30 дней.
+
+Верни JSON с двумя сценариями:
+{
+  "optimistic_scenario": {
+    "description": "если тренироваться по плану",
+    "improvements": {
+      "endurance": "+X%",
+      "strength": "+X%",
+      "flexibility": "+X%",
+      "wellbeing": "+X%"
+    },
+    "key_achievements": ["достижение 1", "достижение 2"]
+  },
+  "pessimistic_scenario": {
+    "description": "если пропускать тренировки",
+    "changes": {
+      "endurance": "-X%",
+      "strength": "-X%",
+      "flexibility": "-X%",
+      "wellbeing": "-X%"
+    },
+    "risks": ["риск 1", "риск 2"]
+  },
+  "comparison": {
+    "difference_description": "разница между сценариями",
+    "motivational_message": "мотивационное сообщение"
+  },
+  "key_milestones": [
+    {"day": 7, "title": "первая неделя", "description": "описание"}
+  ],
+  "recommendations": ["рекомендация 1", "рекомендация 2"]
+}
+""",
+    body="""
+Текущие показатели:
+{current_stats}
+
+Планируемые тренировки: {planned_count} тренировок
+Уровень регулярности: {consistency}%
+Цели: {goals}
+""",
+    budgets={"current_stats": 500, "goals": 200},
+))
@@ -0,0 +1,34 @@
+"""
+ULID: 48 бит времени (мс) + 80 бит случайности, 26 символов Crockford base32.
+
+Идентификаторы сортируются по времени создания с точностью до миллисекунды.
+Случайная часть берётся из os.urandom заново для каждого идентификатора, без
+монотонного режима спецификации (+1 внутри одной миллисекунды): id планов и
+задач анонимных пользователей служат ключом доступа, и соседний id не должен
+выводиться из своего. Порядок внутри одной миллисекунды не гарантируется.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_RANDOM_BYTES = 10  # 80 бит
+
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        value, index = divmod(value, 32)
+        chars.append(_ALPHABET[index])
+    return "".join(reversed(chars))
+
+
+def new_ulid() -> str:
+    now_ms = time.time_ns() // 1_000_000
+    return _encode(now_ms, 10) + _encode(int.from_bytes(os.urandom(_RANDOM_BYTES), "big"), 16)
+
+
+def is_ulid(value: str) -> bool:
+    return len(value) == 26 and all(ch in _ALPHABET for ch in value.upper())
@@ -0,0 +1,3 @@
+"""
+Замеры производительности и бюджеты (запуск из корня репозитория: python -m benchmarks.<скрипт>)
+"""
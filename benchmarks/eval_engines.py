@@ -0,0 +1,540 @@
+"""
+Офлайн-сравнение путей ответа по эндпоинтам: LLM против локальных движков.
+
+Каждый вход корпуса прогоняется через путь LLM (настоящий код эндпоинта и
+маршрутизатор моделей, но запросы уходят в заглушку benchmarks.llm_stub внутри
+процесса — с заготовками или записанными ответами модели) и через локальные пути:
+fallback_analysis, слайдеры, локальный классификатор вайба (если настроен
+VIBE_CLASSIFIER_PATH), generate_fallback_workout, analyze_profile_fallback,
+generate_forecast_fallback.
+
+По каждому пути: распределение задержки, покрытие (локальный путь может
+отказаться отвечать), доля ответов, проходящих схему ответа LLM, и совпадение с
+метками корпуса. Вердикт — можно ли сделать локальный путь основным.
+
+Корпус — JSONL {"endpoint": "vibe|workout|profile|forecast", "input": {...},
+"label": {...}}. Метка — ожидаемые значения полей ответа (путь через точку):
+строка/число — точное совпадение (числа с допуском 15%), словарь — условие
+{"approx": 30, "tol": 0.25}, {"min_items": 3}, {"min": 0.5}, {"in": [...]}.
+Без --corpus используется встроенный небольшой корпус.
+
+Путь прогоняется только по входам, на которые он рассчитан: слайдеры — по
+входам со слайдерами (шкала 1..5, как в клиенте), текстовые пути — по входам
+с текстом. Слайдеры вместе с текстом путь sliders оценивает только с
+локальным классификатором — такие входы помечены "requires": ["classifier"]
+и без VIBE_CLASSIFIER_PATH пропускаются (столбец skip), а не снижают покрытие.
+
+    python -m benchmarks.eval_engines --html eval.html --json eval.json
+    python -m benchmarks.eval_engines --corpus holdout.jsonl --responses recorded.jsonl --stub-latency-ms 900
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import html
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from benchmarks.micro import WORKOUT_HISTORY
+from benchmarks.report import percentile
+
+NUMBER_TOLERANCE = 0.15
+
+# Путь ответа: (имя, async (input) -> dict | None); None — путь не берётся отвечать
+Path = Tuple[str, Callable[[dict], Awaitable[Optional[dict]]]]
+
+
+# ===== Корпус =====
+
+SLIDERS = ("fatigue_level", "stress_level", "motivation_level")
+
+
+def default_corpus() -> List[dict]:
+    # Слайдеры (усталость, стресс, мотивация) — по шкале клиента 1..5 (vibeScoring.SLIDER_MAX)
+    vibe = [
+        ("Устал после работы, сил нет", "anti_stress", None),
+        ("Плохо спал, хочется чего-то спокойного", "anti_stress", (5, 2, 2)),
+        ("Голова гудит, усталость накопилась за неделю", "anti_stress", None),
+        ("Вымотан, но хочу немного размяться", "anti_stress", (4, 2, 2)),
+        ("", "anti_stress", (5, 2, 1)),
+        ("", "anti_stress", (5, 3, 2)),
+        ("Злой как чёрт после совещания", "rage", None),
+        ("Раздражен, хочу выпустить пар", "rage", (2, 5, 3)),
+        ("Бесит всё, нужна жёсткая тренировка", "rage", None),
+        ("Злость кипит, дайте грушу", "rage", (1, 5, 4)),
+        ("", "rage", (2, 5, 3)),
+        ("", "rage", (2, 4, 3)),
+        ("Полон энергии, давай на максимум!", "boost", None),
+        ("Отличное настроение и мотивация", "boost", (1, 1, 5)),
+        ("Бодрый с утра, готов к рекордам", "boost", None),
+        ("Выспался, хочется двигаться", "boost", (1, 2, 5)),
+        ("", "boost", (1, 1, 5)),
+        ("", "boost", (2, 2, 4)),
+        ("Обычный день, потренируюсь", "neutral", None),
+        ("Нормально, ничего особенного", "neutral", (3, 3, 3)),
+        ("Просто хочу позаниматься полчаса", "neutral", None),
+        ("Как обычно", "neutral", None),
+        ("", "neutral", (3, 3, 3)),
+    ]
+    corpus = []
+    for text, mode, sliders in vibe:
+        item = {"user_input": text}
+        entry = {"endpoint": "vibe", "input": item, "label": {"mode": mode}}
+        if sliders:
+            item.update(zip(SLIDERS, sliders))
+            if text:
+                # С текстом путь sliders отвечает только вместе с локальным классификатором
+                entry["requires"] = ["classifier"]
+        corpus.append(entry)
+
+    for mode in ("anti_stress", "rage", "boost", "neutral"):
+        for duration in (20, 30, 45, 60):
+            corpus.append({
+                "endpoint": "workout",
+                "input": {"vibe_mode": mode, "duration_min": duration},
+                "label": {
+                    "_total_min": {"approx": duration, "tol": 0.25},
+                    "main_block": {"min_items": 2},
+                    "_catalog_share": {"min": 0.5},
+                },
+            })
+
+    sporadic = [dict(w, completed=i % 3 == 0) for i, w in enumerate(WORKOUT_HISTORY)]
+    for history, goals, label in (
+            ([], [], {"user_type": "новичок", "recommendations": {"min_items": 3}}),
+            (WORKOUT_HISTORY, ["выносливость"], {"recommendations": {"min_items": 3}, "strengths": {"min_items": 1}}),
+            (sporadic, ["похудеть"], {"weaknesses": {"min_items": 1}, "recommendations": {"min_items": 3}}),
+            (WORKOUT_HISTORY[:5], [], {"recommendations": {"min_items": 3}}),
+    ):
+        corpus.append({"endpoint": "profile", "input": {"workout_history": history, "user_goals": goals},
+                       "label": label})
+
+    for stats, consistency in (({"weight": 80, "pushups": 20}, 0.9), ({"weight": 65}, 0.5),
+                               ({"weight": 95, "pushups": 5, "plank_sec": 30}, 0.3), ({}, 0.7)):
+        corpus.append({
+            "endpoint": "forecast",
+            "input": {"current_stats": stats, "planned_workouts": [], "consistency_level": consistency},
+            "label": {"key_milestones": {"min_items": 3}, "recommendations": {"min_items": 3},
+                      "optimistic_scenario.improvements": {"min_items": 1}},
+        })
+    return corpus
+
+
+def load_corpus(path: str) -> List[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# ===== Пути по эндпоинтам =====
+
+def _fallbacks(endpoint: str) -> float:
+    from backend.core.metrics import FALLBACK_HITS
+
+    return sum(FALLBACK_HITS.value(endpoint, reason) for reason in ("no_api_key", "bad_response", "error"))
+
+
+def _llm_path(endpoint: str, call: Callable[[dict], Awaitable[dict]]) -> Callable[[dict], Awaitable[Optional[dict]]]:
+    """Эндпоинт сам уходит в fallback при плохом ответе — отмечаем такие ответы"""
+    async def run(data: dict) -> Optional[dict]:
+        before = _fallbacks(endpoint)
+        output = await call(data)
+        if _fallbacks(endpoint) > before:
+            output = dict(output, _served_by_fallback=True)
+        return output
+    return run
+
+
+def _sync(fn: Callable[[dict], Optional[dict]]) -> Callable[[dict], Awaitable[Optional[dict]]]:
+    async def run(data: dict) -> Optional[dict]:
+        return fn(data)
+    return run
+
+
+def vibe_paths() -> List[Path]:
+    from backend.api.endpoints import vibe
+
+    def request(data: dict):
+        return vibe.VibeAssessmentRequest.model_validate(data)
+
+    paths: List[Path] = [
+        ("llm", _llm_path("vibe", lambda d: vibe.analyze_with_ai(d["user_input"]))),
+        ("fallback", _sync(lambda d: vibe.fallback_analysis(d["user_input"]))),
+        ("sliders", _sync(lambda d: vibe.score_numerically(request(d)))),
+    ]
+    if vibe.get_vibe_classifier() is not None:
+        paths.append(("classifier", _sync(lambda d: vibe.classify_locally(d["user_input"]))))
+    return paths
+
+
+def capabilities() -> set:
+    """Что из локальных движков доступно в этом окружении (для "requires" корпуса)"""
+    from backend.api.endpoints import vibe
+
+    return {"classifier"} if vibe.get_vibe_classifier() is not None else set()
+
+
+def vibe_applicable(name: str, item: dict) -> bool:
+    data = item["input"]
+    if name == "sliders":
+        return any(data.get(key) is not None for key in SLIDERS)
+    # LLM, fallback_analysis и классификатор оценивают только текст
+    return bool(data.get("user_input", "").strip())
+
+
+def workout_paths() -> List[Path]:
+    from backend.api.endpoints.workout import generate_fallback_workout, generate_workout_with_ai
+
+    return [
+        ("llm", _llm_path("workout", lambda d: generate_workout_with_ai(d["vibe_mode"], d["duration_min"]))),
+        ("fallback", _sync(lambda d: generate_fallback_workout(d["vibe_mode"], d["duration_min"]))),
+    ]
+
+
+def profile_paths() -> List[Path]:
+    from backend.api.endpoints.profile import analyze_profile_fallback, analyze_profile_with_ai
+
+    return [
+        ("llm", _llm_path("profile", lambda d: analyze_profile_with_ai(d["workout_history"], d.get("user_goals", [])))),
+        ("fallback", _sync(lambda d: analyze_profile_fallback(d["workout_history"]))),
+    ]
+
+
+def forecast_paths() -> List[Path]:
+    from backend.api.endpoints.forecast import generate_forecast_fallback, generate_forecast_with_ai
+
+    return [
+        ("llm", _llm_path("forecast", lambda d: generate_forecast_with_ai(
+            d["current_stats"], d.get("planned_workouts", []), d.get("consistency_level", 0.7),
+            d.get("user_goals", [])))),
+        ("fallback", _sync(lambda d: generate_forecast_fallback(d["current_stats"], d.get("consistency_level", 0.7)))),
+    ]
+
+
+# ===== Схема ответа и производные поля =====
+
+def _valid(schema, document: dict) -> bool:
+    from pydantic import ValidationError
+
+    try:
+        schema.model_validate(document)
+        return True
+    except ValidationError:
+        return False
+
+
+def vibe_valid(output: dict) -> bool:
+    from backend.schemas.llm import VibeLLMOutput
+
+    return _valid(VibeLLMOutput, {
+        "mode": output.get("mode"), "confidence": output.get("confidence"),
+        "description": output.get("description"), "recommended_intensity": output.get("intensity"),
+        "coach_style": output.get("coach_style"), "workout_duration": output.get("duration"),
+    })
+
+
+def workout_derived(output: dict) -> dict:
+    from backend.api.endpoints.workout import compact_exercise
+
+    exercises = [ex for block in ("warm_up", "main_block", "cool_down") for ex in output.get(block, [])]
+    known = sum(1 for ex in exercises if "slug" in compact_exercise(ex))
+    return {
+        "_total_min": sum(ex.get("duration_sec", 0) for ex in exercises) / 60,
+        "_catalog_share": known / len(exercises) if exercises else 0.0,
+    }
+
+
+@dataclass
+class EndpointSpec:
+    paths: Callable[[], List[Path]]
+    valid: Callable[[dict], bool]
+    derived: Callable[[dict], dict] = lambda output: {}
+    # (путь, вход) -> рассчитан ли путь на такой вход
+    applicable: Callable[[str, dict], bool] = lambda name, item: True
+    # Пути, которым нужны движки из "requires" входа; остальные отвечают без них
+    gated: Tuple[str, ...] = ()
+
+
+def _schema_check(schema_name: str) -> Callable[[dict], bool]:
+    def check(output: dict) -> bool:
+        from backend.schemas import llm
+
+        return _valid(getattr(llm, schema_name), output)
+    return check
+
+
+ENDPOINTS: Dict[str, EndpointSpec] = {
+    "vibe": EndpointSpec(vibe_paths, vibe_valid, applicable=vibe_applicable, gated=("sliders",)),
+    "workout": EndpointSpec(workout_paths, _schema_check("WorkoutLLMOutput"), workout_derived),
+    "profile": EndpointSpec(profile_paths, _schema_check("ProfileLLMOutput")),
+    "forecast": EndpointSpec(forecast_paths, _schema_check("ForecastLLMOutput")),
+}
+
+
+# ===== Сравнение с меткой =====
+
+def lookup(document: Any, path: str) -> Any:
+    for part in path.split("."):
+        if isinstance(document, dict):
+            document = document.get(part)
+        elif isinstance(document, list) and part.isdigit() and int(part) < len(document):
+            document = document[int(part)]
+        else:
+            return None
+    return document
+
+
+def matches(expected: Any, actual: Any) -> bool:
+    if isinstance(expected, dict):
+        if actual is None:
+            return False
+        if "min_items" in expected:
+            return hasattr(actual, "__len__") and len(actual) >= expected["min_items"]
+        if "approx" in expected:
+            tol = expected.get("tol", NUMBER_TOLERANCE)
+            return isinstance(actual, (int, float)) and abs(actual - expected["approx"]) <= tol * abs(expected["approx"])
+        if "min" in expected:
+            return isinstance(actual, (int, float)) and actual >= expected["min"]
+        if "in" in expected:
+            return actual in expected["in"]
+        return actual == expected
+    if isinstance(expected, (int, float)) and not isinstance(expected, bool):
+        return isinstance(actual, (int, float)) and abs(actual - expected) <= NUMBER_TOLERANCE * max(abs(expected), 1)
+    if isinstance(expected, str) and isinstance(actual, str):
+        return expected.strip().lower() == actual.strip().lower()
+    return expected == actual
+
+
+def score_label(label: dict, output: dict) -> Tuple[float, List[str]]:
+    """Доля полей метки, совпавших с ответом, и список несовпавших"""
+    if not label:
+        return 1.0, []
+    missed = [path for path, expected in label.items() if not matches(expected, lookup(output, path))]
+    return 1 - len(missed) / len(label), missed
+
+
+# ===== Прогон =====
+
+@dataclass
+class PathStats:
+    latencies_ms: List[float] = field(default_factory=list)
+    attempted: int = 0
+    skipped: int = 0
+    answered: int = 0
+    valid: int = 0
+    served_by_fallback: int = 0
+    errors: int = 0
+    quality: List[float] = field(default_factory=list)
+    missed_fields: Dict[str, int] = field(default_factory=dict)
+
+    def summary(self) -> dict:
+        latencies = sorted(self.latencies_ms)
+        return {
+            "inputs": self.attempted,
+            "skipped": self.skipped,
+            "coverage": self.answered / self.attempted if self.attempted else 0.0,
+            # Путь, не ответивший ни разу, оценивать не по чему
+            "validity": self.valid / self.answered if self.answered else None,
+            "quality": sum(self.quality) / len(self.quality) if self.quality else None,
+            "served_by_fallback": self.served_by_fallback,
+            "errors": self.errors,
+            "mean_ms": sum(latencies) / len(latencies) if latencies else 0.0,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "missed_fields": dict(sorted(self.missed_fields.items(), key=lambda kv: -kv[1])),
+        }
+
+
+async def evaluate(corpus: List[dict]) -> Dict[str, Dict[str, dict]]:
+    available = capabilities()
+    results: Dict[str, Dict[str, dict]] = {}
+    for endpoint, spec in ENDPOINTS.items():
+        items = [item for item in corpus if item["endpoint"] == endpoint]
+        if not items:
+            continue
+        stats: Dict[str, PathStats] = {}
+        for name, run in spec.paths():
+            path_stats = stats[name] = PathStats()
+            for item in items:
+                if not spec.applicable(name, item):
+                    continue
+                if name in spec.gated and not available.issuperset(item.get("requires", ())):
+                    path_stats.skipped += 1
+                    continue
+                path_stats.attempted += 1
+                start = time.perf_counter()
+                try:
+                    output = await run(item["input"])
+                except Exception:
+                    path_stats.errors += 1
+                    continue
+                path_stats.latencies_ms.append((time.perf_counter() - start) * 1000)
+                if output is None:
+                    continue  # локальный путь не уверен — ответил бы LLM
+                path_stats.answered += 1
+                path_stats.served_by_fallback += bool(output.pop("_served_by_fallback", False))
+                path_stats.valid += spec.valid(output)
+                quality, missed = score_label(item.get("label") or {}, {**output, **spec.derived(output)})
+                path_stats.quality.append(quality)
+                for path in missed:
+                    path_stats.missed_fields[path] = path_stats.missed_fields.get(path, 0) + 1
+        results[endpoint] = {name: s.summary() for name, s in stats.items()}
+    return results
+
+
+def verdicts(results: Dict[str, Dict[str, dict]], min_validity: float, min_coverage: float,
+             quality_margin: float) -> Dict[str, dict]:
+    """Локальный путь может стать основным, если он валиден, покрывает входы и не хуже LLM"""
+    decisions = {}
+    for endpoint, paths in results.items():
+        llm_quality = paths.get("llm", {}).get("quality") or 0.0
+        candidates = {}
+        for name, summary in paths.items():
+            if name == "llm":
+                continue
+            reasons = []
+            if summary["coverage"] < min_coverage:
+                reasons.append(f"покрытие {summary['coverage']:.0%} < {min_coverage:.0%}")
+            if summary["validity"] is not None and summary["validity"] < min_validity:
+                reasons.append(f"схема {summary['validity']:.0%} < {min_validity:.0%}")
+            if summary["quality"] is not None and summary["quality"] < llm_quality - quality_margin:
+                reasons.append(f"качество {summary['quality']:.0%} против {llm_quality:.0%} у LLM")
+            candidates[name] = reasons
+        ready = [name for name, reasons in candidates.items() if not reasons]
+        decisions[endpoint] = {
+            "default": ready[0] if ready else "llm",
+            "candidates": candidates,
+        }
+    return decisions
+
+
+# ===== Отчёт =====
+
+def _pct(value: Optional[float]) -> str:
+    return "—" if value is None else f"{value:.0%}"
+
+
+def format_table(results: Dict[str, Dict[str, dict]], decisions: Dict[str, dict]) -> str:
+    lines = [f"{'endpoint':<10} {'path':<11} {'inputs':>6} {'skip':>5} {'cover':>6} {'schema':>7} {'quality':>8} "
+             f"{'p50 ms':>9} {'p95 ms':>9} {'fallback':>9}"]
+    for endpoint, paths in results.items():
+        for name, s in paths.items():
+            lines.append(f"{endpoint:<10} {name:<11} {s['inputs']:>6} {s['skipped']:>5} "
+                         f"{s['coverage']:>6.0%} {_pct(s['validity']):>7} "
+                         f"{_pct(s['quality']):>8} {s['p50_ms']:>9.3f} {s['p95_ms']:>9.3f} {s['served_by_fallback']:>9}")
+        decision = decisions[endpoint]
+        lines.append(f"{'':<10} → по умолчанию: {decision['default']}")
+        for name, reasons in decision["candidates"].items():
+            if reasons:
+                lines.append(f"{'':<12}{name}: {'; '.join(reasons)}")
+    return "\n".join(lines)
+
+
+def render_html(report: dict) -> str:
+    e = html.escape
+    rows = []
+    for endpoint, paths in report["results"].items():
+        decision = report["decisions"][endpoint]
+        for name, s in paths.items():
+            reasons = decision["candidates"].get(name)
+            verdict = "основной" if name == decision["default"] else ("; ".join(reasons) if reasons else "")
+            missed = ", ".join(f"{k} ×{v}" for k, v in s["missed_fields"].items())
+            rows.append(
+                f"<tr class='{'default' if name == decision['default'] else ''}'>"
+                f"<td>{e(endpoint)}</td><td>{e(name)}</td><td>{s['inputs']}</td><td>{s['skipped']}</td>"
+                f"<td>{s['coverage']:.0%}</td><td>{_pct(s['validity'])}</td><td>{_pct(s['quality'])}</td>"
+                f"<td>{s['mean_ms']:.3f}</td><td>{s['p50_ms']:.3f}</td><td>{s['p95_ms']:.3f}</td>"
+                f"<td>{s['p99_ms']:.3f}</td><td>{s['served_by_fallback']}</td><td>{s['errors']}</td>"
+                f"<td>{e(missed)}</td><td>{e(verdict)}</td></tr>"
+            )
+    config = e(json.dumps(report["config"], ensure_ascii=False))
+    return f"""<!doctype html>
+<html lang="ru"><head><meta charset="utf-8"><title>LLM и локальные движки</title>
+<style>
+body {{ font-family: system-ui, sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; }}
+th, td {{ border: 1px solid #ccc; padding: 4px 8px; text-align: right; }}
+td:nth-child(-n+2), td:nth-last-child(-n+2) {{ text-align: left; }}
+tr.default {{ background: #e8f5e9; }}
+</style></head><body>
+<h1>LLM и локальные движки</h1>
+<p>Коммит {e(str(report.get('commit')))}, {e(report['generated_at'])}. Параметры: <code>{config}</code></p>
+<table>
+<tr><th>эндпоинт</th><th>путь</th><th>входов</th><th>пропущено</th><th>покрытие</th><th>схема</th><th>качество</th>
+<th>mean, мс</th><th>p50, мс</th><th>p95, мс</th><th>p99, мс</th><th>fallback</th><th>ошибки</th>
+<th>несовпадения меток</th><th>вердикт</th></tr>
+{''.join(rows)}
+</table></body></html>
+"""
+
+
+def install_stub(latency_ms: float, responses: Optional[str], seed: int) -> None:
+    """Запросы к LLM — в заглушку внутри процесса, без сети"""
+    import httpx
+
+    from backend.core.config import settings
+    from backend.utils import llm_gateway
+    from benchmarks.llm_stub import StubConfig, create_stub_app, load_responses
+
+    config = StubConfig(latency_ms=latency_ms, seed=seed,
+                        responses=load_responses(responses) if responses else ())
+    llm_gateway._client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=create_stub_app(config)),
+        base_url="http://llm-stub/api/v1", timeout=settings.llm_timeout_sec,
+    )
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Сравнение LLM и локальных путей по задержке и качеству")
+    parser.add_argument("--corpus", help="JSONL корпус; по умолчанию встроенный")
+    parser.add_argument("-k", dest="endpoints", action="append", default=[], help="только эти эндпоинты")
+    parser.add_argument("--responses", help="записанные ответы модели для заглушки (см. llm_stub)")
+    parser.add_argument("--stub-latency-ms", type=float, default=800.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--min-validity", type=float, default=0.99)
+    parser.add_argument("--min-coverage", type=float, default=0.9)
+    parser.add_argument("--quality-margin", type=float, default=0.05, help="насколько локальный путь может уступать LLM")
+    parser.add_argument("--json", dest="json_out", help="куда сохранить отчёт JSON")
+    parser.add_argument("--html", dest="html_out", help="куда сохранить отчёт HTML")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    # Ключ нужен, чтобы эндпоинты пошли в LLM, а не сразу в fallback; квоты и лимиты — не про офлайн
+    os.environ.setdefault("OPENROUTER_API_KEY", "eval-stub")
+    os.environ.setdefault("LLM_DAILY_TOKEN_QUOTA", "0")
+    install_stub(args.stub_latency_ms, args.responses, args.seed)
+
+    corpus = load_corpus(args.corpus) if args.corpus else default_corpus()
+    if args.endpoints:
+        corpus = [item for item in corpus if item["endpoint"] in args.endpoints]
+
+    results = asyncio.run(evaluate(corpus))
+    decisions = verdicts(results, args.min_validity, args.min_coverage, args.quality_margin)
+    print(format_table(results, decisions))
+    if not args.responses:
+        print("\nБез --responses LLM отвечает заготовками заглушки: его качество — не оценка модели")
+
+    from benchmarks.report import _git_commit
+
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": _git_commit(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("json_out", "html_out")},
+        "results": results,
+        "decisions": decisions,
+    }
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.html_out:
+        with open(args.html_out, "w", encoding="utf-8") as f:
+            f.write(render_html(report))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
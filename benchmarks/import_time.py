@@ -0,0 +1,87 @@
+"""
+Бюджет холодного импорта приложения.
+
+Запускает `python -X importtime -c "import backend.main"` в чистом процессе
+несколько раз, берёт лучший результат и падает (код 1), если он превышает
+бюджет или если при импорте подгрузились модули, которые должны грузиться лениво.
+
+    python -m benchmarks.import_time --budget-ms 1200 --top 15
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+TARGET = "backend.main"
+
+# Тяжёлые зависимости, которые нужны только отдельным функциям
+LAZY_MODULES = ("numpy", "openai", "backend.services.vibeClassifier")
+
+DEFAULT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1200"))
+
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def measure(target: str = TARGET) -> Tuple[float, Dict[str, Tuple[int, int]]]:
+    """Один замер: (полное время импорта target в мс, {модуль: (self_us, cumulative_us)})"""
+    env = dict(os.environ)
+    # Импорт не читает настройки: без обязательного ключа он тоже должен пройти
+    env.pop("OPENROUTER_API_KEY", None)
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True, text=True, env=env,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {target} упал:\n{proc.stderr[-2000:]}")
+
+    modules: Dict[str, Tuple[int, int]] = {}
+    for line in proc.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            modules[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    if target not in modules:
+        raise RuntimeError(f"{target} не найден в выводе -X importtime")
+    return modules[target][1] / 1000, modules
+
+
+def heaviest(modules: Dict[str, Tuple[int, int]], top: int) -> List[Tuple[str, int]]:
+    """Самые дорогие модули по собственному времени импорта"""
+    return sorted(((name, own) for name, (own, _) in modules.items()), key=lambda x: -x[1])[:top]
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=3, help="замеров; берётся лучший")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--target", default=TARGET)
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    results = [measure(args.target) for _ in range(max(args.runs, 1))]
+    best_ms, modules = min(results, key=lambda r: r[0])
+
+    print(f"import {args.target}: {best_ms:.0f} мс (лучший из {len(results)}), бюджет {args.budget_ms:.0f} мс")
+    print("Самые дорогие модули (собственное время):")
+    for name, own_us in heaviest(modules, args.top):
+        print(f"  {own_us / 1000:8.1f} мс  {name}")
+
+    failed = False
+    eager = [name for name in LAZY_MODULES if name in modules]
+    if eager:
+        print(f"FAIL: при импорте загружены ленивые модули: {', '.join(eager)}")
+        failed = True
+    if best_ms > args.budget_ms:
+        print(f"FAIL: холодный импорт {best_ms:.0f} мс > {args.budget_ms:.0f} мс")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+Локальная замена OpenRouter для нагрузочных тестов.
+
+Совместимый с OpenAI эндпоинт POST /api/v1/chat/completions: отвечает заранее
+заготовленным JSON под каждый шаблон из utils/prompts.py с настраиваемой
+задержкой (логнормальное распределение), долей ошибок и потоковым режимом (SSE).
+Записанные ответы настоящей модели (--responses, JSONL {"match": "<подстрока
+промпта>", "response": ...}) проверяются раньше заготовок.
+
+    python -m benchmarks.llm_stub --port 9100 --latency-ms 800 --latency-sigma 0.5 --error-rate 0.02
+    OPENROUTER_BASE_URL=http://127.0.0.1:9100/api/v1 OPENROUTER_API_KEY=stub python run.py --prod
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from backend.utils.prompts import estimate_tokens
+
+# Ответы по ключевой фразе статического префикса шаблона
+CANNED_RESPONSES = [
+    ("определи режим тренировки", {
+        "mode": "neutral",
+        "confidence": 0.82,
+        "description": "Обычное рабочее состояние",
+        "recommended_intensity": 0.6,
+        "coach_style": "balanced",
+        "workout_duration": 30,
+    }),
+    ("структуру тренировки", {
+        "intensity": 0.65,
+        "estimated_calories": 240,
+        "warm_up": [
+            {"slug": None, "name": "Суставная разминка", "duration_sec": 180,
+             "instructions": "Вращения в суставах", "difficulty": "easy"},
+        ],
+        "main_block": [
+            {"slug": "squat", "name": "Приседания", "duration_sec": 300,
+             "instructions": "3 подхода по 15", "difficulty": "medium"},
+            {"slug": "pushup_standard", "name": "Отжимания обычные", "duration_sec": 300,
+             "instructions": "3 подхода по 10", "difficulty": "medium"},
+            {"slug": "plank", "name": "Планка (обычная)", "duration_sec": 180,
+             "instructions": "3 подхода по 40 секунд", "difficulty": "medium"},
+        ],
+        "cool_down": [
+            {"slug": "stretching", "name": "Растяжка (ноги/спина/руки)", "duration_sec": 180,
+             "instructions": "Плавно, без рывков", "difficulty": "easy"},
+        ],
+    }),
+    ("реплики тренера", {"phrases": [f"Отличный темп, держим {i}!" for i in range(20)]}),
+    ("реплику тренера", "Так держать, ещё немного!"),
+    ("спортивный профиль", {
+        "user_type": "энтузиаст",
+        "analysis": "Регулярные тренировки средней интенсивности.",
+        "strengths": ["регулярность"],
+        "weaknesses": ["мало растяжки"],
+        "recommendations": ["добавить растяжку", "одна силовая в неделю", "следить за сном"],
+        "optimal_training_schedule": {
+            "frequency": "3 раза в неделю", "duration": "40 минут",
+            "intensity": "средняя", "coach_style": "balanced",
+        },
+    }),
+    ("прогноз спортивной формы", {
+        "optimistic_scenario": {"description": "по плану", "improvements": {"endurance": "+15%"}, "key_achievements": []},
+        "pessimistic_scenario": {"description": "с пропусками", "changes": {"endurance": "-5%"}, "risks": []},
+        "comparison": {"difference_description": "20%", "motivational_message": "Вперёд!"},
+        "key_milestones": [{"day": 7, "title": "первая неделя", "description": "привычка"}],
+        "recommendations": ["не пропускать"],
+    }),
+]
+
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 800.0      # медиана задержки
+    latency_sigma: float = 0.5     # разброс логнормального распределения
+    error_rate: float = 0.0        # доля ответов 500/429
+    tokens_per_sec: float = 80.0   # скорость выдачи в потоковом режиме
+    seed: Optional[int] = None
+    responses: Sequence[Tuple[str, Any]] = ()  # записанные ответы, раньше заготовок
+
+
+def _flatten(messages: List[dict]) -> str:
+    parts = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list):
+            parts.extend(block.get("text", "") for block in content)
+        else:
+            parts.append(str(content or ""))
+    return "\n".join(parts)
+
+
+def load_responses(path: str) -> List[Tuple[str, Any]]:
+    """JSONL {"match": "...", "response": {...} | "..."}; длинные совпадения — первыми"""
+    responses = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                responses.append((record["match"], record["response"]))
+    return sorted(responses, key=lambda item: len(item[0]), reverse=True)
+
+
+def canned_content(prompt: str, recorded: Sequence[Tuple[str, Any]] = ()) -> str:
+    for marker, response in (*recorded, *CANNED_RESPONSES):
+        if marker in prompt:
+            return response if isinstance(response, str) else json.dumps(response, ensure_ascii=False)
+    return "{}"
+
+
+def _chunks(text: str, size: int = 12) -> Iterable[str]:
+    for i in range(0, len(text), size):
+        yield text[i:i + size]
+
+
+def create_stub_app(config: StubConfig) -> FastAPI:
+    app = FastAPI(title="OpenRouter stub")
+    rng = random.Random(config.seed)
+    app.state.requests = 0
+
+    def sample_latency() -> float:
+        if config.latency_ms <= 0:
+            return 0.0
+        return config.latency_ms / 1000 * math.exp(rng.gauss(0.0, config.latency_sigma))
+
+    @app.post("/api/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        app.state.requests += 1
+        prompt = _flatten(payload.get("messages", []))
+        model = payload.get("model", "stub")
+
+        await asyncio.sleep(sample_latency())
+        if config.error_rate and rng.random() < config.error_rate:
+            status = rng.choice((429, 500, 502))
+            return JSONResponse({"error": {"code": status, "message": "stub error"}}, status_code=status)
+
+        content = canned_content(prompt, config.responses)
+        prompt_tokens = estimate_tokens(prompt)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": estimate_tokens(content),
+            "total_tokens": prompt_tokens + estimate_tokens(content),
+            "prompt_tokens_details": {"cached_tokens": prompt_tokens // 2},
+        }
+        completion_id = f"gen-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        if not payload.get("stream"):
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+
+        async def stream():
+            delay = 1.0 / config.tokens_per_sec if config.tokens_per_sec else 0.0
+            for piece in _chunks(content):
+                chunk = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                await asyncio.sleep(delay * estimate_tokens(piece))
+            final = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage,
+            }
+            yield f"data: {json.dumps(final, ensure_ascii=False)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": app.state.requests}
+
+    return app
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="OpenRouter-совместимая заглушка для нагрузочных тестов")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--tokens-per-sec", type=float, default=80.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--responses", help="JSONL с записанными ответами модели")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    import uvicorn
+
+    config = StubConfig(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        tokens_per_sec=args.tokens_per_sec,
+        seed=args.seed,
+        responses=load_responses(args.responses) if args.responses else (),
+    )
+    uvicorn.run(create_stub_app(config), host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,236 @@
+"""
+Асинхронный генератор нагрузки по пользовательским сценариям.
+
+Виртуальные пользователи в замкнутом цикле выбирают сценарий по весам:
+- session: vibe/assess → workout/generate → (complete_exercise → coach/coach/comment) × N
+- vibe_only: быстрая оценка только по слайдерам
+- coach_burst: серия реплик тренера подряд
+
+Для complete_exercise нужны пользователи в БД и JWT: генератор создаёт их сам,
+поэтому запускать его надо с теми же DATABASE_URL и ключом подписи, что и сервер.
+
+Ограничение частоты (core/ratelimit.py) на сервере нужно выключить: без пауз
+между запросами лимиты AI-маршрутов исчерпываются за секунды, и прогон меряет
+ответы 429. Если их больше --max-429, генератор завершается с кодом 2.
+
+    python -m benchmarks.llm_stub --port 9100 &
+    RATELIMIT_ENABLED=false OPENROUTER_BASE_URL=http://127.0.0.1:9100/api/v1 OPENROUTER_API_KEY=stub \
+        python run.py --prod &
+    python -m benchmarks.loadgen --users 50 --duration 60 \\
+        --out benchmarks/results/$(git rev-parse --short HEAD).json --baseline benchmarks/results/baseline.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.report import (
+    Sample, build_report, check_rate_limited, check_regressions, format_table, save_report,
+)
+
+VIBE_TEXTS = [
+    "Устал после работы, но хочу потрениться",
+    "Злюсь на всё, хочу выпустить пар",
+    "Отличное настроение, полон сил",
+    "Обычный день, ничего особенного",
+    "Не выспался, голова тяжёлая",
+]
+SESSION_EXERCISES = [
+    ("squat", {"reps": 20}),
+    ("pushup_standard", {"reps": 12}),
+    ("plank", {"seconds": 45}),
+    ("jumping_jacks", {"seconds": 60}),
+    ("crunch", {"reps": 25}),
+]
+COACH_STYLES = ["strict", "soft", "comedy", "anime", "balanced"]
+
+DEFAULT_MIX = "session=6,vibe_only=3,coach_burst=1"
+
+# Серии /metrics сервера, которые сохраняются в отчёт после прогона
+SERVER_METRICS = (
+    "db_pool_connections", "db_pool_utilization", "db_pool_timeouts_total",
+    "db_pool_checkout_wait_seconds_count", "db_pool_checkout_wait_seconds_sum",
+    "db_query_duration_seconds_count",
+)
+
+
+def seed_users(count: int) -> List[str]:
+    """Создаёт пользователей нагрузочного теста и возвращает JWT для каждого"""
+    from backend.core.auth import create_access_token, get_password_hash
+    from backend.core.database import SessionLocal, create_tables
+    from backend.models.user import User
+
+    create_tables()
+    db = SessionLocal()
+    try:
+        password_hash = get_password_hash("loadgen")
+        tokens = []
+        for i in range(count):
+            email = f"loadgen-{i}@example.com"
+            if db.query(User).filter(User.email == email).first() is None:
+                db.add(User(email=email, username=f"loadgen-{i}", hashed_password=password_hash))
+            tokens.append(create_access_token({"sub": email}, expires_delta=timedelta(hours=12)))
+        db.commit()
+        return tokens
+    finally:
+        db.close()
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, token: Optional[str], samples: List[Sample],
+                 think_time: float, rng: random.Random) -> None:
+        self.client = client
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.samples = samples
+        self.think_time = think_time
+        self.rng = rng
+
+    async def request(self, route: str, path: str, payload: dict) -> Optional[dict]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.post(path, json=payload, headers=self.headers)
+        except httpx.HTTPError as e:
+            self.samples.append(Sample(route, 0, time.perf_counter() - started, type(e).__name__))
+            return None
+        self.samples.append(Sample(route, response.status_code, time.perf_counter() - started))
+        if self.think_time:
+            await asyncio.sleep(self.rng.uniform(0, 2 * self.think_time))
+        return response.json() if response.status_code == 200 else None
+
+    def vibe_payload(self, with_text: bool) -> dict:
+        return {
+            "user_input": self.rng.choice(VIBE_TEXTS) if with_text else "",
+            "fatigue_level": self.rng.randint(1, 5),
+            "stress_level": self.rng.randint(1, 5),
+            "motivation_level": self.rng.randint(1, 5),
+        }
+
+    def coach_payload(self, exercise: str, progress: float) -> dict:
+        return {
+            "style": self.rng.choice(COACH_STYLES),
+            "exercise": exercise,
+            "success": self.rng.random() < 0.8,
+            "user_progress": progress,
+        }
+
+    async def session(self) -> None:
+        vibe = await self.request("POST /api/vibe/assess", "/api/vibe/assess", self.vibe_payload(with_text=True))
+        vibe_mode = (vibe or {}).get("vibe_mode", "neutral")
+        duration = (vibe or {}).get("workout_duration_suggestion", 30)
+        await self.request("POST /api/workout/generate", "/api/workout/generate",
+                           {"vibe_mode": vibe_mode, "duration_min": max(10, min(duration, 90)),
+                            "prefetch_token": (vibe or {}).get("workout_prefetch_token")})
+
+        exercises = self.rng.sample(SESSION_EXERCISES, k=3)
+        for i, (slug, amount) in enumerate(exercises):
+            if self.headers:
+                await self.request("POST /api/workout/complete_exercise", "/api/workout/complete_exercise",
+                                   {"exercise_slug": slug, **amount})
+            await self.request("POST /api/coach/coach/comment", "/api/coach/coach/comment",
+                               self.coach_payload(slug, (i + 1) / len(exercises)))
+
+    async def vibe_only(self) -> None:
+        await self.request("POST /api/vibe/assess", "/api/vibe/assess", self.vibe_payload(with_text=False))
+
+    async def coach_burst(self) -> None:
+        for i in range(5):
+            await self.request("POST /api/coach/coach/comment", "/api/coach/coach/comment",
+                               self.coach_payload(self.rng.choice(SESSION_EXERCISES)[0], i / 5))
+
+
+def parse_mix(value: str) -> List[Tuple[str, float]]:
+    mix = []
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if not hasattr(VirtualUser, name.strip()):
+            raise argparse.ArgumentTypeError(f"Неизвестный сценарий: {name}")
+        mix.append((name.strip(), float(weight or 1)))
+    return mix
+
+
+async def run_load(base_url: str, users: int, duration: float, mix: List[Tuple[str, float]],
+                   tokens: List[Optional[str]], think_time: float, seed: Optional[int]) -> List[Sample]:
+    samples: List[Sample] = []
+    deadline = time.monotonic() + duration
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0, limits=limits) as client:
+        async def worker(index: int) -> None:
+            rng = random.Random(None if seed is None else seed + index)
+            user = VirtualUser(client, tokens[index % len(tokens)], samples, think_time, rng)
+            scenarios: Dict[str, Callable] = {name: getattr(user, name) for name in names}
+            while time.monotonic() < deadline:
+                await scenarios[rng.choices(names, weights)[0]]()
+
+        await asyncio.gather(*(worker(i) for i in range(users)))
+    return samples
+
+
+def scrape_server_metrics(base_url: str, names: Iterable[str] = SERVER_METRICS) -> Dict[str, float]:
+    """Снимок выбранных серий /metrics (у каждого воркера свои — это метрики одного из них)"""
+    try:
+        text = httpx.get(f"{base_url}/metrics", timeout=5.0).text
+    except httpx.HTTPError:
+        return {}
+    result: Dict[str, float] = {}
+    for line in text.splitlines():
+        if line.startswith("#") or not line.startswith(tuple(names)):
+            continue
+        series, _, value = line.rpartition(" ")
+        if series.split("{", 1)[0] in names:
+            result[series] = result.get(series, 0.0) + float(value)
+    return result
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон по сценариям NeuroCoach")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=20, help="одновременных виртуальных пользователей")
+    parser.add_argument("--duration", type=float, default=30.0, help="секунд")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument("--think-ms", type=float, default=0.0, help="средняя пауза между запросами")
+    parser.add_argument("--no-auth", action="store_true", help="не создавать пользователей, без complete_exercise")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", help="куда сохранить JSON-отчёт")
+    parser.add_argument("--baseline", help="JSON-отчёт для сравнения; регрессия — код 1")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--max-429", type=float, default=0.05, help="допустимая доля ответов 429")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    tokens: List[Optional[str]] = [None] if args.no_auth else seed_users(args.users)
+    started = time.monotonic()
+    samples = asyncio.run(run_load(
+        args.base_url, args.users, args.duration, args.mix, tokens, args.think_ms / 1000, args.seed,
+    ))
+    elapsed = time.monotonic() - started
+
+    report = build_report(samples, elapsed, config={
+        "base_url": args.base_url,
+        "users": args.users,
+        "duration": args.duration,
+        "mix": dict(args.mix),
+        "think_ms": args.think_ms,
+        "auth": not args.no_auth,
+    })
+    report["server_metrics"] = scrape_server_metrics(args.base_url)
+    print(format_table(report))
+    for series, value in report["server_metrics"].items():
+        print(f"  {series} = {value:g}")
+    if args.out:
+        save_report(report, args.out)
+        print(f"Отчёт: {args.out}")
+    return check_rate_limited(samples, args.max_429) or check_regressions(report, args.baseline, args.tolerance)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
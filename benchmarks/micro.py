@@ -0,0 +1,202 @@
+"""
+Микробенчмарки горячих функций на фиксированных входных данных.
+
+Каждый случай замеряется через timeit (автоподбор числа повторов, лучший из
+--repeat прогонов) и сравнивается с базовым JSON. Замедление больше --threshold
+даёт код 1, чтобы изменение производительности было видно на ревью.
+
+    python -m benchmarks.micro                      # сравнить с benchmarks/baselines/micro.json
+    python -m benchmarks.micro --save-baseline      # перезаписать базу (на той же машине!)
+    python -m benchmarks.micro -k jwt -k workout    # только случаи с подстрокой в имени
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "micro.json")
+
+Case = Tuple[str, Callable[[], Callable[[], object]]]
+
+VIBE_TEXT = "Сегодня устал после работы, немного стресс, но хочу размяться минут на двадцать"
+
+WORKOUT_HISTORY = [
+    {"date": f"2024-05-{day:02d}", "type": mode, "duration_min": 20 + day % 4 * 10, "completed": day % 5 != 0}
+    for day, mode in zip(range(1, 29), ["neutral", "boost", "anti_stress", "rage"] * 7)
+]
+
+LLM_CONTENT = (
+    "Конечно! Вот ваш план:\n```json\n"
+    + json.dumps({
+        "mode": "anti_stress", "confidence": 0.87, "description": "Усталость после работы",
+        "recommended_intensity": 0.3, "coach_style": "soft", "workout_duration": 20,
+    }, ensure_ascii=False)
+    + "\n```\nУдачной тренировки!"
+)
+
+
+def _points():
+    from backend.utils.constants import calculate_exercise_points
+    return lambda: (
+        calculate_exercise_points("squat", reps=25),
+        calculate_exercise_points("plank", seconds=95),
+    )
+
+
+def _fallback_analysis():
+    from backend.api.endpoints.vibe import fallback_analysis
+    return lambda: fallback_analysis(VIBE_TEXT)
+
+
+def _fallback_workout():
+    from backend.api.endpoints.workout import generate_fallback_workout
+    return lambda: generate_fallback_workout("rage", 45)
+
+
+def _summarize_history():
+    from backend.api.endpoints.profile import summarize_history
+    return lambda: summarize_history(WORKOUT_HISTORY)
+
+
+def _extract_json():
+    from backend.utils.llm_gateway import extract_json
+    return lambda: extract_json(LLM_CONTENT)
+
+
+def _jwt_encode():
+    from backend.core.auth import create_access_token
+    return lambda: create_access_token({"sub": "bench@example.com"})
+
+
+def _jwt_decode():
+    from jose import jwt
+    from backend.core.auth import ALGORITHM, SECRET_KEY, create_access_token
+
+    token = create_access_token({"sub": "bench@example.com"}, expires_delta=timedelta(days=365))
+    return lambda: jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+
+def _workout_fixture() -> dict:
+    from backend.api.endpoints.workout import generate_fallback_workout
+    return generate_fallback_workout("boost", 45)
+
+
+def _workout_response_json():
+    from backend.api.endpoints.workout import Exercise, WorkoutResponse
+
+    data = _workout_fixture()
+    response = WorkoutResponse(
+        workout_id="workout_bench",
+        vibe_mode="boost",
+        intensity=data["intensity"],
+        total_duration_min=45,
+        estimated_calories=data["estimated_calories"],
+        warm_up=[Exercise(**ex) for ex in data["warm_up"]],
+        main_block=[Exercise(**ex) for ex in data["main_block"]],
+        cool_down=[Exercise(**ex) for ex in data["cool_down"]],
+        generated_at=datetime(2024, 5, 1, 12, 0),
+    )
+    return response.model_dump_json
+
+
+def _workout_plan_roundtrip():
+    from backend.schemas.workout import WorkoutPlan
+
+    data = _workout_fixture()
+    payload = {
+        "user_id": 1, "vibe_mode": "boost", "intensity": data["intensity"],
+        "warm_up": data["warm_up"], "main_block": data["main_block"], "cool_down": data["cool_down"],
+        "estimated_calories": data["estimated_calories"], "total_duration_min": 45,
+        "generated_at": "2024-05-01T12:00:00",
+    }
+    return lambda: WorkoutPlan.model_validate(payload).model_dump_json()
+
+
+CASES: List[Case] = [
+    ("calculate_exercise_points", _points),
+    ("vibe.fallback_analysis", _fallback_analysis),
+    ("workout.generate_fallback_workout", _fallback_workout),
+    ("profile.summarize_history", _summarize_history),
+    ("llm_gateway.extract_json", _extract_json),
+    ("auth.jwt_encode", _jwt_encode),
+    ("auth.jwt_decode", _jwt_decode),
+    ("WorkoutResponse.model_dump_json", _workout_response_json),
+    ("WorkoutPlan.validate+dump_json", _workout_plan_roundtrip),
+]
+
+
+def measure(fn: Callable[[], object], repeat: int, min_time: float) -> float:
+    """Лучшее время одного вызова в наносекундах"""
+    timer = timeit.Timer(fn)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+
+def run(cases: List[Case], repeat: int, min_time: float) -> Dict[str, float]:
+    results = {}
+    for name, setup in cases:
+        results[name] = measure(setup(), repeat, min_time)
+    return results
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Микробенчмарки горячих функций")
+    parser.add_argument("-k", dest="filters", action="append", default=[], help="подстрока имени случая")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.25, help="допустимое замедление (доля)")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.1, help="секунд на один прогон")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    os.environ.setdefault("OPENROUTER_API_KEY", "micro-benchmark")
+    cases = [case for case in CASES if not args.filters or any(f in case[0] for f in args.filters)]
+    results = run(cases, args.repeat, args.min_time)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+
+    failed = []
+    print(f"{'case':<40} {'ns/call':>12} {'baseline':>12} {'delta':>8}")
+    for name, ns in results.items():
+        base = baseline.get(name)
+        delta = (ns / base - 1) if base else None
+        mark = ""
+        if delta is not None and delta > args.threshold:
+            failed.append(name)
+            mark = "  REGRESSION"
+        delta_text = f"{delta:+.0%}" if delta is not None else "—"
+        base_text = f"{base:.0f}" if base else "—"
+        print(f"{name:<40} {ns:>12.0f} {base_text:>12} {delta_text:>8}{mark}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        merged = {**baseline, **results}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "machine": {"python": platform.python_version(), "platform": platform.platform()},
+                "results": {name: round(ns, 1) for name, ns in sorted(merged.items())},
+            }, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"База сохранена: {args.baseline}")
+        return 0
+
+    if failed:
+        print(f"Замедление больше {args.threshold:.0%}: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Размер ответа тренировки на проводе: полный и компактный формат × identity/gzip/br.
+
+Планы — те, что реально отдаёт сервер: резервный план (без LLM), ответ
+benchmarks.llm_stub в формате workout_generate и, с --plans, записанные ответы
+/workout/generate или сырые ответы LLM (JSON-массив или JSONL). Для каждого
+источника печатается доля упражнений каталога: только они сжимаются до slug.
+
+Для каждого варианта — байты, CPU сервера на сжатие, CPU клиента на распаковку
+и оценка времени передачи на мобильных профилях сети (только пропускная
+способность, без RTT — он одинаков для всех вариантов).
+
+    python -m benchmarks.payload_size
+    python -m benchmarks.payload_size --plans recorded_workouts.jsonl --json payload.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import zlib
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from benchmarks.micro import measure
+
+# Скорость загрузки, кбит/с
+NETWORK_PROFILES: Dict[str, int] = {
+    "3g": 750,
+    "lte": 12000,
+    "wifi": 30000,
+}
+
+BLOCKS = ("warm_up", "main_block", "cool_down")
+
+Codec = Tuple[str, Optional[Callable[[bytes], bytes]], Optional[Callable[[bytes], bytes]]]
+
+
+def as_response(plan: dict) -> dict:
+    """План LLM или записанный ответ → тело /workout/generate (format=full)"""
+    from backend.api.endpoints.workout import WorkoutResponse
+
+    if "workout_id" in plan:
+        return WorkoutResponse.model_validate(plan).model_dump(mode="json")
+    return WorkoutResponse.model_validate({
+        "workout_id": "01HZX3Q8M6J7K2P9R4T5V6W7X8", "vibe_mode": "neutral",
+        "intensity": plan.get("intensity", 0.6), "total_duration_min": 30,
+        "estimated_calories": plan.get("estimated_calories", 200),
+        **{block: plan.get(block, []) for block in BLOCKS},
+        "generated_at": datetime(2024, 5, 1, 12, 0),
+    }).model_dump(mode="json")
+
+
+def load_plans(path: str) -> List[dict]:
+    with open(path, encoding="utf-8") as f:
+        text = f.read().strip()
+    if text.startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def plan_sources(path: Optional[str]) -> Dict[str, List[dict]]:
+    from backend.api.endpoints.workout import generate_fallback_workout
+    from benchmarks.llm_stub import CANNED_RESPONSES
+
+    stub_plan = dict(CANNED_RESPONSES)["структуру тренировки"]
+    sources = {
+        "fallback": [generate_fallback_workout("neutral", 30)],
+        "llm_stub": [stub_plan],
+    }
+    if path:
+        sources["recorded"] = load_plans(path)
+    return {name: [as_response(plan) for plan in plans] for name, plans in sources.items()}
+
+
+def catalog_share(plans: List[dict]) -> float:
+    from backend.api.endpoints.workout import compact_exercise
+
+    exercises = [ex for plan in plans for block in BLOCKS for ex in plan[block]]
+    slugged = sum(1 for ex in exercises if "slug" in compact_exercise(ex))
+    return slugged / len(exercises) if exercises else 0.0
+
+
+def codecs(gzip_level: int, brotli_quality: int) -> List[Codec]:
+    from backend.core.compression import brotli
+
+    result: List[Codec] = [
+        ("identity", None, None),
+        ("gzip", lambda b: _gzip(b, gzip_level), lambda b: zlib.decompress(b, 31)),
+    ]
+    if brotli is not None:
+        result.append(("br", lambda b: brotli.compress(b, quality=brotli_quality), brotli.decompress))
+    return result
+
+
+def _gzip(body: bytes, level: int) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Размер и время передачи ответа тренировки")
+    parser.add_argument("--plans", help="записанные планы: JSON-массив или JSONL")
+    parser.add_argument("--gzip-level", type=int, default=6)
+    parser.add_argument("--brotli-quality", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05, help="секунд на один прогон")
+    parser.add_argument("--json", dest="json_out", help="куда сохранить результаты")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    os.environ.setdefault("OPENROUTER_API_KEY", "payload-benchmark")
+    from backend.api.endpoints.workout import compact_workout
+    from backend.core.responses import dumps
+
+    results: Dict[str, dict] = {}
+    profiles = "".join(f" {name + ' ms':>9}" for name in NETWORK_PROFILES)
+    for source, plans in plan_sources(args.plans).items():
+        share = catalog_share(plans)
+        print(f"\n{source}: планов {len(plans)}, упражнений каталога {share:.0%}")
+        print(f"{'format':<8} {'encoding':<9} {'bytes':>7} {'vs full':>8} {'comp µs':>8} {'decomp µs':>9}{profiles}")
+        # Средний план источника: суммы по всем планам, делённые на их число
+        bodies = {
+            "full": [dumps(plan) for plan in plans],
+            "compact": [dumps(compact_workout(plan)) for plan in plans],
+        }
+        baseline = sum(len(body) for body in bodies["full"]) / len(plans)
+        results[source] = {"plans": len(plans), "catalog_share": round(share, 3)}
+        for fmt, encoded in bodies.items():
+            results[source][fmt] = {}
+            for encoding, compress, decompress in codecs(args.gzip_level, args.brotli_quality):
+                wires = [compress(body) if compress else body for body in encoded]
+                size = sum(len(wire) for wire in wires) / len(wires)
+                body, wire = encoded[0], wires[0]
+                comp_us = measure(lambda: compress(body), args.repeat, args.min_time) / 1000 if compress else 0.0
+                decomp_us = measure(lambda: decompress(wire), args.repeat, args.min_time) / 1000 if decompress else 0.0
+                transfer_ms = {name: size * 8 / kbps for name, kbps in NETWORK_PROFILES.items()}
+                results[source][fmt][encoding] = {
+                    "bytes": round(size), "compress_us": round(comp_us, 1), "decompress_us": round(decomp_us, 1),
+                    "transfer_ms": {name: round(ms, 2) for name, ms in transfer_ms.items()},
+                }
+                times = "".join(f" {ms:>9.2f}" for ms in transfer_ms.values())
+                print(f"{fmt:<8} {encoding:<9} {size:>7.0f} {size / baseline:>7.0%} "
+                      f"{comp_us:>8.1f} {decomp_us:>9.1f}{times}")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
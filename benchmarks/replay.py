@@ -0,0 +1,174 @@
+"""
+Воспроизведение записанного трафика (core/capture.py) против локального инстанса.
+
+Режимы:
+- --speed 1: в исходном темпе (разрыв между запросами как в записи);
+- --speed N: в N раз быстрее, та же форма нагрузки;
+- --speed 0: максимальная пропускная способность, --concurrency запросов в полёте.
+
+Псевдонимы пользователей из записи отображаются на созданных генератором
+нагрузки тестовых пользователей, поэтому авторизованные маршруты тоже работают.
+Сервер запускайте с RATELIMIT_ENABLED=false: при --speed больше 1 лимиты
+исчерпываются, и отчёт меряет 429 (больше --max-429 — код 2).
+
+    python -m benchmarks.replay captures/capture-*.jsonl --speed 4 --out benchmarks/results/replay.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import glob
+import json
+import sys
+import time
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+
+from benchmarks.report import (
+    Sample, build_report, check_rate_limited, check_regressions, format_table, save_report,
+)
+
+
+def load_records(patterns: Iterable[str], routes: Optional[List[str]] = None) -> List[dict]:
+    records = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    record = json.loads(line)
+                    body = record.get("body")
+                    if isinstance(body, dict) and ("_truncated" in body or "_non_json" in body):
+                        continue  # тело не сохранено — воспроизвести нельзя
+                    if routes and record["route"] not in routes:
+                        continue
+                    records.append(record)
+    records.sort(key=lambda r: r["ts"])
+    return records
+
+
+def map_principals(records: List[dict], no_auth: bool) -> Dict[str, str]:
+    """Псевдоним из записи → JWT тестового пользователя"""
+    principals = sorted({r["principal"] for r in records if r.get("principal")})
+    if no_auth or not principals:
+        return {}
+    from benchmarks.loadgen import seed_users
+
+    return dict(zip(principals, seed_users(len(principals))))
+
+
+class Replayer:
+    def __init__(self, client: httpx.AsyncClient, tokens: Dict[str, str]) -> None:
+        self.client = client
+        self.tokens = tokens
+        self.samples: List[Sample] = []
+        self.max_lag = 0.0
+
+    async def send(self, record: dict) -> None:
+        route = f"{record['method']} {record['route']}"
+        url = record["path"] + (f"?{record['query']}" if record.get("query") else "")
+        headers = {}
+        token = self.tokens.get(record.get("principal") or "")
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(
+                record["method"], url, json=record.get("body"), headers=headers,
+            )
+        except httpx.HTTPError as e:
+            self.samples.append(Sample(route, 0, time.perf_counter() - started, type(e).__name__))
+            return
+        self.samples.append(Sample(route, response.status_code, time.perf_counter() - started))
+
+    async def timed(self, records: List[dict], speed: float) -> None:
+        """Открытый цикл: запрос уходит в своё время, даже если предыдущие ещё не ответили"""
+        loop = asyncio.get_running_loop()
+        origin = records[0]["ts"]
+        start = loop.time()
+        tasks = []
+        for record in records:
+            due = start + (record["ts"] - origin) / speed
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                self.max_lag = max(self.max_lag, -delay)
+            tasks.append(asyncio.create_task(self.send(record)))
+        await asyncio.gather(*tasks)
+
+    async def flat_out(self, records: List[dict], concurrency: int) -> None:
+        queue: asyncio.Queue = asyncio.Queue()
+        for record in records:
+            queue.put_nowait(record)
+
+        async def worker() -> None:
+            while not queue.empty():
+                await self.send(queue.get_nowait())
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def replay(base_url: str, records: List[dict], tokens: Dict[str, str],
+                 speed: float, concurrency: int) -> Replayer:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0, limits=limits) as client:
+        replayer = Replayer(client, tokens)
+        if speed > 0:
+            await replayer.timed(records, speed)
+        else:
+            await replayer.flat_out(records, concurrency)
+    return replayer
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Воспроизведение записанного трафика")
+    parser.add_argument("captures", nargs="+", help="файлы или glob-шаблоны capture-*.jsonl")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--speed", type=float, default=1.0, help="множитель темпа; 0 — без пауз")
+    parser.add_argument("--concurrency", type=int, default=50, help="запросов в полёте (и пул соединений)")
+    parser.add_argument("--route", action="append", help="только эти шаблоны маршрутов")
+    parser.add_argument("--limit", type=int, default=None, help="первые N записей")
+    parser.add_argument("--no-auth", action="store_true", help="не создавать тестовых пользователей")
+    parser.add_argument("--out", help="куда сохранить JSON-отчёт")
+    parser.add_argument("--baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--max-429", type=float, default=0.05, help="допустимая доля ответов 429")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    records = load_records(args.captures, args.route)[:args.limit]
+    if not records:
+        print("Нет записей для воспроизведения")
+        return 1
+    tokens = map_principals(records, args.no_auth)
+
+    started = time.monotonic()
+    replayer = asyncio.run(replay(args.base_url, records, tokens, args.speed, args.concurrency))
+    elapsed = time.monotonic() - started
+
+    report = build_report(replayer.samples, elapsed, config={
+        "base_url": args.base_url,
+        "captures": args.captures,
+        "records": len(records),
+        "recorded_span_sec": records[-1]["ts"] - records[0]["ts"],
+        "speed": args.speed,
+        "concurrency": args.concurrency,
+        "max_schedule_lag_sec": replayer.max_lag,
+    })
+    print(format_table(report))
+    if replayer.max_lag > 0.1:
+        print(f"Внимание: генератор отставал от расписания до {replayer.max_lag:.2f} с")
+    if args.out:
+        save_report(report, args.out)
+        print(f"Отчёт: {args.out}")
+    return (check_rate_limited(replayer.samples, args.max_429)
+            or check_regressions(report, args.baseline, args.tolerance))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+Отчёт нагрузочного прогона: пропускная способность и p50/p95/p99 по маршрутам.
+
+Отчёт сохраняется в JSON вместе с коммитом, чтобы сравнивать прогоны между
+коммитами. Сравнение с базовым отчётом возвращает код 1 при регрессии.
+
+    python -m benchmarks.report results/current.json --baseline results/baseline.json --tolerance 0.2
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence
+
+
+@dataclass
+class Sample:
+    route: str
+    status: int
+    latency: float  # секунды
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        # 4xx — тоже ошибка: поток 404/422/429 иначе выглядит быстрым здоровым маршрутом
+        return self.error is None and self.status < 400
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Перцентиль по ближайшему рангу; значения уже отсортированы"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(q / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def _summary(samples: Sequence[Sample], duration: float) -> dict:
+    latencies = sorted(s.latency * 1000 for s in samples if s.ok)
+    errors = sum(1 for s in samples if not s.ok)
+    statuses: Dict[str, int] = {}
+    for s in samples:
+        key = str(s.status) if s.error is None else s.error
+        statuses[key] = statuses.get(key, 0) + 1
+    return {
+        "count": len(samples),
+        "errors": errors,
+        "error_rate": errors / len(samples) if samples else 0.0,
+        "rps": len(samples) / duration if duration else 0.0,
+        "mean_ms": sum(latencies) / len(latencies) if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": latencies[-1] if latencies else 0.0,
+        "statuses": statuses,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(samples: Sequence[Sample], duration: float, config: Optional[dict] = None) -> dict:
+    by_route: Dict[str, List[Sample]] = {}
+    for s in samples:
+        by_route.setdefault(s.route, []).append(s)
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "duration_sec": duration,
+            "config": config or {},
+        },
+        "total": _summary(samples, duration),
+        "routes": {route: _summary(items, duration) for route, items in sorted(by_route.items())},
+    }
+
+
+def save_report(report: dict, path: str) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def load_report(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.2, max_error_rate_delta: float = 0.01) -> List[str]:
+    """Регрессии относительно базового отчёта: рост p95/p99 больше tolerance, падение rps, рост ошибок"""
+    problems = []
+    for route, base in baseline.get("routes", {}).items():
+        cur = current.get("routes", {}).get(route)
+        if cur is None:
+            problems.append(f"{route}: нет в текущем прогоне")
+            continue
+        for key in ("p95_ms", "p99_ms"):
+            if base[key] and cur[key] > base[key] * (1 + tolerance):
+                problems.append(f"{route}: {key} {base[key]:.1f} → {cur[key]:.1f}")
+        if base["rps"] and cur["rps"] < base["rps"] * (1 - tolerance):
+            problems.append(f"{route}: rps {base['rps']:.1f} → {cur['rps']:.1f}")
+        if cur["error_rate"] > base["error_rate"] + max_error_rate_delta:
+            problems.append(f"{route}: error_rate {base['error_rate']:.3f} → {cur['error_rate']:.3f}")
+    return problems
+
+
+def format_table(report: dict) -> str:
+    header = f"{'route':<40} {'count':>7} {'rps':>8} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8}"
+    lines = [header, "-" * len(header)]
+    rows = list(report["routes"].items()) + [("TOTAL", report["total"])]
+    for route, s in rows:
+        lines.append(
+            f"{route:<40} {s['count']:>7} {s['rps']:>8.1f} {s['error_rate'] * 100:>5.1f}% "
+            f"{s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f}"
+        )
+    return "\n".join(lines)
+
+
+def check_rate_limited(samples: Sequence[Sample], max_share: float) -> int:
+    """
+    Код 2, если 429 больше max_share: такой прогон меряет ограничитель частоты,
+    а не сервис, и сравнивать его с базовым отчётом бессмысленно.
+    """
+    limited = sum(1 for s in samples if s.status == 429)
+    share = limited / len(samples) if samples else 0.0
+    if share <= max_share:
+        return 0
+    print(f"429 Too Many Requests — {share:.0%} ответов (допуск {max_share:.0%}): прогон упёрся "
+          f"в ограничитель частоты. Запустите сервер с RATELIMIT_ENABLED=false")
+    return 2
+
+
+def check_regressions(report: dict, baseline_path: Optional[str], tolerance: float) -> int:
+    """Печатает регрессии; код возврата для CLI"""
+    if not baseline_path:
+        return 0
+    problems = compare(report, load_report(baseline_path), tolerance)
+    if problems:
+        print(f"Регрессии относительно {baseline_path}:")
+        for problem in problems:
+            print(f"  {problem}")
+        return 1
+    print(f"Регрессий относительно {baseline_path} нет (допуск {tolerance:.0%})")
+    return 0
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Сравнение отчётов нагрузочных прогонов")
+    parser.add_argument("report")
+    parser.add_argument("--baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    report = load_report(args.report)
+    print(format_table(report))
+    return check_regressions(report, args.baseline, args.tolerance)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Стоимость сборки и сериализации ответа по эндпоинтам: как было и как стало.
+
+Для каждого эндпоинта на фиксированном результате LLM/fallback замеряются:
+- legacy: сборка модели по полям (Exercise(**ex) на упражнение), повторная
+  валидация FastAPI по response_model и jsonable_encoder + json.dumps;
+- fastapi: та же сборка, но быстрый путь FastAPI (валидация + model_dump_json);
+- current: один model_validate и model_dump_json, как в model_response() —
+  без второй валидации (создание самого Response одинаково во всех вариантах);
+- orjson: для сравнения — orjson.dumps готового dict.
+
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization -k workout --repeat 9
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from benchmarks.micro import WORKOUT_HISTORY, measure
+
+Variant = Tuple[str, Callable[[], object]]
+
+
+def _response_field(model):
+    from fastapi.utils import create_model_field
+
+    return create_model_field(name="response", type_=model, mode="serialization")
+
+
+def _legacy(field, build: Callable[[], object]) -> Callable[[], bytes]:
+    from fastapi.encoders import jsonable_encoder
+
+    def run() -> bytes:
+        value, _ = field.validate(build(), {}, loc=("response",))
+        return json.dumps(jsonable_encoder(field.serialize(value)), ensure_ascii=False).encode("utf-8")
+
+    return run
+
+
+def _fastapi(field, build: Callable[[], object]) -> Callable[[], bytes]:
+    def run() -> bytes:
+        value, _ = field.validate(build(), {}, loc=("response",))
+        return field.serialize_json(value)
+
+    return run
+
+
+def _orjson(document: dict) -> Optional[Callable[[], bytes]]:
+    from backend.core.responses import orjson
+
+    if orjson is None:
+        return None
+    return lambda: orjson.dumps(document, option=orjson.OPT_NON_STR_KEYS)
+
+
+def workout_variants() -> List[Variant]:
+    from backend.api.endpoints.workout import Exercise, WorkoutResponse, generate_fallback_workout
+
+    data = generate_fallback_workout("boost", 45)
+    # Как у LLM: несколько упражнений в каждом блоке
+    for block in ("warm_up", "main_block", "cool_down"):
+        data[block] = data[block] * 4
+    generated_at = datetime(2024, 5, 1, 12, 0)
+    field = _response_field(WorkoutResponse)
+
+    def build_fields():
+        return WorkoutResponse(
+            workout_id="01HZX3Q8M6J7K2P9R4T5V6W7X8", vibe_mode="boost",
+            intensity=data["intensity"], total_duration_min=45,
+            estimated_calories=data["estimated_calories"],
+            warm_up=[Exercise(**ex) for ex in data["warm_up"]],
+            main_block=[Exercise(**ex) for ex in data["main_block"]],
+            cool_down=[Exercise(**ex) for ex in data["cool_down"]],
+            generated_at=generated_at,
+        )
+
+    document = {
+        "workout_id": "01HZX3Q8M6J7K2P9R4T5V6W7X8", "vibe_mode": "boost",
+        "intensity": data["intensity"], "total_duration_min": 45,
+        "estimated_calories": data["estimated_calories"],
+        "warm_up": data["warm_up"], "main_block": data["main_block"], "cool_down": data["cool_down"],
+        "generated_at": generated_at,
+    }
+    return [
+        ("legacy", _legacy(field, build_fields)),
+        ("fastapi", _fastapi(field, build_fields)),
+        ("current", lambda: WorkoutResponse.model_validate(document).model_dump_json()),
+        ("orjson", _orjson(document)),
+    ]
+
+
+def forecast_variants() -> List[Variant]:
+    from backend.api.endpoints.forecast import ForecastResponse, generate_forecast_fallback
+
+    data = generate_forecast_fallback({"weight": 80, "pushups": 20}, 0.8)
+    field = _response_field(ForecastResponse)
+
+    def build_fields():
+        return ForecastResponse(
+            optimistic_scenario=data.get("optimistic_scenario", {}),
+            pessimistic_scenario=data.get("pessimistic_scenario", {}),
+            comparison=data.get("comparison", {}),
+            key_milestones=data.get("key_milestones", []),
+            recommendations=data.get("recommendations", []),
+        )
+
+    return [
+        ("legacy", _legacy(field, build_fields)),
+        ("fastapi", _fastapi(field, build_fields)),
+        ("current", lambda: ForecastResponse.model_validate(data).model_dump_json()),
+        ("orjson", _orjson(data)),
+    ]
+
+
+def profile_variants() -> List[Variant]:
+    from backend.api.endpoints.profile import ProfileAnalysisResponse, analyze_profile_fallback
+
+    data = analyze_profile_fallback(WORKOUT_HISTORY)
+    field = _response_field(ProfileAnalysisResponse)
+
+    def build_fields():
+        return ProfileAnalysisResponse(
+            user_type=data.get("user_type", "пользователь"),
+            analysis=data.get("analysis", "Анализ профиля"),
+            strengths=data.get("strengths", []),
+            weaknesses=data.get("weaknesses", []),
+            recommendations=data.get("recommendations", []),
+            optimal_training_schedule=data.get("optimal_training_schedule", {}),
+        )
+
+    return [
+        ("legacy", _legacy(field, build_fields)),
+        ("fastapi", _fastapi(field, build_fields)),
+        ("current", lambda: ProfileAnalysisResponse.model_validate(data).model_dump_json()),
+        ("orjson", _orjson(data)),
+    ]
+
+
+def catalog_variants() -> List[Variant]:
+    from backend.api.endpoints.catalog import build_exercise_catalog, exercise_catalog
+
+    document = build_exercise_catalog()
+    return [
+        ("legacy", lambda: json.dumps(document, ensure_ascii=False).encode("utf-8")),
+        ("current", lambda: exercise_catalog.body),  # сериализован при старте
+        ("orjson", _orjson(document)),
+    ]
+
+
+ENDPOINTS: Dict[str, Callable[[], List[Variant]]] = {
+    "POST /api/workout/generate": workout_variants,
+    "POST /api/forecast/30days": forecast_variants,
+    "POST /api/profile/analyze": profile_variants,
+    "GET /api/catalog/exercises": catalog_variants,
+}
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Стоимость сериализации ответов по эндпоинтам")
+    parser.add_argument("-k", dest="filters", action="append", default=[], help="подстрока имени эндпоинта")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.1, help="секунд на один прогон")
+    parser.add_argument("--json", dest="json_out", help="куда сохранить результаты")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    os.environ.setdefault("OPENROUTER_API_KEY", "serialization-benchmark")
+    results: Dict[str, Dict[str, float]] = {}
+    print(f"{'endpoint':<30} {'variant':<8} {'µs/resp':>9} {'bytes':>7} {'vs legacy':>10}")
+    for endpoint, variants in ENDPOINTS.items():
+        if args.filters and not any(f in endpoint for f in args.filters):
+            continue
+        results[endpoint] = {}
+        legacy_us = None
+        for name, fn in variants():
+            if fn is None:
+                continue
+            us = measure(fn, args.repeat, args.min_time) / 1000
+            results[endpoint][name] = round(us, 2)
+            legacy_us = legacy_us or us
+            body = fn()
+            size = len(body.encode("utf-8") if isinstance(body, str) else body)
+            print(f"{endpoint:<30} {name:<8} {us:>9.1f} {size:>7} {legacy_us / us:>9.1f}x")
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+"""
+Продакшен-конфигурация gunicorn: python run.py --prod
+(или gunicorn -c gunicorn.conf.py backend.main:app).
+
+Мастер-процесс импортирует приложение один раз (preload_app) и форкает
+воркеры uvicorn (uvloop + httptools). По SIGTERM воркеры перестают принимать
+соединения и доделывают текущие запросы в пределах graceful_timeout.
+"""
+
+import multiprocessing
+
+from backend.core.config import get_settings
+
+_settings = get_settings()
+
+wsgi_app = "backend.main:app"
+bind = f"{_settings.server_host}:{_settings.server_port}"
+workers = _settings.server_workers or multiprocessing.cpu_count()
+worker_class = "uvicorn.workers.UvicornWorker"  # loop="auto", http="auto" — uvloop и httptools, если установлены
+
+preload_app = True
+backlog = _settings.server_backlog
+keepalive = _settings.server_keepalive_sec
+graceful_timeout = _settings.server_graceful_timeout_sec
+timeout = 60  # воркер, не отвечающий мастеру дольше, перезапускается
+
+# Перезапуск воркеров со сдвигом, чтобы не копить фрагментацию памяти
+max_requests = 10000
+max_requests_jitter = 1000
+
+accesslog = "-"
+loglevel = "info"
+
+
+def post_fork(server, worker):
+    """Ресурсы, созданные мастером до fork, в воркерах использовать нельзя"""
+    from backend.core.database import engine
+    from backend.core.shared_cache import reset_cache_after_fork
+
+    # Соединения пула принадлежат мастеру: воркер открывает свои
+    engine.dispose(close=False)
+    reset_cache_after_fork()
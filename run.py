@@ -1,7 +1,15 @@
+import argparse
+import multiprocessing
+import sys
+
 import uvicorn
-from backend.main import app
 
-if __name__ == "__main__":
+from backend.core.config import get_settings
+from backend.migrate import main as migrate
+
+
+def run_dev() -> None:
+    """Один процесс с автоперезагрузкой — только для разработки"""
     uvicorn.run(
         "backend.main:app",
         host="0.0.0.0",
@@ -9,3 +17,47 @@ if __name__ == "__main__":
         reload=True,
         log_level="info"
     )
+
+
+def run_prod() -> None:
+    """Несколько воркеров по числу ядер, без file watcher"""
+    try:
+        from gunicorn.app.wsgiapp import run as gunicorn_run
+    except ImportError:
+        gunicorn_run = None
+
+    if gunicorn_run is not None:
+        sys.argv = ["gunicorn", "-c", "gunicorn.conf.py", "backend.main:app"]
+        gunicorn_run()
+        return
+
+    # Без gunicorn (например, Windows): менеджер процессов uvicorn.
+    # Приложение импортируется в каждом воркере заново — preload нет.
+    settings = get_settings()
+    uvicorn.run(
+        "backend.main:app",
+        host=settings.server_host,
+        port=settings.server_port,
+        workers=settings.server_workers or multiprocessing.cpu_count(),
+        # auto: uvloop/httptools, если установлены, иначе asyncio/h11 (Windows)
+        loop="auto",
+        http="auto",
+        backlog=settings.server_backlog,
+        timeout_keep_alive=settings.server_keepalive_sec,
+        timeout_graceful_shutdown=settings.server_graceful_timeout_sec,
+        proxy_headers=True,
+        log_level="info",
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Запуск NeuroCoach")
+    parser.add_argument("--prod", action="store_true", help="продакшен: несколько воркеров, без reload")
+    args = parser.parse_args()
+
+    # Схема БД больше не создаётся при импорте приложения
+    migrate()
+    if args.prod:
+        run_prod()
+    else:
+        run_dev()
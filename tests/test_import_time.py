@@ -0,0 +1,30 @@
+"""
+Холодный импорт приложения: бюджет времени и отсутствие побочных эффектов.
+
+Бюджет — IMPORT_BUDGET_MS (по умолчанию 1200 мс), как у benchmarks/import_time.py.
+"""
+
+import os
+import subprocess
+import sys
+
+from benchmarks.import_time import DEFAULT_BUDGET_MS, LAZY_MODULES, TARGET, measure
+
+
+def test_cold_import_fits_budget():
+    best_ms, modules = min((measure(TARGET) for _ in range(3)), key=lambda r: r[0])
+    assert best_ms <= DEFAULT_BUDGET_MS, f"import {TARGET}: {best_ms:.0f} мс > {DEFAULT_BUDGET_MS:.0f} мс"
+    eager = [name for name in LAZY_MODULES if name in modules]
+    assert not eager, f"при импорте загружены ленивые модули: {eager}"
+
+
+def test_import_does_not_read_settings():
+    # Без обязательного OPENROUTER_API_KEY Settings() падает — импорт не должен его создавать
+    env = {k: v for k, v in os.environ.items() if k != "OPENROUTER_API_KEY"}
+    code = (
+        "import backend.main, backend.migrate\n"
+        "from backend.core.config import get_settings\n"
+        "assert get_settings.cache_info().currsize == 0, 'Settings созданы при импорте'\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env)
+    assert proc.returncode == 0, proc.stderr[-2000:]
@@ -0,0 +1,75 @@
+"""
+Проверка пароля вне event loop: bcrypt, замена старых sha256-хешей и отказ при перегрузке.
+"""
+
+import asyncio
+import hashlib
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.core import auth, passwords
+from backend.core.database import Base
+from backend.core.passwords import PasswordHasher, PasswordHasherBusy
+from backend.models.user import User
+
+
+@pytest.fixture
+def hasher(monkeypatch):
+    hasher = PasswordHasher(rounds=4, max_workers=2)
+    monkeypatch.setattr(passwords, "_hasher", hasher)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_bcrypt_verify(hasher):
+    hashed = hasher.hash_sync("secret-1")
+    assert asyncio.run(hasher.verify("secret-1", hashed)) == (True, None)
+    assert asyncio.run(hasher.verify("wrong", hashed)) == (False, None)
+
+
+def test_legacy_sha256_is_rehashed(hasher):
+    legacy = hashlib.sha256(b"secret-1").hexdigest()
+    ok, new_hash = asyncio.run(hasher.verify("secret-1", legacy))
+    assert ok and new_hash.startswith("$2b$04$")
+    assert hasher.verify_sync("secret-1", new_hash)
+    assert asyncio.run(hasher.verify("wrong", legacy)) == (False, None)
+
+
+def test_weaker_bcrypt_is_rehashed(hasher):
+    weak = PasswordHasher(rounds=4).hash_sync("secret-1")
+    hasher.rounds = 5
+    ok, new_hash = asyncio.run(hasher.verify("secret-1", weak))
+    assert ok and new_hash.startswith("$2b$05$")
+
+
+def test_busy_hasher_rejects_with_503(hasher):
+    hasher.max_waiting = 0
+    with pytest.raises(PasswordHasherBusy):
+        asyncio.run(hasher.hash("secret-1"))
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(auth.hash_password("secret-1"))
+    assert error.value.status_code == 503
+
+
+def test_login_replaces_legacy_hash(hasher, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'users.db'}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        legacy = hashlib.sha256(b"secret-1").hexdigest()
+        db.add(User(email="a@example.com", username="a", hashed_password=legacy))
+        db.commit()
+
+        assert asyncio.run(auth.authenticate_user(db, "a@example.com", "wrong")) is False
+        user = asyncio.run(auth.authenticate_user(db, "a@example.com", "secret-1"))
+        assert user and user.hashed_password.startswith("$2b$")
+
+        db.expire_all()
+        stored = db.query(User).filter(User.email == "a@example.com").one().hashed_password
+        assert stored == user.hashed_password and hasher.verify_sync("secret-1", stored)
+    finally:
+        db.close()
+        engine.dispose()